@@ -1,14 +1,37 @@
+import fnmatch
+import hashlib
+import heapq
+import json
+import math
+import os
 import re
+import threading
+import time
+import uuid
+from concurrent.futures import wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
-from typing import Any, List, Dict, Tuple, Optional
+from urllib.parse import urlsplit, urlunsplit, unquote, parse_qsl, urlencode
+from typing import Any, List, Dict, Tuple, Optional, Iterable, Set, TYPE_CHECKING
 from collections import defaultdict
+from itertools import islice
+
+# 插件加载计时,从标准库导入完成后开始
+_load_started = time.perf_counter()
 
 from app import schemas
 from app.log import logger
 from app.plugins import _PluginBase
 from app.core.config import settings
 
+from .resultstore import decode_result, encode_result
+
+if TYPE_CHECKING:
+    # 目录库、分组器、搜索索引和存储后端只在使用时导入
+    from .catalog import LibraryCatalog
+    from .searchindex import SearchIndex
+    from .storage import StorageBackend
+
 
 class DuplicateDetector(_PluginBase):
     # 插件名称
@@ -18,7 +41,7 @@ class DuplicateDetector(_PluginBase):
     # 插件图标
     plugin_icon = "clean.png"
     # 插件版本
-    plugin_version = "1.3"
+    plugin_version = "2.0"
     # 插件作者
     plugin_author = "NEST"
     # 作者主页
@@ -33,20 +56,102 @@ class DuplicateDetector(_PluginBase):
     # 私有属性
     _enabled = False
     _onlyonce = False
+    _cron = ""  # 定时扫描周期
+    _cron_valid = False  # 定时扫描周期是否有效
     _scan_paths = ""
     _strm_library_path = None  # STRM文件路径
     _cloud_library_path = None  # 网盘挂载路径
     _cloud_storage = "local"  # 网盘存储类型
+    # 网盘媒体文件后缀
+    _cloud_media_suffixes = ('.mkv', '.mp4', '.avi', '.ts', '.m2ts', '.iso', '.mov', '.wmv', '.flv')
+    _cloud_content_dedup = False  # 按网盘列举返回的大小和哈希查找内容相同的网盘文件
+    _cloud_listing_ttl = 24.0  # 网盘目录列举缓存有效期(小时),0为不缓存
+    _cloud_size_match_min = 100 * 1024 * 1024  # 无哈希时按大小匹配的最小文件大小(字节)
+    _scan_storage = "local"  # 扫描存储类型,非local时直接通过StorageChain枚举
+    _scan_concurrency = 8  # 扫描时每个存储的并发列举和状态获取数
+    # 扫描时跳过的目录规则,每行一条,支持通配符,re:前缀为正则
+    _exclude_rules = "@eaDir\n.recycle\n#recycle\nextrafanart\nFeaturettes\nsample"
+    _follow_symlinks = False  # 扫描时跟随目录符号链接
+    _one_filesystem = False  # 扫描时不跨越文件系统
+    _page_view = "new"  # 详情页默认显示范围: new/changed/all
+    _group_backend = "memory"  # 分组方式: memory/sqlite
+    _catalog_enabled = True  # 保存完整媒体库目录
+    _strm_target_dedup = False  # 按STRM文件内容(指向的目标)查找重复
+    _season_pack = True  # 按季目录的集号集合查找重复季包
+    _nfo_tmdbid = True  # 目录名无tmdbid时从NFO读取
+    # 本次扫描当前路径的空间占用统计:维度 -> 分项 -> [文件数, 占用字节]
+    _usage = None
+    _usage_root = None
+    _checkpoint_interval = 60  # 扫描检查点保存间隔(秒),0为不保存
+    _checkpoint_max_age = 24  # 检查点有效期(小时),过期后重新扫描
+    _checkpoint = None  # 当前扫描的检查点数据
+    _checkpoint_last = 0
+    # 扫描I/O控制
+    _scan_io_rate = 0  # 每秒最多目录读取和文件stat次数,0为不限制
+    _scan_time_budget = 0  # 每次扫描的时间片(分钟),用完后保存检查点,下次继续
+    _scan_low_priority = False  # 以最低CPU和I/O优先级运行扫描线程
+    _sample_rate = 100.0  # 抽样比例(%),小于100时只扫描抽中的一级目录并估算全库
+    _scan_deadline = None
+    _scan_paused = False
+    _io_tokens = 0.0
+    _io_last = 0.0
+    _delete_rate_limit = 1.0  # 每个存储每秒最多删除次数
+    _delete_max_retries = 3  # 网盘删除失败重试次数
     _storagechain = None  # 存储管理链
+    # 网盘删除队列
+    _delete_queue_dirty = False  # 队列有未保存的变化
+    _delete_saved_time = 0.0
+    _delete_save_interval = 10  # 删除队列处理中的最短保存间隔(秒)
+    _delete_event = None
+    _delete_stop_event = None
+    _delete_worker = None
+    # 批量清理
+    _clean_keep_rule = "resolution"  # 保留规则: resolution/size/mtime
+    _clean_concurrency = 4  # 批量清理的删除并发数
+    _clean_thread = None
+    _clean_progress = None
+    _clean_plan = None  # 最近一次预览的删除计划,执行清理时须提供其令牌
+    _result_version = 0  # 检测结果版本,扫描或删除更新结果时递增
+    _page_cache = None  # (结果版本, 详情页)
+    _search_index = None  # 重复组倒排索引,首次查询时加载
+    _live_scan = None  # 进行中扫描发布的重复组: {'scan_id', 'groups', 'latest', 'finished'}
+    _live_partial = None  # 当前扫描路径的阶段性发布状态
+    _reconcile_thread = None
+    _onlyonce_thread = None
+    _load_budget = 0.1  # 模块加载耗时上限(秒),超出时记录警告
+    _init_budget = 0.2  # 插件初始化耗时上限(秒),超出时记录警告
+
+    def __init__(self):
+        super().__init__()
+        # 容器和锁按实例创建,不在插件实例间共享,重新加载插件后不残留
+        self._exclude_matchers = []
+        self._nfo_cache = {}  # NFO路径 -> [修改时间, tmdbid],跨扫描持久化
+        self._nfo_dir_cache = {}  # 本次扫描中目录 -> tmdbid
+        self._nfo_cache_used = {}  # 本次扫描用到的NFO缓存项
+        self._usage_inodes = set()
+        self._scan_lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._delete_queue = []
+        self._delete_failures = []
+        self._delete_lock = threading.Lock()
+        self._delete_last_time = {}  # 存储 -> 上次删除时间
+        self._delete_running = set()  # 正在执行的删除任务ID
+        self._prune_pending = set()  # 待检查的(存储, 目录),队列空闲时批量清理
+        self._storages = {}  # 存储名称 -> 存储后端
+        self._storage_lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        self._live_lock = threading.Lock()
 
     def init_plugin(self, config: dict = None):
-        """初始化插件"""
-        from app.chain.storage import StorageChain
-        self._storagechain = StorageChain()
+        """初始化插件,只读取配置,存储管理链等在首次使用时创建"""
+        init_started = time.perf_counter()
+        # 停止现有任务
+        self.stop_service()
 
         if config:
             self._enabled = config.get("enabled")
             self._onlyonce = config.get("onlyonce")
+            self._cron = config.get("cron") or ""
             self._scan_paths = config.get("scan_paths") or ""
             self._file_extensions = config.get("file_extensions") or "strm,mkv,mp4,avi"
             self._scan_type = config.get("scan_type") or "auto"
@@ -54,25 +159,136 @@ class DuplicateDetector(_PluginBase):
             self._strm_library_path = config.get("strm_library_path") or ""
             self._cloud_library_path = config.get("cloud_library_path") or ""
             self._cloud_storage = config.get("cloud_storage") or "local"
+            self._scan_storage = config.get("scan_storage") or "local"
+            self._scan_concurrency = max(int(config.get("scan_concurrency") or 8), 1)
+            if config.get("exclude_rules") is not None:
+                self._exclude_rules = config.get("exclude_rules")
+            self._follow_symlinks = config.get("follow_symlinks") or False
+            self._one_filesystem = config.get("one_filesystem") or False
+            self._page_view = config.get("page_view") or "new"
+            self._group_backend = config.get("group_backend") or "memory"
+            self._catalog_enabled = config.get("catalog_enabled", True)
+            self._strm_target_dedup = config.get("strm_target_dedup") or False
+            self._cloud_content_dedup = config.get("cloud_content_dedup") or False
+            cloud_listing_ttl = config.get("cloud_listing_ttl")
+            self._cloud_listing_ttl = max(float(cloud_listing_ttl), 0) \
+                if cloud_listing_ttl not in (None, "") else 24.0
+            self._season_pack = config.get("season_pack", True)
+            self._nfo_tmdbid = config.get("nfo_tmdbid", True)
+            checkpoint_interval = config.get("checkpoint_interval")
+            self._checkpoint_interval = int(checkpoint_interval) if checkpoint_interval not in (None, "") else 60
+            self._checkpoint_max_age = float(config.get("checkpoint_max_age") or 24)
+            self._scan_io_rate = max(float(config.get("scan_io_rate") or 0), 0)
+            self._scan_time_budget = max(float(config.get("scan_time_budget") or 0), 0)
+            self._scan_low_priority = config.get("scan_low_priority") or False
+            self._sample_rate = min(max(float(config.get("sample_rate") or 100), 0.1), 100)
+            self._delete_rate_limit = float(config.get("delete_rate_limit") or 1)
+            self._delete_max_retries = int(config.get("delete_max_retries") or 3)
+            self._clean_keep_rule = config.get("clean_keep_rule") or "resolution"
+            self._clean_concurrency = max(int(config.get("clean_concurrency") or 4), 1)
+            self.__close_storages()
+
+        # 定时扫描周期无效时不注册定时服务,配置中保留原值以便修改
+        self._cron_valid = self.__validate_cron(self._cron)
+
+        self._exclude_matchers = self.__compile_exclude_rules(self._exclude_rules)
+        # 配置变化可能影响详情页内容
+        self._page_cache = None
+
+        # 恢复未完成的网盘删除任务
+        self._delete_queue = self.get_data('delete_queue') or []
+        self._delete_failures = self.get_data('delete_failures') or []
+        if self._delete_queue:
+            self.__start_delete_worker()
 
         if self._enabled and self._onlyonce:
-            # 立即运行一次
+            # 立即运行一次,在后台线程中扫描,不阻塞插件加载
             logger.info("重复文件排查服务,立即运行一次")
-            self.__run_detection()
+            self._onlyonce_thread = threading.Thread(target=self.__run_scan,
+                                                     name="DuplicateDetector-onlyonce", daemon=True)
+            self._onlyonce_thread.start()
             # 关闭一次性开关
             self._onlyonce = False
             self.update_config({
                 "enabled": self._enabled,
                 "onlyonce": False,
+                "cron": self._cron,
                 "scan_paths": self._scan_paths,
                 "file_extensions": self._file_extensions,
                 "scan_type": self._scan_type,
                 "min_duplicate_count": self._min_duplicate_count,
                 "strm_library_path": self._strm_library_path,
                 "cloud_library_path": self._cloud_library_path,
-                "cloud_storage": self._cloud_storage
+                "cloud_storage": self._cloud_storage,
+                "scan_storage": self._scan_storage,
+                "scan_concurrency": self._scan_concurrency,
+                "exclude_rules": self._exclude_rules,
+                "follow_symlinks": self._follow_symlinks,
+                "one_filesystem": self._one_filesystem,
+                "page_view": self._page_view,
+                "group_backend": self._group_backend,
+                "catalog_enabled": self._catalog_enabled,
+                "strm_target_dedup": self._strm_target_dedup,
+                "cloud_content_dedup": self._cloud_content_dedup,
+                "cloud_listing_ttl": self._cloud_listing_ttl,
+                "season_pack": self._season_pack,
+                "nfo_tmdbid": self._nfo_tmdbid,
+                "checkpoint_interval": self._checkpoint_interval,
+                "checkpoint_max_age": self._checkpoint_max_age,
+                "scan_io_rate": self._scan_io_rate,
+                "scan_time_budget": self._scan_time_budget,
+                "scan_low_priority": self._scan_low_priority,
+                "sample_rate": self._sample_rate,
+                "delete_rate_limit": self._delete_rate_limit,
+                "delete_max_retries": self._delete_max_retries,
+                "clean_keep_rule": self._clean_keep_rule,
+                "clean_concurrency": self._clean_concurrency
             })
 
+        init_time = time.perf_counter() - init_started
+        logger.debug(f"重复文件排查插件模块加载耗时 {_load_time * 1000:.1f}ms,初始化耗时 {init_time * 1000:.1f}ms")
+        if _load_time > self._load_budget:
+            logger.warning(f"重复文件排查插件模块加载耗时 {_load_time * 1000:.0f}ms,"
+                           f"超过 {self._load_budget * 1000:.0f}ms")
+        if init_time > self._init_budget:
+            logger.warning(f"重复文件排查插件初始化耗时 {init_time * 1000:.0f}ms,"
+                           f"超过 {self._init_budget * 1000:.0f}ms")
+
+    def __get_storagechain(self):
+        """存储管理链,首次使用时创建"""
+        if self._storagechain is None:
+            from app.chain.storage import StorageChain
+            self._storagechain = StorageChain()
+        return self._storagechain
+
+    def __storage(self, storage: Optional[str] = None) -> 'StorageBackend':
+        """
+        存储后端,按存储名称复用:本地存储直接访问文件系统,其余通过StorageChain访问,
+        每个后端有独立的并发限制、线程池和文件项缓存;低优先级扫描时,扫描使用的后台线程池在启动时降低优先级
+        """
+        storage = storage or 'local'
+        with self._storage_lock:
+            backend = self._storages.get(storage)
+            if backend is None:
+                from .storage import ChainStorage, LocalStorage
+                initializer = self.__lower_thread_priority if self._scan_low_priority else None
+                if storage == 'local':
+                    backend = LocalStorage(self._scan_concurrency, follow_symlinks=self._follow_symlinks,
+                                           stat_dirs=self._follow_symlinks or self._one_filesystem,
+                                           background_initializer=initializer)
+                else:
+                    backend = ChainStorage(self.__get_storagechain(), storage, self._scan_concurrency,
+                                           background_initializer=initializer)
+                self._storages[storage] = backend
+            return backend
+
+    def __close_storages(self):
+        """关闭存储后端的线程池,配置变化后按新配置重新创建"""
+        with self._storage_lock:
+            storages, self._storages = self._storages, {}
+        for backend in storages.values():
+            backend.close()
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -91,11 +307,123 @@ class DuplicateDetector(_PluginBase):
                 "methods": ["GET"],
                 "summary": "删除重复文件",
                 "description": "删除指定的重复文件"
+            },
+            {
+                "path": "/delete_item",
+                "endpoint": self.delete_item,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "删除重复组中的文件",
+                "description": "按重复组ID和文件ID删除文件,供详情页使用"
+            },
+            {
+                "path": "/delete_queue",
+                "endpoint": self.delete_queue,
+                "methods": ["GET"],
+                "summary": "网盘删除队列",
+                "description": "查看网盘删除队列深度和失败记录"
+            },
+            {
+                "path": "/scan_diff",
+                "endpoint": self.scan_diff,
+                "methods": ["GET"],
+                "summary": "扫描差异",
+                "description": "获取最近一次扫描相对上一次新增、变化和已解决的重复组"
+            },
+            {
+                "path": "/scan_delta",
+                "endpoint": self.scan_delta,
+                "methods": ["GET"],
+                "summary": "扫描增量结果",
+                "description": "返回扫描过程中自cursor之后新完成的重复组,供页面实时更新"
+            },
+            {
+                "path": "/search",
+                "endpoint": self.search,
+                "methods": ["GET"],
+                "summary": "搜索重复组",
+                "description": "按标题、TMDB ID或路径中的目录名搜索重复组,最后一个词按前缀匹配"
+            },
+            {
+                "path": "/catalog",
+                "endpoint": self.catalog_query,
+                "methods": ["GET"],
+                "summary": "查询媒体库目录",
+                "description": "按类型、分辨率、来源、编码、TMDB ID或标题查询已扫描的全部文件"
+            },
+            {
+                "path": "/catalog_largest",
+                "endpoint": self.catalog_largest,
+                "methods": ["GET"],
+                "summary": "占用空间最大的作品",
+                "description": "按作品汇总文件大小并排序"
+            },
+            {
+                "path": "/catalog_missing",
+                "endpoint": self.catalog_missing,
+                "methods": ["GET"],
+                "summary": "缺集剧集",
+                "description": "列出集号不连续的剧集季及缺失的集号"
+            },
+            {
+                "path": "/clean_all",
+                "endpoint": self.clean_all,
+                "methods": ["GET"],
+                "summary": "批量清理重复文件",
+                "description": "按保留规则(最高分辨率/最大体积/最新修改)清理指定范围的重复组,先dry_run预览获取令牌再执行"
+            },
+            {
+                "path": "/clean_progress",
+                "endpoint": self.clean_progress,
+                "methods": ["GET"],
+                "summary": "批量清理进度",
+                "description": "查看批量清理任务的进度和失败记录"
+            },
+            {
+                "path": "/reconcile",
+                "endpoint": self.reconcile,
+                "methods": ["GET"],
+                "summary": "检查孤立文件",
+                "description": "在后台对比STRM库和网盘库,找出没有STRM的网盘文件和目标已不存在的STRM"
+            },
+            {
+                "path": "/orphans",
+                "endpoint": self.orphans,
+                "methods": ["GET"],
+                "summary": "孤立文件结果",
+                "description": "获取最近一次孤立文件检查的结果"
             }
         ]
 
     def get_service(self) -> List[Dict[str, Any]]:
-        pass
+        """
+        注册插件公共服务
+        """
+        services = []
+        if self._enabled and self._cron and self._cron_valid:
+            from apscheduler.triggers.cron import CronTrigger
+            
+            services.append({
+                "id": "DuplicateDetector",
+                "name": "重复文件扫描",
+                "trigger": CronTrigger.from_crontab(self._cron),
+                "func": self.__run_scan,
+                "kwargs": {}
+            })
+        return services
+
+    @staticmethod
+    def __validate_cron(cron: str) -> bool:
+        """校验五段式cron表达式,无效时记录警告"""
+        if not cron:
+            return False
+        from apscheduler.triggers.cron import CronTrigger
+        try:
+            CronTrigger.from_crontab(cron)
+        except ValueError as e:
+            logger.warning(f"定时扫描周期无效,不启用定时扫描:{cron} - {str(e)}")
+            return False
+        return True
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """拼装插件配置页面"""
@@ -138,6 +466,22 @@ class DuplicateDetector(_PluginBase):
                                     }
                                 ]
                             },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'catalog_enabled',
+                                            'label': '保存媒体库目录',
+                                        }
+                                    }
+                                ]
+                            },
                             {
                                 'component': 'VCol',
                                 'props': {
@@ -165,7 +509,7 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 4
                                 },
                                 'content': [
                                     {
@@ -182,7 +526,7 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 4
                                 },
                                 'content': [
                                     {
@@ -199,6 +543,27 @@ class DuplicateDetector(_PluginBase):
                                     }
                                 ]
                             },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'page_view',
+                                            'label': '详情页显示',
+                                            'items': [
+                                                {'title': '仅本次新增', 'value': 'new'},
+                                                {'title': '新增和变化', 'value': 'changed'},
+                                                {'title': '全部重复组', 'value': 'all'},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
                             {
                                 'component': 'VCol',
                                 'props': {
@@ -231,15 +596,60 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
+                                    'md': 6
                                 },
                                 'content': [
                                     {
-                                        'component': 'VTextarea',
+                                        'component': 'VSelect',
                                         'props': {
-                                            'model': 'scan_paths',
-                                            'label': '扫描路径',
-                                            'rows': 5,
-                                            'placeholder': '每一行一个路径,例如:\nY:/strm/Movie\nY:/strm/Anime'
+                                            'model': 'scan_storage',
+                                            'label': '扫描存储',
+                                            'items': [
+                                                {'title': '本地/挂载目录', 'value': 'local'},
+                                                {'title': '115网盘', 'value': 'u115'},
+                                                {'title': '115网盘Plus', 'value': '115网盘Plus'},
+                                                {'title': '123云盘', 'value': '123云盘'},
+                                            ],
+                                            'hint': '非本地时直接通过存储接口列举目录,无需挂载',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'group_backend',
+                                            'label': '分组方式',
+                                            'items': [
+                                                {'title': '内存', 'value': 'memory'},
+                                                {'title': 'SQLite(大型媒体库)', 'value': 'sqlite'},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'scan_concurrency',
+                                            'label': '扫描并发数',
+                                            'placeholder': '8',
+                                            'type': 'number'
                                         }
                                     }
                                 ]
@@ -253,15 +663,16 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 3
                                 },
                                 'content': [
                                     {
                                         'component': 'VTextField',
                                         'props': {
-                                            'model': 'strm_library_path',
-                                            'label': 'STRM库路径',
-                                            'placeholder': '例如 /media/strm'
+                                            'model': 'delete_rate_limit',
+                                            'label': '网盘删除限速(次/秒)',
+                                            'placeholder': '1',
+                                            'type': 'number'
                                         }
                                     }
                                 ]
@@ -270,15 +681,55 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 3
                                 },
                                 'content': [
                                     {
                                         'component': 'VTextField',
                                         'props': {
-                                            'model': 'cloud_library_path',
-                                            'label': '网盘映射路径',
-                                            'placeholder': '例如 /media'
+                                            'model': 'delete_max_retries',
+                                            'label': '网盘删除重试次数',
+                                            'placeholder': '3',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'clean_keep_rule',
+                                            'label': '批量清理保留规则',
+                                            'items': [
+                                                {'title': '最高分辨率', 'value': 'resolution'},
+                                                {'title': '最大体积', 'value': 'size'},
+                                                {'title': '最新修改', 'value': 'mtime'},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'clean_concurrency',
+                                            'label': '批量清理并发数',
+                                            'placeholder': '4',
+                                            'type': 'number'
                                         }
                                     }
                                 ]
@@ -292,127 +743,1206 @@ class DuplicateDetector(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
+                                    'md': 4
                                 },
                                 'content': [
                                     {
-                                        'component': 'VAlert',
+                                        'component': 'VTextField',
                                         'props': {
-                                            'type': 'info',
-                                            'variant': 'tonal',
-                                            'text': '插件会扫描指定路径下的文件,检测基于目录名中的{tmdbid=xxxxx}或文件名解析。'
-                                                    '电影:相同tmdbid视为重复;剧集:相同剧名+季集号视为重复。'
+                                            'model': 'checkpoint_interval',
+                                            'label': '检查点间隔(秒)',
+                                            'placeholder': '60',
+                                            'type': 'number',
+                                            'hint': '扫描中断后从最近的检查点继续,0为不保存',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'checkpoint_max_age',
+                                            'label': '检查点有效期(小时)',
+                                            'placeholder': '24',
+                                            'type': 'number'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'sample_rate',
+                                            'label': '抽样比例(%)',
+                                            'placeholder': '100',
+                                            'type': 'number',
+                                            'hint': '小于100时只扫描按目录名抽中的作品目录并估算全库重复',
+                                            'persistent-hint': True
                                         }
                                     }
                                 ]
                             }
                         ]
-                    }
-                ]
-            }
-        ], {
-            "enabled": False,
-            "onlyonce": False,
-            "scan_paths": "",
-            "file_extensions": "strm,mkv,mp4,avi",
-            "scan_type": "auto",
-            "min_duplicate_count": 2,
-            "strm_library_path": "",
-            "cloud_library_path": "",
-            "cloud_storage": "local"
-        }
-
-    def __extract_tmdbid(self, path_str: str) -> Optional[str]:
-        """从路径中提取tmdbid"""
-        match = re.search(r'\{tmdbid=(\d+)\}', path_str)
-        return match.group(1) if match else None
-
-    def __extract_season_episode(self, filename: str) -> Optional[Tuple[str, str]]:
-        """从文件名中提取季集号"""
-        match = re.search(r'S(\d+)E(\d+)', filename, re.IGNORECASE)
-        if match:
-            return match.group(1).zfill(2), match.group(2).zfill(2)
-        return None
-
-    def __extract_file_info(self, filename: str) -> Dict[str, str]:
-        """从文件名提取详细信息"""
-        info = {
-            'resolution': '',
-            'source': '',
-            'codec': ''
-        }
-        
-        # 提取分辨率
-        res_match = re.search(r'(2160p|1080p|720p|480p)', filename, re.IGNORECASE)
-        if res_match:
-            info['resolution'] = res_match.group(1)
-        
-        # 提取来源
-        source_match = re.search(r'(BluRay|WEB-DL|HDTV|WEBRip|BDRip)', filename, re.IGNORECASE)
-        if source_match:
-            info['source'] = source_match.group(1)
-        
-        # 提取编码
-        codec_match = re.search(r'(x265|H\.?265|HEVC|x264|H\.?264|AVC)', filename, re.IGNORECASE)
-        if codec_match:
-            info['codec'] = codec_match.group(1)
-        
-        return info
-
-    def __scan_files(self, scan_path: str, extensions: List[str]) -> List[Path]:
-        """扫描指定路径下的文件"""
-        files = []
-        try:
-            path = Path(scan_path)
-            if not path.exists():
-                logger.warning(f"扫描路径不存在:{scan_path}")
-                return files
-            
-            for ext in extensions:
-                ext = ext.strip()
-                if ext.startswith('.'):
-                    pattern = f"**/*{ext}"
-                else:
-                    pattern = f"**/*.{ext}"
-                files.extend(path.rglob(pattern))
-            
-            logger.info(f"在 {scan_path} 中扫描到 {len(files)} 个文件")
-        except Exception as e:
-            logger.error(f"扫描文件失败:{str(e)}")
-        
-        return files
-
-    def __detect_movie_duplicates(self, files: List[Path]) -> List[Dict]:
-        """检测电影重复"""
-        # 按tmdbid或(title, year)分组
-        groups = defaultdict(list)
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VCronField',
+                                        'props': {
+                                            'model': 'cron',
+                                            'label': '定时扫描周期',
+                                            'placeholder': '5位cron表达式,留空不定时扫描'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'scan_time_budget',
+                                            'label': '扫描时间片(分钟)',
+                                            'placeholder': '0',
+                                            'type': 'number',
+                                            'hint': '用完后保存检查点,下次扫描继续,0为不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'scan_io_rate',
+                                            'label': '扫描I/O限速(次/秒)',
+                                            'placeholder': '0',
+                                            'type': 'number',
+                                            'hint': '每秒最多读取目录、获取文件状态和读取NFO/STRM的次数,0为不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'scan_low_priority',
+                                            'label': '低优先级扫描',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'scan_paths',
+                                            'label': '扫描路径',
+                                            'rows': 5,
+                                            'placeholder': '每一行一个路径,例如:\nY:/strm/Movie\nY:/strm/Anime'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'exclude_rules',
+                                            'label': '排除目录',
+                                            'rows': 4,
+                                            'placeholder': '每一行一条规则,支持通配符,re:开头为正则,例如:\n@eaDir\n*/Extras\nre:^sample$',
+                                            'hint': '匹配目录名(含/时匹配相对路径),命中的目录整棵跳过',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'follow_symlinks',
+                                            'label': '跟随符号链接',
+                                        }
+                                    },
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'season_pack',
+                                            'label': '季包重复检测',
+                                            'hint': '不同目录中集号相同或互相包含的整季视为重复',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'one_filesystem',
+                                            'label': '不跨越文件系统',
+                                        }
+                                    },
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'nfo_tmdbid',
+                                            'label': '从NFO读取TMDB ID',
+                                        }
+                                    },
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'strm_target_dedup',
+                                            'label': 'STRM同源检测',
+                                            'hint': '读取STRM内容,指向同一文件或链接的视为重复',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'strm_library_path',
+                                            'label': 'STRM库路径',
+                                            'placeholder': '例如 /media/strm'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'cloud_library_path',
+                                            'label': '网盘映射路径',
+                                            'placeholder': '例如 /media'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'cloud_content_dedup',
+                                            'label': '网盘同内容检测',
+                                            'hint': '按网盘列举返回的大小和哈希查找内容相同的网盘文件,不下载内容',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'cloud_listing_ttl',
+                                            'label': '网盘列举缓存(小时)',
+                                            'placeholder': '24',
+                                            'type': 'number',
+                                            'hint': '目录修改时间未变且在有效期内时复用上次列举结果,0为不缓存',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VAlert',
+                                        'props': {
+                                            'type': 'info',
+                                            'variant': 'tonal',
+                                            'text': '插件会扫描指定路径下的文件,检测基于目录名中的{tmdbid=xxxxx}或文件名解析。'
+                                                    '电影:相同tmdbid视为重复;剧集:相同剧名+季集号视为重复。'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ], {
+            "enabled": False,
+            "onlyonce": False,
+            "cron": "",
+            "scan_paths": "",
+            "file_extensions": "strm,mkv,mp4,avi",
+            "scan_type": "auto",
+            "min_duplicate_count": 2,
+            "strm_library_path": "",
+            "cloud_library_path": "",
+            "cloud_storage": "local",
+            "scan_storage": "local",
+            "scan_concurrency": 8,
+            "exclude_rules": self._exclude_rules,
+            "follow_symlinks": False,
+            "one_filesystem": False,
+            "page_view": "new",
+            "group_backend": "memory",
+            "catalog_enabled": True,
+            "strm_target_dedup": False,
+            "cloud_content_dedup": False,
+            "cloud_listing_ttl": 24,
+            "season_pack": True,
+            "nfo_tmdbid": True,
+            "checkpoint_interval": 60,
+            "checkpoint_max_age": 24,
+            "scan_io_rate": 0,
+            "scan_time_budget": 0,
+            "scan_low_priority": False,
+            "sample_rate": 100,
+            "delete_rate_limit": 1,
+            "delete_max_retries": 3,
+            "clean_keep_rule": "resolution",
+            "clean_concurrency": 4
+        }
+
+    def __extract_tmdbid(self, path_str: str) -> Optional[str]:
+        """从路径中提取tmdbid"""
+        match = re.search(r'\{tmdbid=(\d+)\}', path_str)
+        return match.group(1) if match else None
+
+    def __nfo_tmdbid(self, directory: Path, dir_nfo: str, file_nfo: Optional[Path] = None) -> Optional[str]:
+        """
+        从NFO读取tmdbid:目录级NFO(movie.nfo/tvshow.nfo)每次扫描每个目录只解析一次,
+        找不到时再尝试与视频同名的NFO
+        """
+        if not self._nfo_tmdbid or (self._scan_storage and self._scan_storage != 'local'):
+            return None
+        dir_key = str(directory)
+        if dir_key not in self._nfo_dir_cache:
+            self._nfo_dir_cache[dir_key] = self.__cached_nfo_tmdbid(directory / dir_nfo)
+        tmdbid = self._nfo_dir_cache[dir_key]
+        if not tmdbid and file_nfo:
+            tmdbid = self.__cached_nfo_tmdbid(file_nfo)
+        return tmdbid
+
+    def __cached_nfo_tmdbid(self, nfo_path: Path) -> Optional[str]:
+        """按NFO修改时间缓存解析结果,未修改的NFO不再读取;通过存储后端获取状态和内容"""
+        backend = self.__storage('local')
+        key = str(nfo_path)
+        try:
+            self.__throttle_io()
+            entry = backend.stat(key)
+        except OSError:
+            return None
+        if not entry:
+            return None
+        cached = self._nfo_cache.get(key)
+        if not cached or cached[0] != entry.mtime:
+            cached = [entry.mtime, self.__parse_nfo_tmdbid(backend, nfo_path)]
+        self._nfo_cache_used[key] = cached
+        return cached[1]
+
+    def __parse_nfo_tmdbid(self, backend: 'StorageBackend', nfo_path: Path) -> Optional[str]:
+        """流式解析NFO,读到<tmdbid>或<uniqueid type="tmdb">后立即停止"""
+        import io
+        import xml.etree.ElementTree as ET
+        try:
+            self.__throttle_io()
+            data = backend.read(str(nfo_path))
+            if data is None:
+                return None
+            for _, elem in ET.iterparse(io.BytesIO(data), events=('end',)):
+                tag = elem.tag.lower()
+                text = (elem.text or '').strip()
+                if text.isdigit() and (tag == 'tmdbid' or (tag == 'uniqueid'
+                                                          and (elem.get('type') or '').lower() == 'tmdb')):
+                    return text
+                elem.clear()
+        except ET.ParseError as e:
+            # 部分NFO末尾附带链接等非XML内容,已读到的部分中没有id即视为未找到
+            logger.debug(f"解析NFO失败:{nfo_path} - {str(e)}")
+        except OSError as e:
+            logger.warning(f"读取NFO失败:{nfo_path} - {str(e)}")
+        return None
+
+    def __extract_season_episode(self, filename: str) -> Optional[Tuple[str, str, int]]:
+        """
+        从文件名中提取季号、起始集号和结束集号,支持S01E01-E02、S01E01E02、S01E01-02形式的多集文件;
+        -后的数字后面紧跟p/i、bit、fps等时视为分辨率或编码参数而非集号
+        """
+        match = re.search(r'S(\d+)E(\d+)((?:-?E\d+|-\d{1,3}(?![\dpi]|bit|fps|ch))*)', filename, re.IGNORECASE)
+        if not match:
+            return None
+        start = int(match.group(2))
+        end = max([start, *(int(ep) for ep in re.findall(r'\d+', match.group(3)))])
+        # 集号跨度过大时多半是误识别,按单集处理
+        if end - start > 50:
+            end = start
+        return match.group(1).zfill(2), match.group(2).zfill(2), end
+
+    def __extract_file_info(self, filename: str) -> Dict[str, str]:
+        """从文件名提取详细信息"""
+        info = {
+            'resolution': '',
+            'source': '',
+            'codec': ''
+        }
+        
+        # 提取分辨率
+        res_match = re.search(r'(2160p|1080p|720p|480p)', filename, re.IGNORECASE)
+        if res_match:
+            info['resolution'] = res_match.group(1)
+        
+        # 提取来源
+        source_match = re.search(r'(BluRay|WEB-DL|HDTV|WEBRip|BDRip)', filename, re.IGNORECASE)
+        if source_match:
+            info['source'] = source_match.group(1)
+        
+        # 提取编码
+        codec_match = re.search(r'(x265|H\.?265|HEVC|x264|H\.?264|AVC)', filename, re.IGNORECASE)
+        if codec_match:
+            info['codec'] = codec_match.group(1)
+        
+        return info
+
+    @staticmethod
+    def __compile_exclude_rules(rules: str) -> List[Tuple[str, Any]]:
+        """解析排除规则,返回(匹配对象, 规则)列表"""
+        matchers = []
+        for rule in (rules or '').split('\n'):
+            rule = rule.strip()
+            if not rule:
+                continue
+            if rule.startswith('re:'):
+                try:
+                    matchers.append(('regex', re.compile(rule[3:], re.IGNORECASE)))
+                except re.error as e:
+                    logger.warning(f"排除规则正则无效:{rule} - {str(e)}")
+            elif '/' in rule:
+                matchers.append(('path', rule.strip('/').lower()))
+            else:
+                matchers.append(('name', rule.lower()))
+        return matchers
+
+    def __is_excluded(self, name: str, rel_path: str) -> bool:
+        """判断目录是否命中排除规则,name为目录名,rel_path为相对扫描根目录的路径"""
+        for kind, matcher in self._exclude_matchers:
+            if kind == 'regex':
+                if matcher.search(name) or matcher.search(rel_path):
+                    return True
+            elif kind == 'path':
+                if fnmatch.fnmatchcase(rel_path.lower(), matcher):
+                    return True
+            elif fnmatch.fnmatchcase(name.lower(), matcher):
+                return True
+        return False
+
+    @staticmethod
+    def __normalize_suffixes(extensions: List[str]) -> Set[str]:
+        """将配置的文件后缀统一为带点的小写形式"""
+        return {f".{ext.strip().lstrip('.').lower()}" for ext in extensions if ext.strip()}
+
+    def __scan_files(self, scan_path: str, extensions: List[str], resume: Optional[Dict] = None,
+                     checkpoint: bool = True, sampled: bool = False) -> List[Path]:
+        """
+        扫描指定路径下的文件,遍历时直接跳过命中排除规则的目录,
+        resume为检查点中的遍历状态,checkpoint为False时不写入检查点,
+        sampled为True时只进入抽中的一级目录
+        """
+        files = []
+        try:
+            path = Path(scan_path)
+            if not path.exists():
+                logger.warning(f"扫描路径不存在:{scan_path}")
+                return files
+            
+            suffixes = self.__normalize_suffixes(extensions)
+            backend = self.__storage('local')
+            root_stat = path.stat()
+            root_dev = root_stat.st_dev
+            # 跟随符号链接时记录已访问目录,防止循环链接
+            visited = {f"{root_dev}:{root_stat.st_ino}"}
+            if resume:
+                stack = [tuple(d) for d in resume['pending_dirs']]
+                files = [Path(f) for f in resume['files']]
+                logger.info(f"从检查点继续扫描 {scan_path}:已发现 {len(files)} 个文件,剩余 {len(stack)} 个目录")
+            else:
+                stack = [(str(path), '')]
+            walked = 0
+            while stack:
+                # 每个时间片至少遍历一批目录,用完时立即写入检查点并停止遍历
+                if checkpoint and walked:
+                    self.__save_checkpoint(scan_path, lambda: {
+                        'pending_dirs': stack,
+                        'files': files
+                    }, force=self.__scan_time_up())
+                    if self._scan_paused:
+                        break
+                    self.__publish_partial(scan_path, files)
+                # 一次取出多个目录并发列举
+                batch = [stack.pop() for _ in range(min(len(stack), backend.concurrency))]
+                walked += len(batch)
+                for _ in batch:
+                    self.__throttle_io()
+                listings = backend.list_many((current for current, _ in batch), background=True)
+                
+                for current, rel_dir in batch:
+                    entries = listings[current]
+                    if entries is None or isinstance(entries, Exception):
+                        logger.warning(f"读取目录失败:{current} - {str(entries) if entries else '目录不存在'}")
+                        continue
+                    for entry in entries:
+                        if entry.is_dir:
+                            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                            if self.__is_excluded(entry.name, rel_path):
+                                logger.debug(f"跳过排除目录:{entry.path}")
+                                continue
+                            if sampled and not rel_dir and not self.__in_sample(entry.name):
+                                continue
+                            if self._one_filesystem and entry.dev != root_dev:
+                                continue
+                            if self._follow_symlinks:
+                                if entry.inode in visited:
+                                    continue
+                                visited.add(entry.inode)
+                            stack.append((entry.path, rel_path))
+                        elif os.path.splitext(entry.name)[1].lower() in suffixes:
+                            files.append(Path(entry.path))
+            
+            if not self._scan_paused:
+                logger.info(f"在 {scan_path} 中扫描到 {len(files)} 个文件")
+        except Exception as e:
+            logger.error(f"扫描文件失败:{str(e)}")
+        
+        return files
+
+    def __scan_storage_files(self, scan_path: str, extensions: List[str], resume: Optional[Dict] = None,
+                             checkpoint: bool = True, storage: Optional[str] = None,
+                             sampled: bool = False) -> Tuple[List[Path], Dict[str, Dict]]:
+        """
+        通过StorageChain直接枚举存储目录,并发列举子目录,大小取自返回的文件项,
+        resume为检查点中的遍历状态,storage默认为扫描存储,sampled为True时只进入抽中的一级目录
+        """
+        storage = storage or self._scan_storage
+        backend = self.__storage(storage)
+        files = []
+        file_stats = {}
+        suffixes = self.__normalize_suffixes(extensions)
+        try:
+            if resume:
+                dir_paths = list(resume['pending_dirs'])
+                files = [Path(f) for f in resume['files']]
+                file_stats = resume['file_stats']
+                logger.info(f"从检查点继续扫描 {scan_path}:已发现 {len(files)} 个文件,剩余 {len(dir_paths)} 个目录")
+            else:
+                root_entry = backend.stat(scan_path)
+                if not root_entry or not root_entry.is_dir:
+                    logger.warning(f"扫描路径不存在({storage}):{scan_path}")
+                    return files, file_stats
+                dir_paths = [root_entry.path]
+            
+            root = Path(scan_path)
+            # 记录每个列举任务对应的目录,用于写入检查点
+            future_dirs = {}
+            for dir_path in dir_paths:
+                self.__throttle_io()
+                future_dirs[backend.submit(backend.list_dir, dir_path, background=True)] = dir_path
+            pending = set(future_dirs)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future_dirs.pop(future, None)
+                    try:
+                        entries = future.result() or []
+                    except Exception as e:
+                        logger.error(f"列举目录失败({storage}):{str(e)}")
+                        continue
+                    for entry in entries:
+                        if entry.is_dir:
+                            dir_path = Path(entry.path)
+                            rel_path = dir_path.relative_to(root).as_posix() \
+                                if dir_path.is_relative_to(root) else dir_path.name
+                            if self.__is_excluded(dir_path.name, rel_path):
+                                continue
+                            if sampled and dir_path.parent == root and not self.__in_sample(dir_path.name):
+                                continue
+                            self.__throttle_io()
+                            future = backend.submit(backend.list_dir, entry.path, background=True)
+                            future_dirs[future] = entry.path
+                            pending.add(future)
+                        elif Path(entry.name).suffix.lower() in suffixes:
+                            file_path = Path(entry.path)
+                            files.append(file_path)
+                            # 远程文件没有inode信息,视为相互独立的文件
+                            file_stats[str(file_path)] = {
+                                'size': entry.size,
+                                'disk_size': entry.disk_size,
+                                'inode': None,
+                                'nlink': 1,
+                                'mtime': entry.mtime,
+                                'freeable': True
+                            }
+                if checkpoint:
+                    # 未完成的列举任务仍在future_dirs中,下次从检查点重新列举
+                    self.__save_checkpoint(scan_path, lambda: {
+                        'pending_dirs': list(future_dirs.values()),
+                        'files': files,
+                        'file_stats': file_stats
+                    }, force=self.__scan_time_up())
+                    if self._scan_paused:
+                        for future in pending:
+                            future.cancel()
+                        break
+                    self.__publish_partial(scan_path, files, file_stats)
+            
+            if not self._scan_paused:
+                logger.info(f"在 {scan_path}({storage}) 中扫描到 {len(files)} 个文件")
+        except Exception as e:
+            logger.error(f"远程扫描文件失败:{str(e)}")
+        
+        return files, file_stats
+
+    def __stat_files(self, files: List[Path], known_stats: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        获取文件状态,并统计每个inode在本次扫描中出现的路径数,
+        known_stats为检查点中已获取的文件状态,时间片用完时返回已获取的部分
+        """
+        file_stats = dict(known_stats or {})
+        inode_refs = defaultdict(int)
+        for stat in file_stats.values():
+            if stat['inode']:
+                inode_refs[stat['inode']] += 1
+        backend = self.__storage('local')
+        pending = [str(f) for f in files if str(f) not in file_stats]
+        batch_size = backend.concurrency * 16
+        for start in range(0, len(pending), batch_size):
+            # 每个时间片至少获取一批文件的状态
+            if start and self.__scan_time_up():
+                break
+            batch = pending[start:start + batch_size]
+            for _ in batch:
+                self.__throttle_io()
+            for path, entry in backend.stat_many(batch, background=True).items():
+                if entry is None or isinstance(entry, Exception):
+                    logger.error(f"获取文件状态 {path} 失败:{str(entry) if entry else '文件不存在'}")
+                    continue
+                file_stats[path] = {
+                    'size': entry.size,
+                    'disk_size': entry.disk_size,
+                    'inode': entry.inode,
+                    'nlink': entry.nlink,
+                    'mtime': entry.mtime,
+                    'symlink': entry.symlink
+                }
+                if entry.inode:
+                    inode_refs[entry.inode] += 1
+        # 硬链接数多于扫描到的路径数时,说明扫描范围外仍有链接,删除后不会释放空间;
+        # 删除符号链接只移除链接本身,同样不释放空间
+        for stat in file_stats.values():
+            stat['freeable'] = not stat.get('symlink') and (
+                not stat['inode'] or stat['nlink'] <= inode_refs[stat['inode']])
+        return file_stats
+
+    @staticmethod
+    def __stat_record(file_stats: Dict[str, Dict], file_path: Path) -> Dict[str, Any]:
+        """生成文件记录中的大小及inode字段,同时保留原始字节数供结果编码和统计使用"""
+        stat = file_stats.get(str(file_path))
+        if not stat:
+            raise FileNotFoundError(f"无法获取文件状态: {file_path}")
+        return {
+            'size': round(stat['size'] / (1024 * 1024), 2),  # MB
+            'disk_size': round(stat['disk_size'] / (1024 * 1024), 2),  # MB
+            'size_bytes': stat['size'],
+            'disk_size_bytes': stat['disk_size'],
+            'inode': stat['inode'],
+            'freeable': stat['freeable'],
+            'mtime': stat.get('mtime'),
+            'links': [],
+            **({'symlink': True} if stat.get('symlink') else {})
+        }
+
+    def __record_usage(self, file_path: Path, file_stats: Dict[str, Dict], media_type: str,
+                       file_info: Dict[str, str]):
+        """累计当前扫描路径的空间占用:按类型、分辨率、编码和一级目录,硬链接只计一次"""
+        stat = file_stats.get(str(file_path))
+        if self._usage is None or not stat:
+            return
+        if stat['inode']:
+            if stat['inode'] in self._usage_inodes:
+                return
+            self._usage_inodes.add(stat['inode'])
+        try:
+            parts = file_path.relative_to(self._usage_root).parts
+            folder = str(self._usage_root / parts[0]) if len(parts) > 1 else str(self._usage_root)
+        except ValueError:
+            folder = str(file_path.parent)
+        for dimension, key in (('type', media_type),
+                               ('resolution', file_info['resolution'].lower() or '未知'),
+                               ('codec', self.__codec_family(file_info['codec'])),
+                               ('folder', folder)):
+            entry = self._usage[dimension].setdefault(key, [0, 0])
+            entry[0] += 1
+            entry[1] += stat['disk_size']
+
+    @staticmethod
+    def __codec_family(codec: str) -> str:
+        """文件名中的编码写法归并为编码格式"""
+        codec = codec.lower().replace('.', '')
+        if codec in ('x265', 'h265', 'hevc'):
+            return 'H.265'
+        if codec in ('x264', 'h264', 'avc'):
+            return 'H.264'
+        return '未知'
+
+    @staticmethod
+    def __merge_usage(usages: List[Dict], folder_limit: int = 30) -> Dict[str, Any]:
+        """
+        合并各扫描路径的空间占用,每个维度为按占用降序的[名称, 文件数, 大小MB]列表,
+        目录只保留占用最大的folder_limit项,其余合并为"其他"
+        """
+        merged = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+        for usage in usages:
+            for dimension, entries in usage.items():
+                for key, (count, size) in entries.items():
+                    merged[dimension][key][0] += count
+                    merged[dimension][key][1] += size
+        analytics = {}
+        for dimension in ('type', 'resolution', 'codec', 'folder'):
+            entries = sorted(merged[dimension].items(), key=lambda item: item[1][1], reverse=True)
+            if dimension == 'folder' and len(entries) > folder_limit:
+                rest = entries[folder_limit:]
+                entries = entries[:folder_limit] + [
+                    ('其他', [sum(e[1][0] for e in rest), sum(e[1][1] for e in rest)])
+                ]
+            analytics[dimension] = [[key, count, round(size / (1024 * 1024), 2)] for key, (count, size) in entries]
+        analytics['total_count'] = sum(entry[1] for entry in analytics['type'])
+        analytics['total_size'] = round(sum(entry[2] for entry in analytics['type']), 2)
+        return analytics
+
+    @staticmethod
+    def __collapse_hardlinks(file_list: List[Dict]) -> List[Dict]:
+        """将指向同一inode的硬链接合并为一条记录,符号链接不与其目标合并"""
+        collapsed = []
+        by_inode = {}
+        for file_info in file_list:
+            inode = None if file_info.get('symlink') else file_info.get('inode')
+            if inode and inode in by_inode:
+                by_inode[inode]['links'].append(file_info['path'])
+                continue
+            if inode:
+                by_inode[inode] = file_info
+            collapsed.append(file_info)
+        return collapsed
+
+    def __summarize_group(self, dup: Dict):
+        """更新重复组的文件数、总大小和可释放空间,按字节数累计后再换算为MB"""
+        files = dup['files']
+        dup['count'] = len(files)
+        dup['total_bytes'] = sum(self.__file_bytes(f, 'size') for f in files)
+        dup['total_size'] = round(dup['total_bytes'] / (1024 * 1024), 2)
+        # 每一集(电影为整组)保留体积最大的文件,多集文件按覆盖范围保留,其余可独立释放的文件计入可释放空间
+        partitions = defaultdict(list)
+        for file_info in files:
+            partitions[file_info.get('episode')].append(file_info)
+        reclaimable = 0
+        for part in partitions.values():
+            keep = self.__select_keep(part, lambda f: f['size'])
+            reclaimable += sum(self.__file_bytes(f, 'disk_size') for f in part
+                               if not any(f is k for k in keep) and f.get('freeable'))
+        dup['reclaimable_bytes'] = reclaimable
+        dup['reclaimable_size'] = round(reclaimable / (1024 * 1024), 2)
+
+    @staticmethod
+    def __file_bytes(file_info: Dict, field: str) -> int:
+        """文件记录的字节数,没有原始字节数的记录由MB换算"""
+        value = file_info.get(f'{field}_bytes')
+        if value is None:
+            value = int(round((file_info.get(field) or 0) * 1024 * 1024))
+        return value
+
+    @staticmethod
+    def __catalog_record(file_path: Path, file_stats: Dict[str, Dict], file_info: Dict[str, str],
+                         media_type: str, tmdbid: Optional[str], title: str, year: Optional[str],
+                         season: Optional[int] = None, episode: Optional[int] = None,
+                         episode_end: Optional[int] = None) -> Dict[str, Any]:
+        """生成媒体库目录记录,大小为字节数;多集文件记录起始和结束集号"""
+        stat = file_stats.get(str(file_path)) or {}
+        return {
+            'path': str(file_path),
+            'media_type': media_type,
+            'tmdbid': tmdbid,
+            'title': title,
+            'year': year,
+            'season': season,
+            'episode': episode,
+            'episode_end': episode_end,
+            'resolution': file_info['resolution'],
+            'source': file_info['source'],
+            'codec': file_info['codec'],
+            'size': stat.get('size', 0),
+            'mtime': stat.get('mtime')
+        }
+
+    def __get_catalog(self) -> 'LibraryCatalog':
+        """媒体库目录数据库"""
+        from .catalog import LibraryCatalog
+        return LibraryCatalog(Path(self.get_data_path()) / "catalog.db")
+
+    @staticmethod
+    def __normalize_strm_target(content: str) -> Optional[str]:
+        """规范化STRM指向的目标:URL统一协议和主机大小写并去除签名类参数,路径统一分隔符"""
+        target = next((line.strip() for line in content.lstrip('\ufeff').splitlines() if line.strip()), None)
+        if not target:
+            return None
+        if re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', target):
+            parts = urlsplit(target)
+            # 签名、时间戳等参数每次生成都可能不同,不参与比较
+            query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                           if k.lower() not in ('sign', 'token', 't', 'ts', 'expires', 'timestamp', 'auth_key'))
+            path = unquote(parts.path).rstrip('/') or '/'
+            return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ''))
+        target = unquote(target).replace('\\', '/')
+        return os.path.normpath(target).replace('\\', '/')
+
+    def __read_strm_targets(self, scan_path: str, strm_files: List[Path],
+                            file_stats: Dict[str, Dict], sampled: bool = False) -> Dict[str, str]:
+        """
+        批量并发读取STRM文件内容并规范化目标,按文件修改时间缓存,
+        修改时间未变的文件直接使用缓存结果;sampled为True时只扫描了部分目录,不清理缓存
+        """
+        cache = self.get_data('strm_target_cache') or {}
+        new_cache = {}
+        targets = {}
+        to_read = []
+        for file_path in strm_files:
+            key = str(file_path)
+            mtime = (file_stats.get(key) or {}).get('mtime')
+            cached = cache.get(key)
+            if cached and mtime is not None and cached[0] == mtime:
+                new_cache[key] = cached
+                if cached[1]:
+                    targets[key] = cached[1]
+            else:
+                to_read.append((key, mtime))
+        
+        # 通过存储后端的后台线程池分批读取,受后端并发限制且在低优先级扫描时同样降低优先级
+        backend = self.__storage('local')
+        batch_size = 500
+        for start in range(0, len(to_read), batch_size):
+            batch = to_read[start:start + batch_size]
+            for _ in batch:
+                self.__throttle_io()
+            contents = backend.read_many([key for key, _ in batch], max_bytes=4096, background=True)
+            for key, mtime in batch:
+                content = contents.get(key)
+                if content is None or isinstance(content, Exception):
+                    logger.warning(f"读取STRM文件失败:{key} - {str(content) if content else '文件不存在'}")
+                    target = None
+                else:
+                    target = self.__normalize_strm_target(content.decode('utf-8', errors='ignore'))
+                new_cache[key] = [mtime, target]
+                if target:
+                    targets[key] = target
+        
+        # 本扫描路径下只保留本次扫描到的STRM,避免缓存无限增长
+        prefix = scan_path.rstrip('/\\') + os.sep
+        self.save_data('strm_target_cache', {
+            **{k: v for k, v in cache.items() if sampled or not k.startswith(prefix)},
+            **new_cache
+        })
+        logger.info(f"STRM同源检测:共 {len(strm_files)} 个STRM,读取 {len(to_read)} 个,缓存命中 "
+                    f"{len(strm_files) - len(to_read)} 个")
+        return targets
+
+    def __detect_strm_target_duplicates(self, scan_path: str, strm_files: List[Path],
+                                        file_stats: Dict[str, Dict], sampled: bool = False) -> List[Dict]:
+        """按STRM指向的目标建立哈希索引,指向同一目标的STRM视为重复"""
+        targets = self.__read_strm_targets(scan_path, strm_files, file_stats, sampled)
+        target_index = defaultdict(list)
+        for file_path in strm_files:
+            target = targets.get(str(file_path))
+            if not target:
+                continue
+            try:
+                file_info = self.__extract_file_info(file_path.name)
+                target_index[target].append({
+                    'path': str(file_path),
+                    **self.__stat_record(file_stats, file_path),
+                    'resolution': file_info['resolution'],
+                    'source': file_info['source'],
+                    'codec': file_info['codec'],
+                    'target': target
+                })
+            except Exception as e:
+                logger.error(f"处理文件 {file_path} 失败:{str(e)}")
+        
+        duplicates = []
+        for target, file_list in target_index.items():
+            file_list = self.__collapse_hardlinks(file_list)
+            if len(file_list) < self._min_duplicate_count:
+                continue
+            dup = {
+                'type': 'STRM同源',
+                'group_key': f"strm:{hashlib.md5(target.encode()).hexdigest()}",
+                'title': unquote(target.rstrip('/').rsplit('/', 1)[-1]) or target,
+                'year': None,
+                'tmdbid': None,
+                'season': None,
+                'episode': None,
+                'target': target,
+                'files': file_list
+            }
+            self.__summarize_group(dup)
+            duplicates.append(dup)
+        return duplicates
+
+    def __list_cloud_library(self, cloud_root: Path) -> Dict[str, Dict]:
+        """
+        列举网盘库中的媒体文件,返回路径 -> 大小、修改时间和内容哈希;
+        远程存储并发列举目录,目录修改时间未变且在有效期内时复用缓存的列举结果;
+        目录的修改时间取自重新列举的上级目录或重新获取的目录状态,不使用缓存中记录的值
+        """
+        from .storage import StorageEntry
+        suffixes = set(self._cloud_media_suffixes)
+        cloud_files = {}
+        if not self._cloud_storage or self._cloud_storage == 'local':
+            # 本地挂载的网盘只有大小可用
+            paths = [str(f) for f in self.__scan_files(str(cloud_root), [s.lstrip('.') for s in suffixes],
+                                                        checkpoint=False)]
+            for _ in paths:
+                self.__throttle_io()
+            for path, entry in self.__storage('local').stat_many(paths, background=True).items():
+                if entry is None or isinstance(entry, Exception):
+                    logger.error(f"获取文件状态 {path} 失败:{str(entry) if entry else '文件不存在'}")
+                    continue
+                cloud_files[path] = {'size': entry.size, 'mtime': entry.mtime, 'hash': None}
+            return cloud_files
+        
+        storage = self._cloud_storage
+        backend = self.__storage(storage)
+        cache_file = Path(self.get_data_path()) / "cloud_listing_cache.json"
+        cache = {}
+        if self._cloud_listing_ttl and cache_file.exists():
+            try:
+                cache = json.loads(cache_file.read_text(encoding='utf-8'))
+            except Exception as e:
+                logger.warning(f"读取网盘列举缓存失败:{str(e)}")
+        new_cache = {}
+        expire_before = time.time() - self._cloud_listing_ttl * 3600
+        fetched = 0
+        
+        def list_dir(dir_path: str, mtime: Optional[float], fresh: bool) -> Tuple[List[StorageEntry], bool]:
+            """列举目录,返回列举结果及其是否来自缓存;fresh表示mtime取自本次重新列举的上级目录"""
+            nonlocal fetched
+            cached = cache.get(dir_path)
+            if cached and 'entries' in cached and cached['time'] >= expire_before:
+                if not fresh:
+                    # 上级目录的列举结果来自缓存时,其中的修改时间可能已过期,重新获取目录状态
+                    self.__throttle_io()
+                    dir_entry = backend.stat(dir_path)
+                    mtime = dir_entry.mtime if dir_entry else None
+                if mtime is not None and cached['mtime'] == mtime:
+                    new_cache[dir_path] = cached
+                    return [StorageEntry(*row) for row in cached['entries']], True
+            self.__throttle_io()
+            entries = backend.list_dir(dir_path) or []
+            fetched += 1
+            new_cache[dir_path] = {
+                'mtime': mtime,
+                'time': time.time(),
+                'entries': [list(entry) for entry in entries]
+            }
+            return entries, False
+        
+        root_entry = backend.stat(str(cloud_root))
+        if not root_entry or not root_entry.is_dir:
+            logger.warning(f"网盘映射路径不存在({storage}):{cloud_root}")
+            return cloud_files
+        pending = {backend.submit(list_dir, root_entry.path, root_entry.mtime, True, background=True)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    entries, from_cache = future.result()
+                except Exception as e:
+                    logger.error(f"列举目录失败({storage}):{str(e)}")
+                    continue
+                for entry in entries:
+                    if entry.is_dir:
+                        dir_path = Path(entry.path)
+                        rel_path = dir_path.relative_to(cloud_root).as_posix() \
+                            if dir_path.is_relative_to(cloud_root) else dir_path.name
+                        if not self.__is_excluded(dir_path.name, rel_path):
+                            pending.add(backend.submit(list_dir, entry.path, entry.mtime, not from_cache,
+                                                       background=True))
+                    elif Path(entry.name).suffix.lower() in suffixes:
+                        cloud_files[entry.path] = {
+                            'size': entry.size,
+                            'mtime': entry.mtime,
+                            'hash': entry.hash
+                        }
+        
+        if self._cloud_listing_ttl:
+            # 只保留本次访问到的目录
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(json.dumps(new_cache, ensure_ascii=False), encoding='utf-8')
+            except Exception as e:
+                logger.warning(f"保存网盘列举缓存失败:{str(e)}")
+        logger.info(f"网盘库 {cloud_root}({storage}) 共 {len(cloud_files)} 个媒体文件,列举 {fetched} 个目录,"
+                    f"缓存命中 {len(new_cache) - fetched} 个目录")
+        return cloud_files
+
+    def __detect_cloud_content_duplicates(self) -> List[Dict]:
+        """
+        网盘同内容检测:按列举返回的内容哈希(无哈希时按足够大的相同大小和后缀)对网盘库文件分组,
+        不读取文件内容;有对应STRM的文件以STRM路径作为记录路径,删除STRM时同步删除网盘文件
+        """
+        strm_root = Path(self._strm_library_path)
+        cloud_root = Path(self._cloud_library_path)
+        cloud_files = self.__list_cloud_library(cloud_root)
+        
+        content_index = defaultdict(list)
+        for path, info in cloud_files.items():
+            if info['hash']:
+                content_index[f"{info['hash']}:{info['size']}"].append(path)
+            elif info['size'] >= self._cloud_size_match_min:
+                content_index[f"size:{info['size']}{Path(path).suffix.lower()}"].append(path)
+        
+        duplicates = []
+        for content_key, paths in content_index.items():
+            if len(paths) < self._min_duplicate_count:
+                continue
+            file_list = []
+            for path in sorted(paths):
+                info = cloud_files[path]
+                key = self.__stem_key(Path(path), cloud_root)
+                strm_path = strm_root / f"{key}.strm" if key else None
+                has_strm = bool(strm_path and strm_path.exists())
+                file_info = self.__extract_file_info(Path(path).name)
+                size = round(info['size'] / (1024 * 1024), 2)  # MB
+                file_list.append({
+                    'path': str(strm_path) if has_strm else path,
+                    'size': size,
+                    'disk_size': size,
+                    'size_bytes': info['size'],
+                    'disk_size_bytes': info['size'],
+                    'inode': None,
+                    'freeable': True,
+                    'mtime': info['mtime'],
+                    'links': [],
+                    'resolution': file_info['resolution'],
+                    'source': file_info['source'],
+                    'codec': file_info['codec'],
+                    'cloud_path': path,
+                    'cloud_only': not has_strm
+                })
+            match = 'hash' if not content_key.startswith('size:') else 'size'
+            dup = {
+                'type': '网盘同内容',
+                'group_key': f"cloud:{content_key}",
+                'title': Path(paths[0]).stem,
+                'year': None,
+                'tmdbid': None,
+                'season': None,
+                'episode': None,
+                'match': match,
+                'files': file_list
+            }
+            self.__summarize_group(dup)
+            dup['group_id'] = hashlib.md5(dup['group_key'].encode()).hexdigest()[:12]
+            duplicates.append(dup)
+        logger.info(f"网盘同内容检测完成,发现 {len(duplicates)} 组内容相同的网盘文件")
+        return duplicates
+
+    def __detect_duplicates(self, files: List[Path], file_stats: Dict[str, Dict], catalog=None) -> List[Dict]:
+        """按扫描类型检测一个扫描路径中的重复文件"""
+        if self._scan_type == 'movie':
+            return self.__detect_movie_duplicates(files, file_stats, catalog)
+        if self._scan_type == 'tv':
+            return self.__detect_tv_duplicates(files, file_stats, catalog)
+        # auto: 简单判断:如果路径包含Season字样,视为剧集
+        tv_files = []
+        movie_files = []
+        for f in files:
+            (tv_files if 'Season' in str(f) else movie_files).append(f)
         
+        duplicates = []
+        if movie_files:
+            duplicates.extend(self.__detect_movie_duplicates(movie_files, file_stats, catalog))
+        if tv_files:
+            duplicates.extend(self.__detect_tv_duplicates(tv_files, file_stats, catalog))
+        return duplicates
+
+    def __new_grouper(self, name: str):
+        """按配置创建分组器,sqlite模式下记录写入插件数据目录的临时数据库"""
+        from .grouping import MemoryGrouper, SqliteGrouper
+        if self._group_backend == 'sqlite':
+            return SqliteGrouper(Path(self.get_data_path()) / f"grouping_{name}.db")
+        return MemoryGrouper()
+
+    def __detect_movie_duplicates(self, files: List[Path], file_stats: Dict[str, Dict],
+                                  catalog=None) -> List[Dict]:
+        """检测电影重复,catalog不为空时同时写入媒体库目录"""
+        # 按tmdbid或(title, year)分组
+        groups = self.__new_grouper('movie')
+        try:
+            return self.__group_movie_duplicates(files, file_stats, groups, catalog)
+        finally:
+            groups.close()
+
+    def __group_movie_duplicates(self, files: List[Path], file_stats: Dict[str, Dict], groups,
+                                 catalog=None) -> List[Dict]:
+        """将电影文件写入分组器并筛选重复组"""
         for file_path in files:
             try:
                 # 获取父目录(电影目录)
                 parent_dir = file_path.parent.name
                 
-                # 优先提取tmdbid
-                tmdbid = self.__extract_tmdbid(parent_dir)
+                # 优先提取tmdbid,目录名中没有时读取NFO
+                tmdbid = self.__extract_tmdbid(parent_dir) \
+                    or self.__nfo_tmdbid(file_path.parent, 'movie.nfo', file_path.with_suffix('.nfo'))
+                
+                file_info = self.__extract_file_info(file_path.name)
+                self.__record_usage(file_path, file_stats, '电影', file_info)
+                year_match = re.search(r'\((\d{4})\)', parent_dir)
+                title = re.sub(r'\s*\(\d{4}\).*', '', parent_dir).strip()
+                if catalog:
+                    catalog.add(self.__catalog_record(file_path, file_stats, file_info, 'movie', tmdbid,
+                                                      title, year_match.group(1) if year_match else None))
                 
                 if tmdbid:
                     key = f"tmdb_{tmdbid}"
                 else:
                     # 尝试从目录名提取title和year
-                    year_match = re.search(r'\((\d{4})\)', parent_dir)
                     if year_match:
                         year = year_match.group(1)
-                        title = re.sub(r'\s*\(\d{4}\).*', '', parent_dir).strip()
                         key = f"{title}_{year}"
                     else:
                         # 无法识别,跳过
                         continue
                 
-                file_info = self.__extract_file_info(file_path.name)
-                file_size = file_path.stat().st_size / (1024 * 1024)  # MB
-                
-                groups[key].append({
+                groups.add(key, {
                     'path': str(file_path),
-                    'size': round(file_size, 2),
+                    **self.__stat_record(file_stats, file_path),
                     'resolution': file_info['resolution'],
                     'source': file_info['source'],
                     'codec': file_info['codec']
@@ -420,9 +1950,10 @@ class DuplicateDetector(_PluginBase):
             except Exception as e:
                 logger.error(f"处理文件 {file_path} 失败:{str(e)}")
         
-        # 筛选重复组
+        # 筛选重复组(硬链接合并后再计数)
         duplicates = []
-        for key, file_list in groups.items():
+        for key, file_list in groups.duplicate_groups(self._min_duplicate_count):
+            file_list = self.__collapse_hardlinks(file_list)
             if len(file_list) >= self._min_duplicate_count:
                 # 提取信息
                 tmdbid = key.split('_')[1] if key.startswith('tmdb_') else None
@@ -435,68 +1966,97 @@ class DuplicateDetector(_PluginBase):
                 year = year_match.group(1) if year_match else ''
                 title = re.sub(r'\s*\(\d{4}\).*', '', parent_dir).strip()
                 
-                total_size = sum(f['size'] for f in file_list)
-                
-                duplicates.append({
+                dup = {
                     'type': '电影',
+                    'group_key': f"movie:{key}",
                     'title': title,
                     'year': year,
                     'tmdbid': tmdbid,
                     'season': None,
                     'episode': None,
-                    'count': len(file_list),
-                    'total_size': round(total_size, 2),
                     'files': file_list
-                })
+                }
+                self.__summarize_group(dup)
+                duplicates.append(dup)
         
         return duplicates
 
-    def __detect_tv_duplicates(self, files: List[Path]) -> List[Dict]:
-        """检测剧集重复"""
+    def __detect_tv_duplicates(self, files: List[Path], file_stats: Dict[str, Dict],
+                               catalog=None) -> List[Dict]:
+        """检测剧集重复,catalog不为空时同时写入媒体库目录"""
         # 第一步:按(tmdbid或剧名, season, episode)分组,找出重复集
-        episode_groups = defaultdict(list)
-        
+        episode_groups = self.__new_grouper('tv')
+        try:
+            return self.__group_tv_duplicates(files, file_stats, episode_groups, catalog)
+        finally:
+            episode_groups.close()
+
+    def __group_tv_duplicates(self, files: List[Path], file_stats: Dict[str, Dict], episode_groups,
+                              catalog=None) -> List[Dict]:
+        """将剧集文件写入分组器,筛选重复集并按季合并"""
+        # 季 -> 季目录 -> 集号位图及大小,用于季包检测
+        season_folders = defaultdict(dict)
         for file_path in files:
             try:
                 # 提取季集号
                 se_info = self.__extract_season_episode(file_path.name)
-                if not se_info:
-                    continue
-                
-                season, episode = se_info
                 
                 # 获取剧集目录(父目录的父目录)
                 tv_dir = file_path.parent.parent.name
                 
-                # 提取tmdbid或剧名
-                tmdbid = self.__extract_tmdbid(tv_dir)
+                # 提取tmdbid或剧名,目录名中没有时读取tvshow.nfo
+                tmdbid = self.__extract_tmdbid(tv_dir) \
+                    or self.__nfo_tmdbid(file_path.parent.parent, 'tvshow.nfo')
+                file_info = self.__extract_file_info(file_path.name)
+                self.__record_usage(file_path, file_stats, '剧集', file_info)
+                if catalog:
+                    year_match = re.search(r'\((\d{4})\)', tv_dir)
+                    catalog.add(self.__catalog_record(
+                        file_path, file_stats, file_info, 'tv', tmdbid,
+                        re.sub(r'\s*\(\d{4}\).*', '', tv_dir).strip(),
+                        year_match.group(1) if year_match else None,
+                        int(se_info[0]) if se_info else None,
+                        int(se_info[1]) if se_info else None,
+                        se_info[2] if se_info else None
+                    ))
+                if not se_info:
+                    continue
+                
+                season, episode, episode_end = se_info
                 # season和episode已经是zfill(2)格式化的字符串,直接使用
                 if tmdbid:
-                    episode_key = f"tmdb_{tmdbid}_S{season}E{episode}"
+                    season_key = f"tmdb_{tmdbid}_S{season}"
                 else:
                     # 从目录名提取剧名
                     title = re.sub(r'\s*\(\d{4}\).*', '', tv_dir).strip()
-                    episode_key = f"{title}_S{season}E{episode}"
+                    season_key = f"{title}_S{season}"
                 
-                file_info = self.__extract_file_info(file_path.name)
-                file_size = file_path.stat().st_size / (1024 * 1024)  # MB
-                
-                episode_groups[episode_key].append({
+                # 按季分组,同一季内再按集号区间找出重叠的文件
+                episode_groups.add(season_key, {
                     'path': str(file_path),
-                    'size': round(file_size, 2),
+                    **self.__stat_record(file_stats, file_path),
                     'resolution': file_info['resolution'],
                     'source': file_info['source'],
                     'codec': file_info['codec'],
                     'tv_dir': tv_dir,
                     'season': season,
                     'episode': episode,
+                    'episode_range': [int(episode), episode_end],
                     'tmdbid': tmdbid
                 })
+                if self._season_pack:
+                    self.__add_season_folder(season_folders[season_key], file_path, file_stats,
+                                             int(episode), episode_end, tv_dir, season, tmdbid)
             except Exception as e:
                 logger.error(f"处理文件 {file_path} 失败:{str(e)}")
         
-        # 第二步:过滤出有重复的集
-        duplicate_episodes = {k: v for k, v in episode_groups.items() if len(v) >= self._min_duplicate_count}
+        # 第二步:同一季内集号区间重叠的文件为一组,合并硬链接后过滤出有重复的集
+        duplicate_episodes = {}
+        for season_key, season_files in episode_groups.duplicate_groups(self._min_duplicate_count):
+            for file_list in self.__overlapping_episodes(season_files):
+                file_list = self.__collapse_hardlinks(file_list)
+                if len(file_list) >= self._min_duplicate_count:
+                    duplicate_episodes[f"{season_key}E{file_list[0]['episode']}"] = file_list
         
         # 第三步:按剧集+季度合并,将同一季的重复集合并显示
         season_groups = defaultdict(lambda: {
@@ -546,75 +2106,598 @@ class DuplicateDetector(_PluginBase):
             episodes = sorted(list(group_data['episodes']))
             episode_str = ','.join([f"E{ep}" for ep in episodes])
             
-            total_size = sum(f['size'] for f in group_data['files'])
-            
-            duplicates.append({
+            dup = {
                 'type': '剧集',
+                'group_key': f"tv:{season_key}",
                 'title': group_data['title'],
                 'year': group_data['year'],
                 'tmdbid': group_data['tmdbid'],
                 'season': group_data['season'],
                 'episode_str': episode_str,  # 显示用的集号字符串
                 'episode_count': len(episodes),  # 重复集数
-                'count': len(group_data['files']),  # 总文件数
-                'total_size': round(total_size, 2),
                 'files': group_data['files']
-            })
+            }
+            self.__summarize_group(dup)
+            duplicates.append(dup)
+        
+        # 第五步:整季重复的季包
+        if self._season_pack:
+            duplicates.extend(self.__detect_season_packs(season_folders))
         
         return duplicates
 
-    def delete_file(self, file_path: str, apikey: str) -> schemas.Response:
+    @staticmethod
+    def __overlapping_episodes(records: List[Dict]) -> List[List[Dict]]:
+        """
+        集号区间扫描线:区间按起点排序,起点不超过当前分量最大终点的并入该分量,
+        O(n log n)找出区间互相重叠的文件,无需两两比较。
+        单集分量去掉区间字段;多集分量的episode统一为01-E02形式的分量范围,
+        文件保留各自的episode_range,供保留规则按覆盖范围选择
+        """
+        components = []
+        current_end = None
+        for record in sorted(records, key=lambda r: r['episode_range'][0]):
+            start, end = record['episode_range']
+            if components and start <= current_end:
+                components[-1].append(record)
+                current_end = max(current_end, end)
+            else:
+                components.append([record])
+                current_end = end
+        for component in components:
+            first = min(r['episode_range'][0] for r in component)
+            last = max(r['episode_range'][1] for r in component)
+            for record in component:
+                if first == last:
+                    record.pop('episode_range')
+                    record['episode'] = f"{first:02d}"
+                else:
+                    record['episode'] = f"{first:02d}-E{last:02d}"
+        return components
+
+    @staticmethod
+    def __select_keep(files: List[Dict], sort_key) -> List[Dict]:
+        """
+        按排序键依次选择保留的文件,直到覆盖该集(多集分量为全部集号)为止,
+        集号已被保留文件覆盖的文件可删除
+        """
+        keep = []
+        covered = set()
+        for file_info in sorted(files, key=sort_key, reverse=True):
+            start, end = file_info.get('episode_range') or (0, 0)
+            episodes = set(range(start, end + 1))
+            if not keep or not episodes <= covered:
+                keep.append(file_info)
+                covered |= episodes
+        return keep
+
+    @staticmethod
+    def __add_season_folder(folders: Dict[str, Dict], file_path: Path, file_stats: Dict[str, Dict],
+                            episode: int, episode_end: int, tv_dir: str, season: str, tmdbid: Optional[str]):
+        """将剧集文件计入所在季目录:集号记入位图,硬链接文件单独记录inode以免重复计算可释放空间"""
+        folder_path = str(file_path.parent)
+        folder = folders.get(folder_path)
+        if not folder:
+            folder = folders[folder_path] = {
+                'path': folder_path,
+                'tv_dir': tv_dir,
+                'season': season,
+                'tmdbid': tmdbid,
+                'mask': 0,
+                'file_count': 0,
+                'size': 0,
+                'disk_size': 0,
+                'mtime': 0,
+                'linked': {}
+            }
+        stat = file_stats.get(str(file_path))
+        if not stat:
+            return
+        folder['mask'] |= ((1 << (episode_end - episode + 1)) - 1) << episode
+        folder['file_count'] += 1
+        folder['size'] += stat['size']
+        folder['mtime'] = max(folder['mtime'], stat.get('mtime') or 0)
+        if stat['freeable']:
+            folder['disk_size'] += stat['disk_size']
+            if stat['inode'] and stat['nlink'] > 1:
+                folder['linked'][stat['inode']] = stat['disk_size']
+
+    @staticmethod
+    def __format_episodes(mask: int) -> str:
+        """将集号位图格式化为E01-E10,E12形式"""
+        episodes = [ep for ep in range(mask.bit_length()) if mask >> ep & 1]
+        ranges = []
+        for ep in episodes:
+            if ranges and ep == ranges[-1][1] + 1:
+                ranges[-1][1] = ep
+            else:
+                ranges.append([ep, ep])
+        return ','.join(f"E{start:02d}" if start == end else f"E{start:02d}-E{end:02d}" for start, end in ranges)
+
+    def __detect_season_packs(self, season_folders: Dict[str, Dict[str, Dict]]) -> List[Dict]:
+        """
+        季包重复检测:每个季目录的集号集合表示为位图,集合相同的目录按位图哈希直接归组,
+        包含关系只在同一季的少数不同位图之间比较,整体接近线性;
+        每组保留集数最多(其次体积最大)的目录,其余目录计入可释放空间
+        """
+        duplicates = []
+        for season_key, folders in season_folders.items():
+            if len(folders) < self._min_duplicate_count:
+                continue
+            # 只有一集的目录由按集检测覆盖
+            by_mask = defaultdict(list)
+            for folder in folders.values():
+                if folder['mask'].bit_count() >= 2:
+                    by_mask[folder['mask']].append(folder)
+            # 集数多的位图在前,较小的位图归入第一个包含它的集合
+            clusters = []
+            for mask in sorted(by_mask, key=lambda m: m.bit_count(), reverse=True):
+                for cluster_mask, members in clusters:
+                    if mask & cluster_mask == mask:
+                        members.extend(by_mask[mask])
+                        break
+                else:
+                    clusters.append((mask, list(by_mask[mask])))
+            
+            for cluster_mask, members in clusters:
+                if len(members) < self._min_duplicate_count:
+                    continue
+                keep = max((f for f in members if f['mask'] == cluster_mask), key=lambda f: f['size'])
+                reclaimable = 0
+                # 与保留目录或已计入的目录互为硬链接的文件只释放一次空间
+                counted_inodes = set(keep['linked'])
+                for folder in members:
+                    if folder is keep:
+                        continue
+                    reclaimable += folder['disk_size'] - sum(
+                        size for inode, size in folder['linked'].items() if inode in counted_inodes)
+                    counted_inodes.update(folder['linked'])
+                
+                tv_dir = keep['tv_dir']
+                year_match = re.search(r'\((\d{4})\)', tv_dir)
+                episode_count = cluster_mask.bit_count()
+                file_list = [{
+                    'path': folder['path'],
+                    'size': round(folder['size'] / (1024 * 1024), 2),  # MB
+                    'disk_size': round(folder['disk_size'] / (1024 * 1024), 2),  # MB
+                    'size_bytes': folder['size'],
+                    'disk_size_bytes': folder['disk_size'],
+                    'inode': None,
+                    'freeable': True,
+                    'mtime': folder['mtime'],
+                    'links': [],
+                    'is_dir': True,
+                    'file_count': folder['file_count'],
+                    'episode_count': folder['mask'].bit_count(),
+                    'episode_str': self.__format_episodes(folder['mask'])
+                } for folder in sorted(members, key=lambda f: f is not keep)]
+                duplicates.append({
+                    'type': '季包',
+                    'group_key': f"pack:{season_key}_{cluster_mask:x}",
+                    'title': re.sub(r'\s*\(\d{4}\).*', '', tv_dir).strip(),
+                    'year': year_match.group(1) if year_match else None,
+                    'tmdbid': keep['tmdbid'],
+                    'season': keep['season'],
+                    'episode_str': self.__format_episodes(cluster_mask),
+                    'episode_count': episode_count,
+                    'files': file_list,
+                    'count': len(file_list),
+                    'total_bytes': sum(folder['size'] for folder in members),
+                    'total_size': round(sum(folder['size'] for folder in members) / (1024 * 1024), 2),
+                    'reclaimable_bytes': reclaimable,
+                    'reclaimable_size': round(reclaimable / (1024 * 1024), 2)
+                })
+        if duplicates:
+            logger.info(f"发现 {len(duplicates)} 组重复季包")
+        return duplicates
+
+    def delete_file(self, file_path: str, apikey: str) -> schemas.Response:
+        """
+        删除文件API
+        """
+        # 验证API密钥
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        
+        # 硬链接合并后的记录需要删除全部链接才能真正释放空间
+        result = self.__load_result()
+        links = []
+        sync_cloud = True
+        if result:
+            duplicates = result['duplicates']
+            for index in duplicates.locate({file_path}):
+                for f in duplicates[index]['files']:
+                    if f['path'] == file_path:
+                        links = f.get('links') or []
+                        break
+            sync_cloud = file_path not in self.__shared_strm_paths(duplicates)
+        return self.__delete_path(file_path, links, sync_cloud=sync_cloud)
+
+    def delete_item(self, group_id: str, file_id: str) -> schemas.Response:
+        """
+        详情页删除API:按重复组ID和文件ID定位文件,使用登录令牌鉴权
+        """
+        result = self.__load_result()
+        duplicates = result['duplicates'] if result else []
+        for index in range(len(duplicates)):
+            if duplicates.header(index).get('group_id') != group_id:
+                continue
+            for f in duplicates[index]['files']:
+                if not f.get('is_dir') and not f.get('cloud_only') and self.__file_id(f['path']) == file_id:
+                    return self.__delete_path(f['path'], f.get('links') or [],
+                                              sync_cloud=f['path'] not in self.__shared_strm_paths(duplicates))
+        return schemas.Response(success=False, message="文件已不在检测结果中,请刷新页面")
+
+    @staticmethod
+    def __file_id(path: str) -> str:
+        """文件在重复组中的ID,由路径生成,删除其他文件后不变"""
+        return hashlib.md5(path.encode()).hexdigest()[:10]
+
+    @staticmethod
+    def __shared_strm_paths(duplicates) -> Set[str]:
+        """
+        STRM同源组中的STRM路径(含硬链接):这些STRM与其他STRM指向同一个网盘文件,
+        删除其中一个时不能同步删除网盘文件
+        """
+        paths = set()
+        for index in range(len(duplicates)):
+            if duplicates.header(index)['type'] != 'STRM同源':
+                continue
+            for f in duplicates[index]['files']:
+                paths.add(f['path'])
+                paths.update(f.get('links') or [])
+        return paths
+
+    def __delete_path(self, file_path: str, links: List[str], sync_cloud: bool = True) -> schemas.Response:
+        """删除文件及其硬链接,清理空目录并更新检测结果"""
+        try:
+            affected_dirs = self.__delete_entry(file_path, links, sync_cloud=sync_cloud)
+            if affected_dirs is None:
+                return schemas.Response(success=False, message="文件不存在")
+            
+            # 批量检查并删除空文件夹
+            self.__prune_empty_dirs(affected_dirs, storage=self._scan_storage or 'local')
+            
+            # 更新缓存的检测结果
+            self.__remove_from_result({file_path})
+            self.__save_delete_queue()
+            
+            return schemas.Response(success=True, message="文件删除成功")
+        except Exception as e:
+            logger.error(f"删除文件失败: {str(e)}")
+            return schemas.Response(success=False, message=f"删除失败: {str(e)}")
+
+    def __delete_entry(self, file_path: str, links: List[str], sync_cloud: bool = True) -> Optional[Set[Path]]:
+        """
+        删除一条文件记录(含硬链接)并同步删除网盘文件,返回受影响的目录;
+        sync_cloud为False时只删除记录本身(如网盘文件仍被其他STRM引用),主文件不存在时返回None
+        """
+        affected_dirs = set()
+        for path in [file_path, *links]:
+            # 删除文件
+            if not self.__remove_scanned_file(path):
+                if path == file_path:
+                    return None
+                continue
+            affected_dirs.add(Path(path).parent)
+            
+            # 删除了文件后,尝试同步删除网盘对应的文件
+            if sync_cloud:
+                self.__delete_cloud_file(path)
+        return affected_dirs
+
+    def __remove_scanned_file(self, path: str) -> bool:
+        """删除扫描到的文件(本地或扫描存储),文件不存在时返回False"""
+        if not self.__storage(self._scan_storage).delete(path):
+            return False
+        logger.info(f"已删除文件: {path}")
+        return True
+
+    def __remove_from_result(self, deleted_paths: Set[str]):
+        """从缓存的检测结果中移除已删除的文件,并更新各组统计"""
+        with self._result_lock:
+            result = self.__load_result()
+            if not result or not result['duplicates']:
+                return
+            duplicates = result['duplicates']
+            # 季包按目录统计,目录中有文件被删除时整组失效,下次扫描重新计算
+            deleted_dirs = {str(Path(path).parent) for path in deleted_paths}
+            stale_packs = {i for i in duplicates.locate(deleted_dirs) if duplicates.header(i)['type'] == '季包'}
+            # 只解码包含已删除文件的组
+            affected = set(duplicates.locate(deleted_paths)) - stale_packs
+            for index in affected:
+                dup = duplicates[index]
+                # 从文件列表中移除已删除的文件,并更新统计信息
+                dup['files'] = [f for f in dup['files'] if f['path'] not in deleted_paths]
+                if dup['type'] == '剧集':
+                    self.__regroup_episodes(dup)
+                self.__summarize_group(dup)
+            if not affected and not stale_packs:
+                return
+            
+            # 移除失效的季包和文件数小于最小重复数的组
+            kept = [i for i in range(len(duplicates))
+                    if i not in stale_packs and duplicates.header(i)['count'] >= self._min_duplicate_count]
+            result['duplicates'] = duplicates.select(kept)
+            self.__save_result(result)
+            
+            # 同步更新搜索索引:移除的组删除索引项,文件变化的组重新生成词表
+            search_index = self.__get_search_index()
+            kept_set = set(kept)
+            for index in stale_packs | affected:
+                group_id = duplicates.header(index).get('group_id')
+                if index in kept_set:
+                    search_index.add(group_id, self.__group_tokens(duplicates[index]))
+                else:
+                    search_index.remove(group_id)
+            self.save_data('search_index', search_index.to_data())
+
+    def __regroup_episodes(self, dup: Dict):
+        """
+        剧集组删除文件后按剩余文件重新计算集号区间重叠的分量并合并硬链接,
+        去掉不再重复的分量(如删除多集文件后剩下的各单集)
+        """
+        for file_info in dup['files']:
+            if not file_info.get('episode_range'):
+                # 单集分量的文件只保存集号
+                episode = int(file_info['episode'])
+                file_info['episode_range'] = [episode, episode]
+        parts = [self.__collapse_hardlinks(part) for part in self.__overlapping_episodes(dup['files'])]
+        parts = [part for part in parts if len(part) >= self._min_duplicate_count]
+        episodes = sorted({part[0]['episode'] for part in parts})
+        dup['files'] = [file_info for part in parts for file_info in part]
+        dup['episode_str'] = ','.join(f"E{episode}" for episode in episodes)
+        dup['episode_count'] = len(episodes)
+
+    @staticmethod
+    def __keep_sort_key(file_info: Dict, keep_rule: str) -> Tuple:
+        """保留规则的排序键,值越大越优先保留"""
+        resolution_rank = {'2160p': 4, '1080p': 3, '720p': 2, '480p': 1}
+        resolution = resolution_rank.get((file_info.get('resolution') or '').lower(), 0)
+        size = file_info.get('size') or 0
+        mtime = file_info.get('mtime') or 0
+        if keep_rule == 'size':
+            return size, resolution, mtime
+        if keep_rule == 'mtime':
+            return mtime, resolution, size
+        return resolution, size, mtime
+
+    def __plan_cleanup(self, duplicates: List[Dict], keep_rule: str, shared_strm: Set[str]) -> List[Dict]:
+        """
+        按保留规则生成删除计划:每组(剧集为每一集)保留一个文件,其余删除;
+        shared_strm为全部STRM同源组中的STRM路径
+        """
+        plan = []
+        for dup in duplicates:
+            # 季包中的文件已包含在按集检测的重复组中;网盘同内容组可能含无STRM的网盘文件,只手动删除;
+            # STRM同源组的STRM共用同一个网盘文件,只手动删除
+            if dup['type'] in ('季包', '网盘同内容', 'STRM同源'):
+                continue
+            partitions = defaultdict(list)
+            for file_info in dup['files']:
+                partitions[file_info.get('episode')].append(file_info)
+            for part in partitions.values():
+                if len(part) < 2:
+                    continue
+                keep = self.__select_keep(part, lambda f: self.__keep_sort_key(f, keep_rule))
+                for file_info in part:
+                    if any(file_info is k for k in keep):
+                        continue
+                    plan.append({
+                        'group_id': dup.get('group_id'),
+                        'title': dup['title'],
+                        'path': file_info['path'],
+                        'links': file_info.get('links') or [],
+                        'size': file_info['size'],
+                        'reclaimable': file_info.get('disk_size', 0) if file_info.get('freeable') else 0,
+                        'keep': keep[0]['path'],
+                        # 同时属于STRM同源组的STRM不同步删除网盘文件
+                        'sync_cloud': file_info['path'] not in shared_strm
+                    })
+        return plan
+
+    def clean_all(self, apikey: str, keep: str = None, dry_run: bool = True, view: str = 'all',
+                  token: str = None) -> schemas.Response:
+        """
+        批量清理API:dry_run为True时按保留规则和显示范围(new/changed/all)生成删除计划并返回确认令牌,
+        dry_run为False时须提供令牌,执行预览过的删除计划;检测结果在预览后有变化时须重新预览
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        if self._clean_thread and self._clean_thread.is_alive():
+            return schemas.Response(success=False, message="已有清理任务正在执行")
+        
+        if not dry_run:
+            plan = self._clean_plan
+            if not plan or not token or token != plan['token']:
+                return schemas.Response(success=False, message="请先预览批量清理,确认删除计划后再执行")
+            if plan['version'] != self._result_version:
+                self._clean_plan = None
+                return schemas.Response(success=False, message="检测结果已变化,请重新预览批量清理")
+            self._clean_plan = None
+            self._clean_progress = {
+                'status': 'running',
+                'dry_run': False,
+                'keep': plan['keep'],
+                'view': plan['view'],
+                'total': len(plan['items']),
+                'done': 0,
+                'failed': 0,
+                'freed_size': 0,
+                'planned_size': plan['planned_size'],
+                'errors': [],
+                'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'finished': None
+            }
+            self._clean_thread = threading.Thread(target=self.__execute_cleanup, args=(plan['items'],),
+                                                  name="DuplicateDetector-clean", daemon=True)
+            self._clean_thread.start()
+            return schemas.Response(success=True, message=f"开始清理 {len(plan['items'])} 个文件",
+                                    data=self._clean_progress)
+        
+        keep_rule = keep or self._clean_keep_rule
+        if keep_rule not in ('resolution', 'size', 'mtime'):
+            return schemas.Response(success=False, message=f"不支持的保留规则: {keep_rule}")
+        if view not in ('new', 'changed', 'all'):
+            return schemas.Response(success=False, message=f"不支持的显示范围: {view}")
+        result = self.__load_result()
+        if not result or not result['duplicates']:
+            return schemas.Response(success=False, message="暂无重复文件")
+        
+        duplicates = result['duplicates']
+        indexes = self.__view_indexes(duplicates.headers(), view)
+        items = self.__plan_cleanup(duplicates.select(indexes), keep_rule, self.__shared_strm_paths(duplicates))
+        self._clean_plan = {
+            'token': uuid.uuid4().hex,
+            'version': self._result_version,
+            'keep': keep_rule,
+            'view': view,
+            'group_count': len(indexes),
+            'items': items,
+            'planned_size': round(sum(item['reclaimable'] for item in items), 2)
+        }
+        self._clean_progress = {
+            'status': 'finished',
+            'dry_run': True,
+            'keep': keep_rule,
+            'view': view,
+            'total': len(items),
+            'done': 0,
+            'failed': 0,
+            'freed_size': 0,
+            'planned_size': self._clean_plan['planned_size'],
+            'errors': [],
+            'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'finished': None,
+            'plan': items,
+            'token': self._clean_plan['token']
+        }
+        return schemas.Response(success=True,
+                                message=f"预计删除 {len(items)} 个文件,"
+                                        f"可释放 {self._clean_plan['planned_size']:.2f} MB,确认后使用令牌执行清理",
+                                data=self._clean_progress)
+
+    @staticmethod
+    def __view_indexes(headers: List[Dict], view: str) -> List[int]:
+        """显示范围内的重复组序号,旧结果没有diff_state时视为新增"""
+        visible_states = {'new': {'new'}, 'changed': {'new', 'changed'}}.get(view)
+        if not visible_states:
+            return list(range(len(headers)))
+        return [i for i, d in enumerate(headers) if d.get('diff_state', 'new') in visible_states]
+
+    def clean_progress(self, apikey: str) -> schemas.Response:
+        """
+        批量清理进度API
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        if not self._clean_progress:
+            return schemas.Response(success=False, message="暂无清理任务")
+        return schemas.Response(success=True, data=self._clean_progress)
+
+    def __execute_cleanup(self, plan: List[Dict]):
+        """
+        分批执行删除计划:每批clean_concurrency个文件,先通过存储后端批量删除主文件,再批量删除其硬链接,
+        并发数受clean_concurrency和存储后端自身的并发上限限制
+        """
+        storage = self._scan_storage or 'local'
+        backend = self.__storage(storage)
+        progress = self._clean_progress
+        deleted_paths = set()
+        affected_dirs = set()
+        
+        def fail(item: Dict, error: str):
+            logger.error(f"清理文件失败: {item['path']} - {error}")
+            progress['failed'] += 1
+            progress['errors'] = [*progress['errors'], {'path': item['path'], 'error': error}][-100:]
+        
+        logger.info(f"开始批量清理重复文件,共 {len(plan)} 个,保留规则: {progress['keep']}")
+        for start in range(0, len(plan), self._clean_concurrency):
+            batch = plan[start:start + self._clean_concurrency]
+            # 存储后端的信号量同时限制与扫描、同步删除等其他操作的总并发;主文件已不存在时不再删除其硬链接
+            results = backend.delete_many(item['path'] for item in batch)
+            link_results = backend.delete_many(link for item in batch if results[item['path']] is True
+                                               for link in item['links'])
+            for item in batch:
+                progress['done'] += 1
+                result = results[item['path']]
+                if isinstance(result, Exception):
+                    fail(item, str(result))
+                    continue
+                deleted_paths.add(item['path'])
+                if not result:
+                    # 文件已不存在,视为已清理
+                    continue
+                removed = [item['path']]
+                errors = []
+                for link in item['links']:
+                    if isinstance(link_results[link], Exception):
+                        errors.append(f"{link}: {link_results[link]}")
+                    elif link_results[link]:
+                        removed.append(link)
+                for path in removed:
+                    logger.info(f"已删除文件: {path}")
+                    affected_dirs.add(Path(path).parent)
+                    if item.get('sync_cloud', True):
+                        self.__delete_cloud_file(path)
+                if errors:
+                    fail(item, '; '.join(errors))
+                else:
+                    progress['freed_size'] = round(progress['freed_size'] + item['reclaimable'], 2)
+        
+        # 批量清理空目录并一次性更新检测结果
+        self.__prune_empty_dirs(affected_dirs, storage=storage)
+        self.__remove_from_result(deleted_paths)
+        # 本次清理加入的网盘删除任务一次性保存
+        self.__save_delete_queue()
+        progress['status'] = 'finished'
+        progress['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        logger.info(f"批量清理完成:删除 {progress['done'] - progress['failed']} 个,失败 {progress['failed']} 个,"
+                    f"释放 {progress['freed_size']:.2f} MB")
+    
+    def catalog_query(self, apikey: str, media_type: str = None, resolution: str = None, source: str = None,
+                      codec: str = None, tmdbid: str = None, keyword: str = None, order: str = 'path',
+                      limit: int = 100, offset: int = 0) -> schemas.Response:
+        """
+        媒体库目录查询API
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        try:
+            data = self.__get_catalog().query(media_type=media_type, resolution=resolution, source=source,
+                                              codec=codec, tmdbid=tmdbid, keyword=keyword, order=order,
+                                              limit=min(int(limit), 1000), offset=int(offset))
+            return schemas.Response(success=True, data=data)
+        except Exception as e:
+            logger.error(f"查询媒体库目录失败: {str(e)}")
+            return schemas.Response(success=False, message=f"查询失败: {str(e)}")
+
+    def catalog_largest(self, apikey: str, media_type: str = None, limit: int = 50) -> schemas.Response:
+        """
+        占用空间最大的作品API
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        try:
+            data = self.__get_catalog().largest_titles(media_type=media_type, limit=min(int(limit), 1000))
+            return schemas.Response(success=True, data=data)
+        except Exception as e:
+            logger.error(f"查询媒体库目录失败: {str(e)}")
+            return schemas.Response(success=False, message=f"查询失败: {str(e)}")
+
+    def catalog_missing(self, apikey: str, limit: int = 100) -> schemas.Response:
         """
-        删除文件API
+        缺集剧集API
         """
-        # 验证API密钥
         if apikey != settings.API_TOKEN:
             return schemas.Response(success=False, message="API密钥错误")
-        
         try:
-            from pathlib import Path
-            import os
-            
-            file = Path(file_path)
-            if not file.exists():
-                return schemas.Response(success=False, message="文件不存在")
-            
-            # 删除文件
-            os.remove(file_path)
-            logger.info(f"已删除文件: {file_path}")
-            
-            # 检查并删除空文件夹
-            parent_dir = file.parent
-            self.__remove_empty_dirs(parent_dir)
-            
-            # 删除了文件后,尝试同步删除网盘对应的文件
-            self.__delete_cloud_file(file_path)
-            
-            # 更新缓存的检测结果
-            result = self.get_data('detection_result')
-            if result and result.get('duplicates'):
-                updated = False
-                for dup in result['duplicates']:
-                    # 从文件列表中移除已删除的文件
-                    original_count = len(dup['files'])
-                    dup['files'] = [f for f in dup['files'] if f['path'] != file_path]
-                    if len(dup['files']) < original_count:
-                        # 更新统计信息
-                        dup['count'] = len(dup['files'])
-                        dup['total_size'] = round(sum(f['size'] for f in dup['files']), 2)
-                        updated = True
-                
-                # 移除文件数小于最小重复数的组
-                result['duplicates'] = [d for d in result['duplicates'] if d['count'] >= self._min_duplicate_count]
-                
-                if updated:
-                    self.save_data('detection_result', result)
-            
-            return schemas.Response(success=True, message="文件删除成功")
+            data = self.__get_catalog().missing_episodes(limit=min(int(limit), 1000))
+            return schemas.Response(success=True, data=data)
         except Exception as e:
-            logger.error(f"删除文件失败: {str(e)}")
-            return schemas.Response(success=False, message=f"删除失败: {str(e)}")
-    
+            logger.error(f"查询媒体库目录失败: {str(e)}")
+            return schemas.Response(success=False, message=f"查询失败: {str(e)}")
+
     def __run_detection(self):
         """运行重复检测"""
         if not self._scan_paths:
@@ -625,49 +2708,899 @@ class DuplicateDetector(_PluginBase):
         scan_paths = [p.strip() for p in self._scan_paths.split('\n') if p.strip()]
         extensions = [e.strip() for e in self._file_extensions.split(',') if e.strip()]
         
+        self.__start_live()
         all_duplicates = []
+        usages = []
+        self._usage = None
+        self._usage_inodes = set()
+        self._scan_paused = False
+        self._scan_deadline = None
+        if self._scan_time_budget:
+            if self._checkpoint_interval:
+                self._scan_deadline = time.time() + self._scan_time_budget * 60
+            else:
+                logger.warning("未启用扫描检查点,扫描时间片不生效")
+        self._io_tokens = self._scan_io_rate
+        self._io_last = time.monotonic()
+        self._nfo_cache = self.get_data('nfo_tmdbid_cache') or {}
+        self._nfo_dir_cache = {}
+        self._nfo_cache_used = {}
+        self._checkpoint = self.__load_checkpoint(self.__checkpoint_signature(scan_paths, extensions))
+        sampling = self._sample_rate < 100
+        if sampling:
+            logger.info(f"抽样扫描:只扫描按作品名抽中的 {self._sample_rate:g}% 一级目录,"
+                        f"结果单独保存,不更新检测结果、搜索索引、媒体库目录和扫描差异")
+        catalog = None
+        if self._catalog_enabled and not sampling:
+            try:
+                catalog = self.__get_catalog()
+                catalog.prune_scan_paths(scan_paths)
+            except Exception as e:
+                logger.error(f"打开媒体库目录失败:{str(e)}")
+                catalog = None
         
         for scan_path in scan_paths:
+            # 检查点中已完成的扫描路径直接使用保存的结果
+            completed = self._checkpoint['completed'].get(scan_path)
+            if completed is not None:
+                logger.info(f"扫描路径 {scan_path} 已在检查点中完成,跳过")
+                all_duplicates.extend(completed)
+                self.__publish_groups(completed)
+                usages.append(self._checkpoint.get('usage', {}).get(scan_path) or {})
+                continue
+            current = self._checkpoint.get('current')
+            resume = current if current and current.get('scan_path') == scan_path else None
+            
             logger.info(f"扫描路径:{scan_path}")
-            files = self.__scan_files(scan_path, extensions)
+            self._live_partial = {'scan_path': scan_path, 'time': time.monotonic(), 'count': 0,
+                                  'stats': {}, 'ids': set()}
+            if self._scan_storage and self._scan_storage != 'local':
+                # 远程存储直接枚举,文件状态取自列举结果
+                files, file_stats = self.__scan_storage_files(scan_path, extensions, resume, sampled=sampling)
+            else:
+                files = self.__scan_files(scan_path, extensions, resume, sampled=sampling)
+                # 统一获取文件状态(大小/inode),供硬链接识别和空间统计使用
+                file_stats = {}
+                if not self._scan_paused:
+                    # 阶段性发布时已获取的文件状态直接复用
+                    file_stats = self.__stat_files(files, {**((resume or {}).get('file_stats') or {}),
+                                                           **self._live_partial['stats']})
+                    if self._scan_paused:
+                        # 目录已遍历完,检查点中保存已获取的文件状态
+                        self.__save_checkpoint(scan_path, lambda: {
+                            'pending_dirs': [],
+                            'files': files,
+                            'file_stats': file_stats
+                        }, force=True)
+            
+            if self._scan_paused:
+                logger.info(f"扫描在 {scan_path} 处暂停(已发现 {len(files)} 个文件),"
+                            f"下次扫描从检查点继续")
+                return
             
             if not files:
+                self.__complete_checkpoint_path(scan_path, [])
                 continue
             
-            # 根据扫描类型执行检测
-            if self._scan_type == 'movie':
-                duplicates = self.__detect_movie_duplicates(files)
-            elif self._scan_type == 'tv':
-                duplicates = self.__detect_tv_duplicates(files)
-            else:  # auto
-                # 简单判断:如果路径包含Season字样,视为剧集
-                tv_files = [f for f in files if 'Season' in str(f)]
-                movie_files = [f for f in files if f not in tv_files]
-                
-                duplicates = []
-                if movie_files:
-                    duplicates.extend(self.__detect_movie_duplicates(movie_files))
-                if tv_files:
-                    duplicates.extend(self.__detect_tv_duplicates(tv_files))
+            catalog_writer = catalog.open_scan(scan_path) if catalog else None
+            # 空间占用在分组时随文件信息解析一并累计
+            self._usage = {'type': {}, 'resolution': {}, 'codec': {}, 'folder': {}}
+            self._usage_root = Path(scan_path)
+            try:
+                duplicates = self.__detect_duplicates(files, file_stats, catalog_writer)
+                if catalog_writer:
+                    catalog_writer.commit()
+            except Exception:
+                if catalog_writer:
+                    catalog_writer.rollback()
+                raise
+            finally:
+                usage, self._usage = self._usage, None
             
+            # STRM同源检测:不同文件名但指向同一目标的STRM
+            if self._strm_target_dedup:
+                strm_files = [f for f in files if f.suffix.lower() == '.strm']
+                if strm_files:
+                    if self._scan_storage and self._scan_storage != 'local':
+                        logger.warning("远程扫描模式下不读取STRM内容,跳过STRM同源检测")
+                    else:
+                        duplicates.extend(self.__detect_strm_target_duplicates(scan_path, strm_files, file_stats,
+                                                                               sampled=sampling))
+            
+            for dup in duplicates:
+                # 同一媒体可能出现在多个扫描路径中,组ID包含扫描路径
+                dup['group_id'] = hashlib.md5(f"{scan_path}|{dup['group_key']}".encode()).hexdigest()[:12]
             all_duplicates.extend(duplicates)
+            # 以最终结果更新本路径阶段性发布的组
+            self.__publish_groups(duplicates, replaced=self._live_partial['ids'])
+            self._live_partial = None
+            usages.append(usage)
+            self.__complete_checkpoint_path(scan_path, duplicates, usage)
+        
+        # 网盘同内容检测只使用列举得到的元数据,不参与检查点;抽样扫描时跳过
+        if self._cloud_content_dedup and not sampling:
+            if self._strm_library_path and self._cloud_library_path:
+                try:
+                    cloud_duplicates = self.__detect_cloud_content_duplicates()
+                    all_duplicates.extend(cloud_duplicates)
+                    self.__publish_groups(cloud_duplicates)
+                except Exception as e:
+                    logger.error(f"网盘同内容检测失败:{str(e)}")
+            else:
+                logger.warning("未配置STRM库路径或网盘映射路径,跳过网盘同内容检测")
+        
+        # 全部扫描完成,清除检查点
+        self.__clear_checkpoint()
+        if self._nfo_tmdbid:
+            # 只保留本次扫描用到的NFO,已删除的NFO不再保留;抽样扫描只访问了部分目录,保留原有缓存
+            self.save_data('nfo_tmdbid_cache',
+                           {**self._nfo_cache, **self._nfo_cache_used} if sampling else self._nfo_cache_used)
+        self._nfo_dir_cache = {}
+        self._nfo_cache_used = {}
+        
+        # 与上次扫描结果对比,抽样结果不与完整扫描比较,也不覆盖保存的指纹
+        scan_diff = self.__diff_with_previous(all_duplicates) if not sampling else {}
         
         # 保存结果
         result = {
             'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'scan_paths': scan_paths,
-            'duplicates': all_duplicates
+            'duplicates': all_duplicates,
+            'diff': scan_diff,
+            'analytics': self.__merge_usage(usages)
+        }
+        if sampling:
+            # 抽样结果单独保存,完整扫描的检测结果和搜索索引保持不变
+            result['sample'] = self.__estimate_from_sample(scan_paths, all_duplicates)
+            self.save_data('sample_result', encode_result(result))
+            self._result_version += 1
+        else:
+            self.__save_result(result)
+            self.__build_search_index(all_duplicates)
+        self.__finish_live()
+        
+        if sampling:
+            estimate = result['sample']
+            logger.info(f"抽样扫描完成,抽中 {estimate['sampled_folders']}/{estimate['folders']} 个目录,"
+                        f"发现 {len(all_duplicates)} 组重复文件,估算全库 {estimate['groups']['estimate']:g} 组,"
+                        f"可释放 {estimate['reclaimable_size']['estimate']:.2f} MB")
+        else:
+            logger.info(f"重复文件扫描完成,发现 {len(all_duplicates)} 组重复文件,"
+                        f"新增 {len(scan_diff['new'])} 组,变化 {len(scan_diff['changed'])} 组,"
+                        f"已解决 {len(scan_diff['resolved'])} 组")
+
+    def __in_sample(self, folder_name: str) -> bool:
+        """
+        按作品名(去掉年份及其后的部分)的哈希确定性抽样,每次扫描抽中的目录相同,
+        同一作品的不同版本目录同时抽中或同时跳过
+        """
+        title = re.sub(r'\s*\(\d{4}\).*', '', folder_name).strip().lower() or folder_name.lower()
+        bucket = int(hashlib.md5(title.encode()).hexdigest()[:8], 16) / 0x100000000
+        return bucket * 100 < self._sample_rate
+
+    def __top_folders(self, scan_path: str) -> List[str]:
+        """扫描路径下未被排除的一级目录名"""
+        try:
+            entries = self.__storage(self._scan_storage).list_dir(scan_path) or []
+            names = [entry.name for entry in entries if entry.is_dir]
+        except Exception as e:
+            logger.warning(f"读取一级目录失败:{scan_path} - {str(e)}")
+            return []
+        return [name for name in names if not self.__is_excluded(name, name)]
+
+    def __estimate_from_sample(self, scan_paths: List[str], duplicates: List[Dict]) -> Dict[str, Any]:
+        """
+        由抽样结果估算全库:一级目录为抽样单元,重复组按第一个文件归入所在的一级目录,
+        用单元均值外推重复组数和可释放空间,给出含有限总体校正的95%置信区间;
+        扫描路径根目录下的文件全部扫描,直接计入估算值
+        """
+        units = {}
+        total_units = 0
+        for scan_path in scan_paths:
+            folders = self.__top_folders(scan_path)
+            total_units += len(folders)
+            for name in folders:
+                if self.__in_sample(name):
+                    units[(scan_path, name)] = [0, 0.0]
+        certain = [0, 0.0]
+        for dup in duplicates:
+            # 季包与按集检测的组重复
+            if dup['type'] == '季包':
+                continue
+            file_path = Path(dup['files'][0]['path'])
+            unit = certain
+            for scan_path in scan_paths:
+                if file_path.is_relative_to(scan_path):
+                    parts = file_path.relative_to(scan_path).parts
+                    if len(parts) > 1:
+                        unit = units.get((scan_path, parts[0]), certain)
+                    break
+            unit[0] += 1
+            unit[1] += dup.get('reclaimable_size', 0)
+        
+        sampled = len(units)
+        estimate = {'rate': self._sample_rate, 'folders': total_units, 'sampled_folders': sampled}
+        for index, key in ((0, 'groups'), (1, 'reclaimable_size')):
+            values = [unit[index] for unit in units.values()]
+            observed = sum(values) + certain[index]
+            if not sampled:
+                estimate[key] = {'observed': round(observed, 2), 'estimate': round(observed, 2),
+                                 'low': None, 'high': None}
+                continue
+            mean = sum(values) / sampled
+            total = total_units * mean + certain[index]
+            low = high = None
+            if sampled > 1:
+                variance = sum((v - mean) ** 2 for v in values) / (sampled - 1)
+                margin = 1.96 * total_units * math.sqrt((1 - sampled / total_units) * variance / sampled)
+                # 已发现的重复不会少于实际观测值
+                low = round(max(total - margin, observed), 2)
+                high = round(total + margin, 2)
+            estimate[key] = {'observed': round(observed, 2), 'estimate': round(total, 2), 'low': low, 'high': high}
+        return estimate
+
+    def __run_scan(self):
+        """
+        执行一次扫描,同一时间只运行一个扫描;低优先级扫描在独立线程中运行,
+        避免降低调度器工作线程的优先级
+        """
+        if not self._scan_lock.acquire(blocking=False):
+            logger.warning("已有扫描正在执行,跳过本次扫描")
+            return
+        try:
+            if self._scan_low_priority:
+                scan_thread = threading.Thread(target=self.__run_low_priority_detection,
+                                               name="DuplicateDetector-scan", daemon=True)
+                scan_thread.start()
+                scan_thread.join()
+            else:
+                self.__run_detection()
+        finally:
+            # 暂停或异常退出时同样结束增量结果
+            self.__finish_live(paused=self._scan_paused)
+            self._scan_lock.release()
+
+    def __run_low_priority_detection(self):
+        self.__lower_thread_priority()
+        self.__run_detection()
+
+    @staticmethod
+    def __lower_thread_priority():
+        """将当前线程的nice调为19、I/O优先级调为best-effort最低级,仅Linux下对单个线程生效"""
+        tid = threading.get_native_id()
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"设置扫描线程CPU优先级失败:{str(e)}")
+        try:
+            import psutil
+            psutil.Process(tid).ionice(psutil.IOPRIO_CLASS_BE, value=7)
+        except Exception as e:
+            logger.debug(f"设置扫描线程I/O优先级失败:{str(e)}")
+
+    def __throttle_io(self):
+        """
+        扫描I/O限速(令牌桶):每次目录读取、文件stat或读取NFO/STRM内容消耗一个令牌,令牌按scan_io_rate每秒补充,
+        最多积攒一秒的量;令牌不足时预支并在锁外等待,多个列举线程共享同一个桶
+        """
+        if not self._scan_io_rate:
+            return
+        with self._io_lock:
+            now = time.monotonic()
+            self._io_tokens = min(self._scan_io_rate,
+                                  self._io_tokens + (now - self._io_last) * self._scan_io_rate) - 1
+            self._io_last = now
+            delay = -self._io_tokens / self._scan_io_rate if self._io_tokens < 0 else 0
+        if delay:
+            time.sleep(delay)
+
+    def __scan_time_up(self) -> bool:
+        """本次扫描的时间片是否已用完,插件停止时同样视为用完"""
+        if self._scan_deadline and time.time() >= self._scan_deadline:
+            self._scan_paused = True
+        return self._scan_paused
+
+    def __load_result(self) -> Optional[Dict[str, Any]]:
+        """读取检测结果,duplicates为按需解码的重复组列表"""
+        stored = self.get_data('detection_result')
+        return decode_result(stored) if stored else None
+
+    def __load_sample_result(self) -> Optional[Dict[str, Any]]:
+        """读取最近一次抽样扫描的结果"""
+        stored = self.get_data('sample_result')
+        return decode_result(stored) if stored else None
+
+    def __save_result(self, result: Dict[str, Any]):
+        """以紧凑压缩格式保存检测结果并递增结果版本,详情页缓存随之失效"""
+        self.save_data('detection_result', encode_result(result))
+        self._result_version += 1
+
+    @staticmethod
+    def __group_tokens(dup: Dict) -> Set[str]:
+        """重复组的索引词:标题、TMDB ID、季号,以及组内文件路径(含硬链接)的每一段"""
+        from .searchindex import tokenize
+        tokens = set(tokenize(dup.get('title') or ''))
+        if dup.get('tmdbid'):
+            tokens.add(str(dup['tmdbid']))
+        if dup.get('season'):
+            tokens.add(f"s{dup['season']}")
+        if dup.get('target'):
+            tokens.update(tokenize(dup['target']))
+        segments = set()
+        for f in dup.get('files') or []:
+            for path in [f['path'], *(f.get('links') or [])]:
+                segments.update(Path(path).parts)
+        for segment in segments:
+            tokens.update(tokenize(segment))
+        return tokens
+
+    def __build_search_index(self, duplicates: Iterable[Dict]):
+        """扫描完成后重建搜索索引并保存各组词表"""
+        from .searchindex import SearchIndex
+        with self._result_lock:
+            search_index = SearchIndex()
+            for dup in duplicates:
+                search_index.add(dup['group_id'], self.__group_tokens(dup))
+            self._search_index = search_index
+            self.save_data('search_index', search_index.to_data())
+
+    def __get_search_index(self) -> 'SearchIndex':
+        """读取搜索索引,旧版本没有保存索引时由检测结果生成"""
+        from .searchindex import SearchIndex
+        if self._search_index is None:
+            documents = self.get_data('search_index')
+            if documents is not None:
+                self._search_index = SearchIndex(documents)
+            else:
+                result = self.__load_result()
+                search_index = SearchIndex()
+                for dup in (result['duplicates'] if result else []):
+                    if dup.get('group_id'):
+                        search_index.add(dup['group_id'], self.__group_tokens(dup))
+                self._search_index = search_index
+        return self._search_index
+
+    def search(self, apikey: str, keyword: str, detail: bool = False) -> schemas.Response:
+        """
+        搜索API:返回匹配的重复组ID,detail为True时附带各组摘要
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        if not keyword or not keyword.strip():
+            return schemas.Response(success=False, message="请输入搜索关键字")
+        
+        with self._result_lock:
+            group_ids = self.__get_search_index().search(keyword)
+        data = {'keyword': keyword, 'total': len(group_ids), 'group_ids': sorted(group_ids)}
+        if detail and group_ids:
+            result = self.__load_result()
+            data['groups'] = [
+                self.__group_summary(header)
+                for header in (result['duplicates'].headers() if result else [])
+                if header.get('group_id') in group_ids
+            ]
+        return schemas.Response(success=True, data=data)
+
+    @staticmethod
+    def __group_summary(dup: Dict) -> Dict[str, Any]:
+        """重复组摘要,不含文件列表"""
+        return {key: dup.get(key) for key in ('group_id', 'type', 'title', 'year', 'tmdbid', 'season',
+                                              'episode_str', 'count', 'total_size', 'reclaimable_size')}
+
+    def __start_live(self):
+        """开始新一次扫描的增量结果,旧的游标随之失效"""
+        self._live_partial = None
+        with self._live_lock:
+            self._live_scan = {'scan_id': uuid.uuid4().hex[:8], 'groups': [], 'latest': {}, 'finished': False}
+
+    def __publish_groups(self, duplicates: List[Dict], replaced: Iterable[str] = ()):
+        """
+        发布重复组,页面通过/scan_delta增量获取;同一组再次发布时以最新一条为准,
+        replaced为之前阶段性发布的组ID,其中不再重复的组追加removed记录
+        """
+        with self._live_lock:
+            live = self._live_scan
+            if not live or live['finished']:
+                return
+            for dup in duplicates:
+                previous = live['latest'].get(dup['group_id'])
+                if previous and previous.get('partial') and dup.get('partial') and \
+                        previous['reclaimable_size'] == dup['reclaimable_size'] and \
+                        {f['path'] for f in previous['files']} == {f['path'] for f in dup['files']}:
+                    # 阶段性结果没有变化,不重复发布
+                    continue
+                live['latest'][dup['group_id']] = dup
+                live['groups'].append(dup)
+            current = {dup['group_id'] for dup in duplicates}
+            for group_id in replaced:
+                if group_id not in current and live['latest'].pop(group_id, None) is not None:
+                    live['groups'].append({'group_id': group_id, 'removed': True})
+
+    def __publish_partial(self, scan_path: str, files: List[Path], file_stats: Optional[Dict[str, Dict]] = None):
+        """
+        扫描路径遍历中按检查点间隔发布已发现文件中的重复组(partial),后续目录可能为组增加文件,
+        路径完成后以最终结果更新;已发现的文件数比上次发布时翻倍才重新分组,
+        整个路径的阶段性分组开销不超过完整分组的两倍。本地扫描时顺带获取的文件状态供之后复用
+        """
+        partial = self._live_partial
+        if not partial or partial['scan_path'] != scan_path or len(files) < max(partial['count'] * 2, 2) \
+                or time.monotonic() - partial['time'] < (self._checkpoint_interval or 60):
+            return
+        try:
+            if file_stats is None:
+                partial['stats'] = self.__stat_files(files, partial['stats'])
+                file_stats = partial['stats']
+                files = [f for f in files if str(f) in file_stats]
+                if self._scan_paused:
+                    return
+            duplicates = self.__detect_duplicates(files, file_stats)
+        except Exception as e:
+            logger.warning(f"阶段性发布重复组失败:{str(e)}")
+            return
+        finally:
+            partial['count'] = len(files)
+            partial['time'] = time.monotonic()
+        for dup in duplicates:
+            dup['group_id'] = hashlib.md5(f"{scan_path}|{dup['group_key']}".encode()).hexdigest()[:12]
+            dup['partial'] = True
+        self.__publish_groups(duplicates, replaced=partial['ids'])
+        partial['ids'] = {dup['group_id'] for dup in duplicates}
+
+    def __finish_live(self, paused: bool = False):
+        with self._live_lock:
+            if self._live_scan:
+                self._live_scan['finished'] = True
+                self._live_scan['paused'] = paused
+
+    def scan_delta(self, apikey: str, cursor: str = '', limit: int = 200,
+                   detail: bool = False) -> schemas.Response:
+        """
+        扫描增量结果API:返回cursor之后新发布或更新的重复组及新的cursor,同一group_id以最后一条为准,
+        partial为True的组来自进行中的扫描路径,removed为True表示该组已不再重复;
+        cursor属于之前的扫描时从头返回并标记reset,detail为True时附带文件列表
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        with self._live_lock:
+            live = self._live_scan
+            if not live:
+                return schemas.Response(success=False, message="暂无进行中或最近完成的扫描")
+            scan_id, _, offset = (cursor or '').partition(':')
+            reset = scan_id != live['scan_id']
+            start = 0 if reset or not offset.isdigit() else min(int(offset), len(live['groups']))
+            groups = live['groups'][start:start + max(int(limit), 1)]
+            data = {
+                'cursor': f"{live['scan_id']}:{start + len(groups)}",
+                'reset': reset and bool(cursor),
+                'total': len(live['latest']),
+                'finished': live['finished'],
+                'paused': live.get('paused', False),
+                'groups': [dup if detail or dup.get('removed') else
+                           {**self.__group_summary(dup), 'partial': dup.get('partial', False)} for dup in groups]
+            }
+        return schemas.Response(success=True, data=data)
+
+    def __live_alerts(self) -> List[dict]:
+        """扫描进行中的提示,显示已完成的重复组数"""
+        live = self._live_scan
+        if not live or live['finished']:
+            return []
+        groups = list(live['latest'].values())
+        return [
+            {
+                'component': 'VAlert',
+                'props': {
+                    'type': 'info',
+                    'variant': 'tonal',
+                    'density': 'compact',
+                    'class': 'mb-2',
+                    'text': f'扫描进行中:已发现 {len(groups)} 组重复'
+                            f'(可释放 {self.__format_size(sum(d.get("reclaimable_size", 0) for d in groups))}),'
+                            f'下方为上次扫描结果,扫描完成后自动更新'
+                }
+            }
+        ]
+
+    def __checkpoint_dir(self) -> Path:
+        """
+        检查点目录:state.json保存配置摘要、已完成的扫描路径和当前路径的待遍历目录;
+        当前路径已发现的文件和文件状态逐行追加到files.jsonl/stats.jsonl,已完成路径的结果各存一个文件
+        """
+        return Path(self.get_data_path()) / "scan_checkpoint"
+
+    @staticmethod
+    def __completed_file(checkpoint_dir: Path, scan_path: str) -> Path:
+        return checkpoint_dir / f"done_{hashlib.md5(scan_path.encode()).hexdigest()[:12]}.json"
+
+    def __checkpoint_signature(self, scan_paths: List[str], extensions: List[str]) -> str:
+        """影响扫描结果的配置摘要,配置变化后旧检查点失效"""
+        return hashlib.md5(json.dumps([
+            scan_paths, extensions, self._scan_type, self._scan_storage, self._exclude_rules,
+            self._follow_symlinks, self._one_filesystem, self._strm_target_dedup, self._season_pack,
+            self._min_duplicate_count, self._sample_rate
+        ], ensure_ascii=False).encode()).hexdigest()
+
+    def __load_checkpoint(self, signature: str) -> Dict[str, Any]:
+        """读取可继续的检查点,不存在、配置不一致或已过期时返回新的空检查点"""
+        checkpoint = {'signature': signature, 'created': time.time(), 'completed': {}, 'current': None}
+        self._checkpoint_last = time.time()
+        checkpoint_dir = self.__checkpoint_dir()
+        # 旧版本整体保存的检查点文件不再读取
+        (Path(self.get_data_path()) / "scan_checkpoint.json").unlink(missing_ok=True)
+        state_file = checkpoint_dir / "state.json"
+        if not self._checkpoint_interval or not state_file.exists():
+            self.__clear_checkpoint()
+            return checkpoint
+        try:
+            saved = json.loads(state_file.read_text(encoding='utf-8'))
+            if saved.get('signature') != signature:
+                logger.info("扫描配置已变化,丢弃旧检查点")
+            elif time.time() - saved.get('updated', 0) > self._checkpoint_max_age * 3600:
+                logger.info(f"扫描检查点已超过 {self._checkpoint_max_age} 小时,丢弃并重新扫描")
+            else:
+                completed, usage = {}, {}
+                for scan_path in saved['completed']:
+                    done = json.loads(self.__completed_file(checkpoint_dir, scan_path).read_text(encoding='utf-8'))
+                    completed[scan_path] = done['duplicates']
+                    if done.get('usage'):
+                        usage[scan_path] = done['usage']
+                current = saved.get('current')
+                if current:
+                    current['files'] = self.__read_checkpoint_lines(checkpoint_dir / "files.jsonl",
+                                                                    current['files_saved'])
+                    current['file_stats'] = dict(self.__read_checkpoint_lines(checkpoint_dir / "stats.jsonl",
+                                                                              current['stats_saved']))
+                logger.info(f"从 {datetime.fromtimestamp(saved['updated']).strftime('%Y-%m-%d %H:%M:%S')} "
+                            f"的检查点继续扫描")
+                return {**saved, 'completed': completed, 'usage': usage, 'current': current}
+        except Exception as e:
+            logger.warning(f"读取扫描检查点失败:{str(e)}")
+        self.__clear_checkpoint()
+        return checkpoint
+
+    @staticmethod
+    def __read_checkpoint_lines(path: Path, saved: List[int]) -> List:
+        """读取追加文件中已记入state.json的部分,saved为[行数, 字节数]"""
+        count, offset = saved
+        if not count:
+            return []
+        with open(path, 'rb') as f:
+            lines = f.read(offset).splitlines()
+        if len(lines) != count:
+            raise ValueError(f"检查点文件不完整:{path.name}")
+        return [json.loads(line) for line in lines]
+
+    @staticmethod
+    def __append_checkpoint_lines(path: Path, items: Iterable, saved: Optional[List[int]]) -> List[int]:
+        """
+        将上次保存之后新增的项逐行追加到文件,先截断到上次记入state.json的位置,
+        丢弃写入state.json之前中断时多出的内容;返回新的[行数, 字节数]
+        """
+        count, offset = saved or (0, 0)
+        lines = [json.dumps(item, ensure_ascii=False).encode('utf-8') + b'\n' for item in items]
+        with open(path, 'r+b' if path.exists() else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+            f.writelines(lines)
+            return [count + len(lines), f.tell()]
+
+    def __save_checkpoint(self, scan_path: Optional[str], state_getter=None, force: bool = False):
+        """
+        按间隔写入检查点:当前路径的待遍历目录写入state.json,已发现的文件和文件状态只追加上次保存后新增的部分,
+        每次写入的数据量与新增量成正比;state_getter仅在需要写入时调用,返回的文件列表和状态字典只增不减
+        """
+        if not self._checkpoint or not self._checkpoint_interval:
+            return
+        now = time.time()
+        if not force and now - self._checkpoint_last < self._checkpoint_interval:
+            return
+        self._checkpoint_last = now
+        try:
+            checkpoint_dir = self.__checkpoint_dir()
+            checkpoint_dir.mkdir(parents=True, exist_ok=True)
+            files_file, stats_file = checkpoint_dir / "files.jsonl", checkpoint_dir / "stats.jsonl"
+            current = None
+            previous = self._checkpoint.get('current') or {}
+            if previous.get('scan_path') != scan_path:
+                # 开始新的扫描路径或路径已完成,之前路径的追加文件作废
+                previous = {}
+                files_file.unlink(missing_ok=True)
+                stats_file.unlink(missing_ok=True)
+            if state_getter:
+                state = state_getter()
+                files_saved = previous.get('files_saved') or [0, 0]
+                stats_saved = previous.get('stats_saved') or [0, 0]
+                file_stats = state.get('file_stats') or {}
+                current = {
+                    'scan_path': scan_path,
+                    'pending_dirs': state['pending_dirs'],
+                    'files_saved': self.__append_checkpoint_lines(
+                        files_file, map(str, state['files'][files_saved[0]:]), files_saved),
+                    'stats_saved': self.__append_checkpoint_lines(
+                        stats_file, islice(file_stats.items(), stats_saved[0], None), stats_saved)
+                }
+            self._checkpoint['current'] = current
+            self._checkpoint['updated'] = now
+            state_file = checkpoint_dir / "state.json"
+            tmp_file = state_file.with_suffix('.tmp')
+            tmp_file.write_text(json.dumps({
+                **{k: v for k, v in self._checkpoint.items() if k not in ('completed', 'usage', 'current')},
+                'completed': list(self._checkpoint['completed']),
+                'current': current
+            }, ensure_ascii=False), encoding='utf-8')
+            os.replace(tmp_file, state_file)
+        except Exception as e:
+            logger.warning(f"保存扫描检查点失败:{str(e)}")
+
+    def __complete_checkpoint_path(self, scan_path: str, duplicates: List[Dict], usage: Optional[Dict] = None):
+        """记录扫描路径已完成及其空间占用统计,结果只在完成时写入一次"""
+        if not self._checkpoint:
+            return
+        self._checkpoint['completed'][scan_path] = duplicates
+        if usage:
+            self._checkpoint.setdefault('usage', {})[scan_path] = usage
+        if self._checkpoint_interval:
+            try:
+                checkpoint_dir = self.__checkpoint_dir()
+                checkpoint_dir.mkdir(parents=True, exist_ok=True)
+                self.__completed_file(checkpoint_dir, scan_path).write_text(
+                    json.dumps({'duplicates': duplicates, 'usage': usage}, ensure_ascii=False), encoding='utf-8')
+            except Exception as e:
+                logger.warning(f"保存扫描检查点失败:{str(e)}")
+        self.__save_checkpoint(None, force=True)
+
+    def __clear_checkpoint(self):
+        """扫描完成后删除检查点"""
+        import shutil
+        self._checkpoint = None
+        try:
+            shutil.rmtree(self.__checkpoint_dir(), ignore_errors=True)
+        except Exception as e:
+            logger.warning(f"删除扫描检查点失败:{str(e)}")
+
+    @staticmethod
+    def __group_fingerprint(dup: Dict) -> str:
+        """重复组指纹:组内文件路径集合的摘要"""
+        paths = sorted(f['path'] for f in dup['files'])
+        return hashlib.md5('\n'.join(paths).encode()).hexdigest()[:16]
+
+    def __diff_with_previous(self, duplicates: List[Dict]) -> Dict[str, Any]:
+        """
+        用集合运算对比本次与上次扫描的重复组指纹,标记每组的diff_state,
+        并保存本次指纹供下次对比
+        """
+        previous = self.get_data('detection_fingerprints') or {}
+        previous_groups = previous.get('groups') or {}
+        current_groups = {dup['group_id']: self.__group_fingerprint(dup) for dup in duplicates}
+        
+        new_ids = current_groups.keys() - previous_groups.keys()
+        resolved_ids = previous_groups.keys() - current_groups.keys()
+        changed_ids = {gid for gid in current_groups.keys() & previous_groups.keys()
+                       if current_groups[gid] != previous_groups[gid]}
+        for dup in duplicates:
+            gid = dup['group_id']
+            dup['diff_state'] = 'new' if gid in new_ids else 'changed' if gid in changed_ids else 'unchanged'
+        
+        self.save_data('detection_fingerprints', {
+            'scan_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'groups': current_groups
+        })
+        return {
+            'previous_scan_time': previous.get('scan_time'),
+            'new': sorted(new_ids),
+            'changed': sorted(changed_ids),
+            'resolved': sorted(resolved_ids)
         }
-        self.save_data('detection_result', result)
+
+    def scan_diff(self, apikey: str) -> schemas.Response:
+        """
+        扫描差异API:返回最近一次扫描相对上一次的新增、变化和已解决的重复组
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
         
-        logger.info(f"重复文件扫描完成,发现 {len(all_duplicates)} 组重复文件")
+        result = self.__load_result()
+        if not result or not result.get('diff'):
+            return schemas.Response(success=False, message="暂无扫描差异数据")
+        
+        diff = result['diff']
+        summaries = {
+            dup['group_id']: {
+                'group_id': dup['group_id'],
+                'type': dup['type'],
+                'title': dup['title'],
+                'year': dup['year'],
+                'tmdbid': dup['tmdbid'],
+                'season': dup['season'],
+                'count': dup['count'],
+                'total_size': dup['total_size']
+            }
+            for dup in result['duplicates'].headers()
+            if dup.get('diff_state') in ('new', 'changed')
+        }
+        return schemas.Response(success=True, data={
+            'scan_time': result.get('scan_time'),
+            'previous_scan_time': diff.get('previous_scan_time'),
+            'new': [summaries[gid] for gid in diff['new'] if gid in summaries],
+            'changed': [summaries[gid] for gid in diff['changed'] if gid in summaries],
+            'resolved': diff['resolved']
+        })
+
+    def get_page(self) -> List[dict]:
+        """
+        拼装插件详情页面,按检测结果版本缓存,扫描或删除更新结果后重新生成
+        """
+        # 扫描进行中时已完成的组数变化也需要重新生成
+        live = self._live_scan
+        version = (self._result_version, len(live['groups']) if live and not live['finished'] else None,
+                   self._clean_plan['token'] if self._clean_plan else None)
+        if self._page_cache and self._page_cache[0] == version:
+            return self._page_cache[1]
+        page = [*self.__live_alerts(), *self.__render_page()]
+        self._page_cache = (version, page)
+        return page
+
+    @staticmethod
+    def __format_size(size_mb: float) -> str:
+        """MB数格式化为MB或GB"""
+        return f'{size_mb / 1024:.2f} GB' if size_mb >= 1024 else f'{size_mb:.2f} MB'
+
+    def __usage_cards(self, analytics: Optional[Dict], limit: int = 8) -> List[dict]:
+        """媒体库空间占用卡片:按类型、分辨率、编码和目录各显示占用最大的若干项"""
+        if not analytics or not analytics.get('total_size'):
+            return []
+        total_size = analytics['total_size']
+        columns = []
+        for dimension, title in (('type', '按类型'), ('resolution', '按分辨率'),
+                                 ('codec', '按编码'), ('folder', '按目录')):
+            rows = []
+            for name, count, size in analytics.get(dimension, [])[:limit]:
+                rows.append({
+                    'component': 'div',
+                    'props': {
+                        'class': 'mb-2'
+                    },
+                    'content': [
+                        {
+                            'component': 'div',
+                            'props': {
+                                'class': 'd-flex text-caption'
+                            },
+                            'content': [
+                                {
+                                    'component': 'span',
+                                    'props': {
+                                        'class': 'text-truncate me-2',
+                                        'title': name
+                                    },
+                                    'text': Path(name).name if dimension == 'folder' and name != '其他' else name
+                                },
+                                {
+                                    'component': 'span',
+                                    'props': {
+                                        'class': 'ms-auto text-no-wrap'
+                                    },
+                                    'text': f'{self.__format_size(size)} / {count}个'
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'VProgressLinear',
+                            'props': {
+                                'model-value': round(size / total_size * 100, 1),
+                                'color': 'primary',
+                                'height': 4,
+                                'rounded': True
+                            }
+                        }
+                    ]
+                })
+            columns.append({
+                'component': 'VCol',
+                'props': {
+                    'cols': 12,
+                    'md': 3
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'outlined',
+                            'class': 'fill-height'
+                        },
+                        'content': [
+                            {
+                                'component': 'VCardTitle',
+                                'props': {
+                                    'class': 'text-subtitle-1'
+                                },
+                                'text': title
+                            },
+                            {
+                                'component': 'VCardText',
+                                'content': rows
+                            }
+                        ]
+                    }
+                ]
+            })
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            {
+                                'component': 'div',
+                                'props': {
+                                    'class': 'text-subtitle-2'
+                                },
+                                'text': f'媒体库空间占用:共 {analytics.get("total_count", 0)} 个文件,'
+                                        f'{self.__format_size(total_size)}(硬链接只计一次)'
+                            }
+                        ]
+                    },
+                    *columns
+                ]
+            }
+        ]
+
+    def __sample_alerts(self, sample_result: Optional[Dict], result: Optional[Dict]) -> List[dict]:
+        """最近一次抽样扫描的全库估算,完整扫描更新后不再显示"""
+        if not sample_result or not sample_result.get('sample'):
+            return []
+        if result and result.get('scan_time', '') >= sample_result.get('scan_time', ''):
+            return []
+        sample = sample_result['sample']
+        groups = sample['groups']
+        reclaimable = sample['reclaimable_size']
+        text = (f"抽样扫描({sample_result.get('scan_time')},{sample['rate']:g}%,"
+                f"{sample['sampled_folders']}/{sample['folders']} 个目录):"
+                f"抽中目录中发现 {len(sample_result['duplicates'])} 组,估算全库重复 {groups['estimate']:.0f} 组")
+        if groups['low'] is not None:
+            text += f"(95%区间 {groups['low']:.0f} ~ {groups['high']:.0f})"
+        text += f",可释放 {self.__format_size(reclaimable['estimate'])}"
+        if reclaimable['low'] is not None:
+            text += (f"(95%区间 {self.__format_size(reclaimable['low'])} ~ "
+                     f"{self.__format_size(reclaimable['high'])})")
+        text += ";抽样结果单独保存,下方为最近一次完整扫描的结果" if result else ";暂无完整扫描结果"
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            {
+                                'component': 'VAlert',
+                                'props': {
+                                    'type': 'info',
+                                    'variant': 'tonal',
+                                    'density': 'compact',
+                                    'text': text
+                                }
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
 
-    def get_page(self) -> List[dict]:
-        """拼装插件详情页面"""
-        result = self.get_data('detection_result')
+    def __render_page(self) -> List[dict]:
+        """生成详情页组件树,只解码需要显示的重复组"""
+        result = self.__load_result()
+        sample_alerts = self.__sample_alerts(self.__load_sample_result(), result)
         
         if not result:
             return [
+                *sample_alerts,
                 {
                     'component': 'div',
                     'text': '暂无数据,请先配置扫描路径并运行扫描',
@@ -677,10 +3610,15 @@ class DuplicateDetector(_PluginBase):
                 }
             ]
         
-        duplicates = result.get('duplicates', [])
+        duplicates = result['duplicates']
+        # 统计和筛选只读取组信息
+        headers = duplicates.headers()
         scan_time = result.get('scan_time', '')
         scan_paths = result.get('scan_paths', [])
         
+        # 空间占用统计卡片,旧结果没有analytics时不显示
+        usage_cards = self.__usage_cards(result.get('analytics'))
+        
         if not duplicates:
             return [
                 {
@@ -697,14 +3635,22 @@ class DuplicateDetector(_PluginBase):
                             'text': f'扫描时间: {scan_time}\n扫描路径: {", ".join(scan_paths)}\n\n✅ 未发现重复文件'
                         }
                     ]
-                }
+                },
+                *sample_alerts,
+                *usage_cards
             ]
         
         # 统计信息
-        movie_count = len([d for d in duplicates if d['type'] == '电影'])
-        tv_count = len([d for d in duplicates if d['type'] == '剧集'])
-        total_files = sum(d['count'] for d in duplicates)
-        total_size = sum(d['total_size'] for d in duplicates)
+        movie_count = len([d for d in headers if d['type'] == '电影'])
+        tv_count = len([d for d in headers if d['type'] == '剧集'])
+        strm_count = len([d for d in headers if d['type'] == 'STRM同源'])
+        pack_count = len([d for d in headers if d['type'] == '季包'])
+        cloud_count = len([d for d in headers if d['type'] == '网盘同内容'])
+        # 季包中的文件已计入按集检测的重复组,不重复统计
+        file_groups = [d for d in headers if d['type'] != '季包']
+        total_files = sum(d['count'] for d in file_groups)
+        total_size = sum(d['total_size'] for d in file_groups)
+        reclaimable_size = sum(d.get('reclaimable_size', 0) for d in file_groups)
         
         # 顶部统计卡片
         stat_cards = [
@@ -806,7 +3752,10 @@ class DuplicateDetector(_PluginBase):
                                                                 'props': {
                                                                     'class': 'text-caption ms-2'
                                                                 },
-                                                                'text': f'(电影:{movie_count} 剧集:{tv_count})'
+                                                                'text': f'(电影:{movie_count} 剧集:{tv_count}'
+                                                                        + (f' 季包:{pack_count}' if pack_count else '')
+                                                                        + (f' 网盘同内容:{cloud_count}' if cloud_count else '')
+                                                                        + (f' STRM同源:{strm_count})' if strm_count else ')')
                                                             }
                                                         ]
                                                     }
@@ -898,9 +3847,24 @@ class DuplicateDetector(_PluginBase):
                                                     {
                                                         'component': 'div',
                                                         'props': {
-                                                            'class': 'text-h6'
+                                                            'class': 'd-flex align-center flex-wrap'
                                                         },
-                                                        'text': f'{total_size:.2f} MB'
+                                                        'content': [
+                                                            {
+                                                                'component': 'span',
+                                                                'props': {
+                                                                    'class': 'text-h6'
+                                                                },
+                                                                'text': f'{total_size:.2f} MB'
+                                                            },
+                                                            {
+                                                                'component': 'span',
+                                                                'props': {
+                                                                    'class': 'text-caption ms-2'
+                                                                },
+                                                                'text': f'(可释放:{reclaimable_size:.2f} MB)'
+                                                            }
+                                                        ]
                                                     }
                                                 ]
                                             }
@@ -916,9 +3880,174 @@ class DuplicateDetector(_PluginBase):
         
         
         
+        # 按配置的显示范围筛选,旧结果没有diff_state时全部显示
+        scan_diff = result.get('diff') or {}
+        visible_duplicates = [duplicates[i] for i in self.__view_indexes(headers, self._page_view)]
+        view_titles = {'new': '仅本次新增', 'changed': '新增和变化', 'all': '全部重复组'}
+        diff_alert = {
+            'component': 'VRow',
+            'props': {
+                'class': 'mt-2'
+            },
+            'content': [
+                {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12
+                    },
+                    'content': [
+                        {
+                            'component': 'VAlert',
+                            'props': {
+                                'type': 'info',
+                                'variant': 'tonal',
+                                'density': 'compact',
+                                'text': f'相比上次扫描({scan_diff.get("previous_scan_time") or "无"}):'
+                                        f'新增 {len(scan_diff.get("new", []))} 组,'
+                                        f'变化 {len(scan_diff.get("changed", []))} 组,'
+                                        f'已解决 {len(scan_diff.get("resolved", []))} 组。'
+                                        f'当前显示:{view_titles.get(self._page_view, "全部重复组")}'
+                                        f'({len(visible_duplicates)} 组)'
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        # 批量清理操作:先预览当前显示范围内的删除计划,预览后才显示带确认令牌的清理按钮
+        keep_titles = {'resolution': '最高分辨率', 'size': '最大体积', 'mtime': '最新修改'}
+        clean_plan = self._clean_plan
+        if clean_plan and (clean_plan['version'] != self._result_version or clean_plan['view'] != self._page_view):
+            clean_plan = None
+        clean_actions = {
+            'component': 'VRow',
+            'content': [
+                {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'class': 'd-flex align-center flex-wrap'
+                    },
+                    'content': [
+                        {
+                            'component': 'VBtn',
+                            'props': {
+                                'size': 'small',
+                                'color': 'primary',
+                                'variant': 'tonal',
+                                'prepend-icon': 'mdi-eye-outline',
+                                'class': 'me-2'
+                            },
+                            'text': '预览批量清理(当前显示的重复组)',
+                            'events': {
+                                'click': {
+                                    'api': 'plugin/DuplicateDetector/clean_all',
+                                    'method': 'get',
+                                    'params': {
+                                        'keep': self._clean_keep_rule,
+                                        'dry_run': True,
+                                        'view': self._page_view,
+                                        'apikey': settings.API_TOKEN
+                                    }
+                                }
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        if clean_plan:
+            clean_actions['content'][0]['content'].extend([
+                {
+                    'component': 'VBtn',
+                    'props': {
+                        'size': 'small',
+                        'color': 'error',
+                        'variant': 'tonal',
+                        'prepend-icon': 'mdi-delete-sweep',
+                        'class': 'me-2'
+                    },
+                    'text': f'确认清理:删除 {len(clean_plan["items"])} 个文件'
+                            f'(保留{keep_titles.get(clean_plan["keep"], "")})',
+                    'events': {
+                        'click': {
+                            'api': 'plugin/DuplicateDetector/clean_all',
+                            'method': 'get',
+                            'params': {
+                                'dry_run': False,
+                                'token': clean_plan['token'],
+                                'apikey': settings.API_TOKEN
+                            }
+                        }
+                    }
+                },
+                {
+                    'component': 'span',
+                    'props': {
+                        'class': 'text-caption text-error'
+                    },
+                    'text': f'已预览 {clean_plan["group_count"]} 组,'
+                            f'预计释放 {self.__format_size(clean_plan["planned_size"])},'
+                            f'检测结果变化后需重新预览'
+                }
+            ])
+        if self._strm_library_path and self._cloud_library_path:
+            clean_actions['content'][0]['content'].append({
+                'component': 'VBtn',
+                'props': {
+                    'size': 'small',
+                    'color': 'info',
+                    'variant': 'tonal',
+                    'prepend-icon': 'mdi-link-variant-off',
+                    'class': 'me-2'
+                },
+                'text': '检查孤立文件',
+                'events': {
+                    'click': {
+                        'api': 'plugin/DuplicateDetector/reconcile',
+                        'method': 'get',
+                        'params': {
+                            'apikey': settings.API_TOKEN
+                        }
+                    }
+                }
+            })
+        
+        # 最近一次孤立文件检查的摘要
+        orphan_result = self.get_data('orphan_result')
+        orphan_alerts = []
+        if orphan_result:
+            orphan_size = sum(item.get('size', 0) for item in orphan_result.get('orphan_cloud', []))
+            orphan_alerts.append({
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {
+                            'cols': 12
+                        },
+                        'content': [
+                            {
+                                'component': 'VAlert',
+                                'props': {
+                                    'type': 'warning',
+                                    'variant': 'tonal',
+                                    'density': 'compact',
+                                    'text': f'孤立文件检查({orphan_result.get("check_time")}):'
+                                            f'无STRM的网盘文件 {len(orphan_result.get("orphan_cloud", []))} 个'
+                                            f'(共 {orphan_size:.2f} MB),'
+                                            f'目标不存在的STRM {len(orphan_result.get("orphan_strm", []))} 个'
+                                }
+                            }
+                        ]
+                    }
+                ]
+            })
+        
         # 重复文件列表
         duplicate_cards = []
-        for dup in duplicates:
+        for dup in visible_duplicates:
             # 构建标题
             title_chips = []
             if dup['type'] == '电影':
@@ -926,6 +4055,28 @@ class DuplicateDetector(_PluginBase):
                 title_text = f"{dup['title']}"
                 if dup['year']:
                     title_text += f" ({dup['year']})"
+            elif dup['type'] == 'STRM同源':
+                title_icon = 'mdi-link-variant'
+                title_text = f"{dup['title']}"
+            elif dup['type'] == '网盘同内容':
+                title_icon = 'mdi-cloud-search'
+                title_text = f"{dup['title']}"
+                title_chips.append({
+                    'component': 'VChip',
+                    'props': {
+                        'size': 'small',
+                        'color': 'success' if dup.get('match') == 'hash' else 'warning',
+                        'variant': 'outlined',
+                        'class': 'ms-2'
+                    },
+                    'text': '哈希相同' if dup.get('match') == 'hash' else '仅大小相同'
+                })
+            elif dup['type'] == '季包':
+                title_icon = 'mdi-folder-multiple'
+                title_text = f"{dup['title']}"
+                if dup['year']:
+                    title_text += f" ({dup['year']})"
+                title_text += f" - S{dup['season']} 季包"
             else:  # 剧集
                 title_icon = 'mdi-television'
                 title_text = f"{dup['title']}"
@@ -934,6 +4085,19 @@ class DuplicateDetector(_PluginBase):
                 # 只显示季号,不显示集号列表
                 title_text += f" - S{dup['season']}"
             
+            # STRM目标徽章
+            if dup.get('target'):
+                title_chips.append({
+                    'component': 'VChip',
+                    'props': {
+                        'size': 'small',
+                        'color': 'secondary',
+                        'variant': 'outlined',
+                        'class': 'ms-2'
+                    },
+                    'text': f"目标: {dup['target']}"
+                })
+            
             # TMDB ID 徽章
             if dup['tmdbid']:
                 title_chips.append({
@@ -950,6 +4114,8 @@ class DuplicateDetector(_PluginBase):
             # 重复数量徽章 - 对于剧集显示重复集数和总文件数
             if dup['type'] == '剧集':
                 count_text = f'{dup["episode_count"]} 集 / {dup["count"]} 个文件'
+            elif dup['type'] == '季包':
+                count_text = f'{dup["episode_str"]} / {dup["count"]} 个目录'
             else:
                 count_text = f'重复 {dup["count"]} 个'
             
@@ -963,6 +4129,31 @@ class DuplicateDetector(_PluginBase):
                 'text': count_text
             })
             
+            # 新增/变化徽章
+            if dup.get('diff_state') in ('new', 'changed'):
+                title_chips.append({
+                    'component': 'VChip',
+                    'props': {
+                        'size': 'small',
+                        'color': 'primary' if dup['diff_state'] == 'new' else 'warning',
+                        'variant': 'flat',
+                        'class': 'ms-2'
+                    },
+                    'text': '新增' if dup['diff_state'] == 'new' else '有变化'
+                })
+            
+            # 可释放空间徽章(硬链接只计一次)
+            title_chips.append({
+                'component': 'VChip',
+                'props': {
+                    'size': 'small',
+                    'color': 'success',
+                    'variant': 'outlined',
+                    'class': 'ms-2'
+                },
+                'text': f'可释放 {dup.get("reclaimable_size", 0):.2f} MB'
+            })
+            
             # 文件列表
             file_items = []
             for idx, file_info in enumerate(dup['files']):
@@ -1007,7 +4198,46 @@ class DuplicateDetector(_PluginBase):
                     },
                     'text': f"{file_info['size']} MB"
                 })
+                if file_info.get('links'):
+                    chips.append({
+                        'component': 'VChip',
+                        'props': {
+                            'size': 'small',
+                            'color': 'secondary',
+                            'class': 'ma-1'
+                        },
+                        'text': f"硬链接 ×{len(file_info['links']) + 1}"
+                    })
+                if file_info.get('is_dir'):
+                    chips.append({
+                        'component': 'VChip',
+                        'props': {
+                            'size': 'small',
+                            'color': 'secondary',
+                            'class': 'ma-1'
+                        },
+                        'text': f"{file_info['episode_str']} / {file_info['file_count']} 个文件"
+                    })
                 
+                # 路径行,硬链接的其他路径一并列出
+                path_lines = [
+                    {
+                        'component': 'div',
+                        'props': {
+                            'class': 'text-caption text-grey ms-7'
+                        },
+                        'text': path
+                    }
+                    for path in [file_info['path'], *(file_info.get('links') or [])]
+                ]
+                if file_info.get('cloud_path') and file_info['cloud_path'] != file_info['path']:
+                    path_lines.append({
+                        'component': 'div',
+                        'props': {
+                            'class': 'text-caption text-grey ms-7'
+                        },
+                        'text': f"网盘: {file_info['cloud_path']}"
+                    })
                 
                 file_items.append({
                     'component': 'div',
@@ -1030,7 +4260,7 @@ class DuplicateDetector(_PluginBase):
                                         {
                                             'component': 'VIcon',
                                             'props': {
-                                                'icon': 'mdi-file',
+                                                'icon': 'mdi-folder' if file_info.get('is_dir') else 'mdi-file',
                                                 'size': 'small',
                                                 'class': 'me-2'
                                             }
@@ -1045,16 +4275,11 @@ class DuplicateDetector(_PluginBase):
                                         *chips
                                     ]
                                 },
-                                {
-                                    'component': 'div',
-                                    'props': {
-                                        'class': 'text-caption text-grey ms-7'
-                                    },
-                                    'text': file_info['path']
-                                }
+                                *path_lines
                             ]
                         },
-                        {
+                        # 季包目录不提供删除,按集在剧集重复组中处理;没有STRM的网盘文件不在此删除
+                        *([] if file_info.get('is_dir') or file_info.get('cloud_only') else [{
                             'component': 'VBtn',
                             'props': {
                                 'size': 'small',
@@ -1065,15 +4290,15 @@ class DuplicateDetector(_PluginBase):
                             'text': '删除',
                             'events': {
                                 'click': {
-                                    'api': 'plugin/DuplicateDetector/delete_file',
+                                    'api': 'plugin/DuplicateDetector/delete_item',
                                     'method': 'get',
                                     'params': {
-                                        'file_path': file_info['path'],
-                                        'apikey': settings.API_TOKEN
+                                        'group_id': dup['group_id'],
+                                        'file_id': self.__file_id(file_info['path'])
                                     }
                                 }
                             }
-                        }
+                        }])
                     ]
                 })
             
@@ -1177,6 +4402,11 @@ class DuplicateDetector(_PluginBase):
                 'component': 'div',
                 'content': [
                     *stat_cards,
+                    *sample_alerts,
+                    *usage_cards,
+                    diff_alert,
+                    clean_actions,
+                    *orphan_alerts,
                     {
                         'component': 'VRow',
                         'props': {
@@ -1190,56 +4420,271 @@ class DuplicateDetector(_PluginBase):
 
     def stop_service(self):
         """退出插件"""
-        pass
+        # 正在进行的扫描写入检查点后停止
+        if self._scan_lock.locked():
+            self._scan_paused = True
+        if self._delete_worker and self._delete_worker.is_alive():
+            # 只通知线程停止,不等待:进行中的删除完成后线程自行退出
+            self._delete_stop_event.set()
+            self._delete_event.set()
+        self._delete_worker = None
+        self.__save_delete_queue()
+        self.__close_storages()
+
+    def delete_queue(self, apikey: str) -> schemas.Response:
+        """
+        网盘删除队列状态API
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        
+        with self._delete_lock:
+            return schemas.Response(success=True, data={
+                'depth': len(self._delete_queue),
+                'running': bool(self._delete_worker and self._delete_worker.is_alive()),
+                'pending': [dict(task) for task in self._delete_queue[:50]],
+                'failures': list(self._delete_failures)
+            })
+
     def __delete_cloud_file(self, strm_path: str):
-        """同步删除网盘文件"""
-        if not self._strm_library_path or not self._cloud_library_path:
+        """将网盘文件同步删除加入后台队列,立即返回;队列由调用方在删除完成后统一保存"""
+        if not self._strm_library_path or not self._cloud_library_path or not strm_path.endswith('.strm'):
+            return
+        
+        with self._delete_lock:
+            self._delete_queue.append({
+                'id': uuid.uuid4().hex[:12],
+                'strm_path': strm_path,
+                'storage': self._cloud_storage or 'local',
+                'attempts': 0,
+                'next_time': 0,
+                'error': None,
+                'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            })
+            self._delete_queue_dirty = True
+        logger.info(f"已加入网盘删除队列: {strm_path}")
+        self.__start_delete_worker()
+
+    def __start_delete_worker(self):
+        """启动网盘删除队列后台线程"""
+        if self._delete_worker and self._delete_worker.is_alive():
+            self._delete_event.set()
             return
+        self._delete_event = threading.Event()
+        self._delete_stop_event = threading.Event()
+        self._delete_worker = threading.Thread(target=self.__delete_worker_loop,
+                                               args=(self._delete_event, self._delete_stop_event),
+                                               name="DuplicateDetector-delete", daemon=True)
+        self._delete_worker.start()
+
+    def __delete_worker_loop(self, wake_event: threading.Event, stop_event: threading.Event):
+        """
+        按存储限速依次处理删除队列,失败按指数退避重试;
+        事件在启动时传入,停止后重新启动的线程使用新的事件,旧线程完成当前任务后按自己的停止事件退出
+        """
+        while not stop_event.is_set():
+            task, wait_seconds = self.__next_delete_task()
+            if not task:
+                # 队列空闲时统一清理本批删除留下的空目录;队列清空时立即保存,限速等待时按间隔保存
+                self.__flush_prune_pending()
+                self.__save_delete_queue(force=wait_seconds is None)
+                if wait_seconds is None:
+                    # 队列已空,退出线程,下次入队时再启动
+                    with self._delete_lock:
+                        if not self._delete_queue:
+                            self._delete_worker = None
+                            return
+                    continue
+                wake_event.wait(timeout=wait_seconds)
+                wake_event.clear()
+                continue
             
-        try:
-            # 转换路径
-            cloud_file = self.__convert_strm_to_cloud_path(strm_path)
-            if cloud_file:
-                logger.info(f"找到对应的网盘文件: {cloud_file}")
-                import os
-                from pathlib import Path
-                
-                # 删除文件
-                if self._cloud_storage and self._cloud_storage != 'local':
-                    try:
-                        # 使用 StorageChain 删除
-                        fileitem = self._storagechain.get_file_item(
-                            storage=self._cloud_storage,
-                            path=Path(cloud_file)
-                        )
-                        if fileitem:
-                            self._storagechain.delete_media_file(fileitem=fileitem)
-                            logger.info(f"已通过StorageChain({self._cloud_storage})删除网盘文件: {cloud_file}")
-                            
-                            # 删除空文件夹 (对于网盘如果是目录对象可能需要特殊处理, 这里先尝试用StorageChain操作? 
-                            # samediasyncdel 中是 delete_file(fileitem) 如果是 dir
-                            # 这里暂时不处理网盘空目录, 或者如果有本地挂载仍可用remove_empty_dirs)
-                        else:
-                            logger.warn(f"StorageChain未找到文件: {cloud_file}, 尝试使用本地删除")
-                            if os.path.exists(cloud_file):
-                                os.remove(cloud_file)
-                                logger.info(f"已同步删除网盘文件: {cloud_file}")
-                    except Exception as e:
-                         logger.error(f"StorageChain删除失败: {e}, 尝试本地删除")
-                         # 降级重试
-                         if os.path.exists(cloud_file):
-                            os.remove(cloud_file)
-                            logger.info(f"已同步删除网盘文件: {cloud_file}")
+            self._delete_last_time[task['storage']] = time.time()
+            try:
+                self.__process_cloud_delete(task)
+                with self._delete_lock:
+                    self._delete_queue = [t for t in self._delete_queue if t['id'] != task['id']]
+                    self._delete_queue_dirty = True
+            except Exception as e:
+                logger.error(f"同步删除网盘文件失败({task['attempts'] + 1}次): {task['strm_path']} - {str(e)}")
+                with self._delete_lock:
+                    # 删除期间插件重新初始化时,队列为重新读取的副本,按ID更新
+                    task = next((t for t in self._delete_queue if t['id'] == task['id']), task)
+                    task['attempts'] += 1
+                    task['error'] = str(e)
+                    if task['attempts'] > self._delete_max_retries:
+                        self._delete_queue = [t for t in self._delete_queue if t['id'] != task['id']]
+                        self._delete_failures = [*self._delete_failures, dict(task)][-100:]
+                        self.save_data('delete_failures', self._delete_failures)
+                    else:
+                        task['next_time'] = time.time() + 5 * 2 ** (task['attempts'] - 1)
+                    self._delete_queue_dirty = True
+            finally:
+                with self._delete_lock:
+                    self._delete_running.discard(task['id'])
+            # 处理过程中按间隔保存,避免每个任务都写入整个队列;插件已停止时立即保存
+            self.__save_delete_queue(force=stop_event.is_set())
+
+    def __save_delete_queue(self, force: bool = True):
+        """保存有变化的删除队列,force为False时距上次保存不足间隔则跳过"""
+        with self._delete_lock:
+            if not self._delete_queue_dirty:
+                return
+            if not force and time.time() - self._delete_saved_time < self._delete_save_interval:
+                return
+            self.save_data('delete_queue', self._delete_queue)
+            self._delete_queue_dirty = False
+            self._delete_saved_time = time.time()
+
+    def __next_delete_task(self) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        取出下一个可执行的删除任务,否则返回需要等待的秒数(队列为空时为None);
+        已停止的线程仍在执行的任务跳过,一秒后再检查
+        """
+        interval = 1 / self._delete_rate_limit if self._delete_rate_limit > 0 else 0
+        now = time.time()
+        wait_seconds = None
+        with self._delete_lock:
+            for task in self._delete_queue:
+                if task['id'] in self._delete_running:
+                    ready_time = now + 1
                 else:
-                    # 本地删除
-                    if os.path.exists(cloud_file):
-                        os.remove(cloud_file)
-                        logger.info(f"已同步删除网盘文件: {cloud_file}")
-                    
-                # 删除空文件夹(尝试本地操作,因为网盘通常也有本地挂载路径)
-                self.__remove_empty_dirs(Path(cloud_file).parent)
-        except Exception as e:
-            logger.error(f"同步删除网盘文件失败: {str(e)}")
+                    ready_time = max(task['next_time'], self._delete_last_time.get(task['storage'], 0) + interval)
+                if ready_time <= now:
+                    self._delete_running.add(task['id'])
+                    return task, None
+                wait_seconds = ready_time - now if wait_seconds is None else min(wait_seconds, ready_time - now)
+        return None, wait_seconds
+
+    def __process_cloud_delete(self, task: Dict):
+        """执行单个网盘删除任务,出错时抛出异常以便重试"""
+        strm_path = task['strm_path']
+        storage = task['storage']
+        # 转换路径
+        cloud_file = self.__convert_strm_to_cloud_path(strm_path)
+        if not cloud_file:
+            return
+        logger.info(f"找到对应的网盘文件: {cloud_file}")
+        
+        # 删除文件
+        deleted_storage = None
+        if storage != 'local':
+            # 使用 StorageChain 按媒体文件删除
+            if self.__storage(storage).delete_media(cloud_file):
+                logger.info(f"已通过StorageChain({storage})删除网盘文件: {cloud_file}")
+                deleted_storage = storage
+            else:
+                logger.warn(f"StorageChain未找到文件: {cloud_file}, 尝试使用本地删除")
+        if not deleted_storage and self.__storage('local').delete(cloud_file):
+            # 本地删除(或网盘的本地挂载路径)
+            logger.info(f"已同步删除网盘文件: {cloud_file}")
+            deleted_storage = 'local'
+        
+        # 记录待清理的空文件夹,队列空闲时批量处理
+        if deleted_storage:
+            with self._delete_lock:
+                self._prune_pending.add((deleted_storage, Path(cloud_file).parent))
+
+    def __flush_prune_pending(self):
+        """按存储批量清理删除队列累积的空目录"""
+        with self._delete_lock:
+            pending, self._prune_pending = self._prune_pending, set()
+        by_storage = defaultdict(set)
+        for storage, directory in pending:
+            by_storage[storage].add(directory)
+        for storage, directories in by_storage.items():
+            self.__prune_empty_dirs(directories, storage=storage)
+
+    def reconcile(self, apikey: str) -> schemas.Response:
+        """
+        孤立文件检查API:在后台线程中执行,结果通过/orphans获取
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        if not self._strm_library_path or not self._cloud_library_path:
+            return schemas.Response(success=False, message="未配置STRM库路径或网盘映射路径")
+        if self._reconcile_thread and self._reconcile_thread.is_alive():
+            return schemas.Response(success=False, message="孤立文件检查正在执行")
+        self._reconcile_thread = threading.Thread(target=self.__run_reconcile,
+                                                  name="DuplicateDetector-reconcile", daemon=True)
+        self._reconcile_thread.start()
+        return schemas.Response(success=True, message="已开始检查孤立文件")
+
+    def orphans(self, apikey: str) -> schemas.Response:
+        """
+        孤立文件结果API
+        """
+        if apikey != settings.API_TOKEN:
+            return schemas.Response(success=False, message="API密钥错误")
+        result = self.get_data('orphan_result')
+        if not result:
+            return schemas.Response(success=False, message="暂无孤立文件检查结果")
+        return schemas.Response(success=True, data={
+            **result,
+            'running': bool(self._reconcile_thread and self._reconcile_thread.is_alive())
+        })
+
+    @staticmethod
+    def __stem_key(path: Path, root: Path) -> Optional[str]:
+        """相对库根目录、去掉后缀的路径,作为STRM与网盘文件的连接键"""
+        try:
+            rel = path.relative_to(root)
+        except ValueError:
+            return None
+        return rel.with_suffix('').as_posix()
+
+    def __run_reconcile(self):
+        """
+        对账STRM库与网盘库:两棵目录树各遍历一次,建立以相对路径(去后缀)为键的索引,
+        再用集合运算找出两侧的孤立文件
+        """
+        strm_root = Path(self._strm_library_path)
+        cloud_root = Path(self._cloud_library_path)
+        logger.info(f"开始检查孤立文件:{strm_root} <-> {cloud_root}")
+        
+        # STRM索引
+        strm_index = {}
+        for file_path in self.__scan_files(str(strm_root), ['strm'], checkpoint=False):
+            key = self.__stem_key(file_path, strm_root)
+            if key:
+                strm_index[key] = str(file_path)
+        
+        # 网盘索引,同名不同后缀的媒体文件都归到同一个键下
+        cloud_suffixes = [suffix.lstrip('.') for suffix in self._cloud_media_suffixes]
+        if self._cloud_storage and self._cloud_storage != 'local':
+            cloud_files, cloud_stats = self.__scan_storage_files(str(cloud_root), cloud_suffixes,
+                                                                 checkpoint=False, storage=self._cloud_storage)
+        else:
+            cloud_files = self.__scan_files(str(cloud_root), cloud_suffixes, checkpoint=False)
+            cloud_stats = None
+        cloud_index = defaultdict(list)
+        for file_path in cloud_files:
+            key = self.__stem_key(file_path, cloud_root)
+            if key:
+                cloud_index[key].append(str(file_path))
+        
+        orphan_paths = [path for key in sorted(cloud_index.keys() - strm_index.keys()) for path in cloud_index[key]]
+        if cloud_stats is None:
+            # 本地网盘只对孤立文件取大小,不必stat整个网盘库
+            cloud_stats = {path: {'size': getattr(entry, 'size', 0)}
+                           for path, entry in self.__storage('local').stat_many(orphan_paths).items()}
+        orphan_cloud = []
+        for path in orphan_paths:
+            size = (cloud_stats.get(path) or {}).get('size') or 0
+            orphan_cloud.append({'path': path, 'size': round(size / (1024 * 1024), 2)})
+        orphan_strm = [{'path': strm_index[key]} for key in sorted(strm_index.keys() - cloud_index.keys())]
+        
+        result = {
+            'check_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'strm_count': len(strm_index),
+            'cloud_count': len(cloud_files),
+            'orphan_cloud': orphan_cloud,
+            'orphan_strm': orphan_strm
+        }
+        self.save_data('orphan_result', result)
+        self._page_cache = None
+        logger.info(f"孤立文件检查完成:STRM {len(strm_index)} 个,网盘文件 {len(cloud_files)} 个,"
+                    f"无STRM的网盘文件 {len(orphan_cloud)} 个,目标不存在的STRM {len(orphan_strm)} 个")
 
     def __convert_strm_to_cloud_path(self, strm_path: str) -> Optional[str]:
         """将strm文件路径转换为网盘路径"""
@@ -1271,119 +4716,69 @@ class DuplicateDetector(_PluginBase):
         return self.__find_media_file(cloud_path_without_ext)
 
     def __find_media_file(self, base_path: str) -> Optional[str]:
-        """查找实际的媒体文件(支持本地和StorageChain)"""
-        from pathlib import Path
-        
+        """查找实际的媒体文件(支持本地和StorageChain),按去掉后缀的文件名和媒体后缀匹配"""
+        storage = self._cloud_storage or 'local'
         try:
             base_path_obj = Path(base_path)
             parent = base_path_obj.parent
             target_stem = base_path_obj.name
             
-            # 本地存储或未配置StorageChain
-            if not self._cloud_storage or self._cloud_storage == 'local':
-                if not parent.exists():
-                    logger.debug(f"网盘父目录不存在(Local): {parent}")
-                    return None
-                    
-                for file in parent.iterdir():
-                    if file.is_file():
-                        if file.stem == target_stem:
-                            if file.suffix.lower() in ['.mkv', '.mp4', '.avi', '.ts', '.m2ts', '.iso', '.mov', '.wmv', '.flv']:
-                                return str(file)
-            else:
-                # 使用 StorageChain 查找
-                try:
-                    # 获取父目录信息
-                    parent_item = self._storagechain.get_file_item(
-                        storage=self._cloud_storage,
-                        path=parent
-                    )
-                    
-                    if not parent_item:
-                        logger.debug(f"网盘父目录不存在({self._cloud_storage}): {parent}")
-                        return None
-
-                    # 列出目录文件
-                    files = self._storagechain.list_files(parent_item)
-                    if not files:
-                        logger.debug(f"目录为空: {parent}")
-                        return None
-                        
-                    # 调试日志: 打印查找目标
-                    # logger.debug(f"正在查找目标Stem: {target_stem} (目录: {parent})")
-
-                    for item in files:
-                        if not item:
-                            continue
-                            
-                        # 获取文件名参数
-                        item_basename = item.basename
-                        item_ext = item.extension
-                        
-                        # StorageChain的basename行为可能不一致(有的含后缀,有的不含)
-                        # 所以我们需要两种匹配方式:
-                        
-                        # 1. 尝试计算stem (假设basename含后缀)
-                        item_stem = Path(item_basename).stem
-                        
-                        # 调试日志
-                        # logger.debug(f"检查文件: {item_basename} (Stem: {item_stem}, Ext: {item_ext})")
-                        
-                        # 匹配逻辑:
-                        # 规则1: basename 直接等于 target_stem (说明basename不含后缀,且匹配)
-                        # 规则2: item_stem 等于 target_stem (说明basename含后缀,去除后缀后匹配)
-                        
-                        is_match = False
-                        if item_basename == target_stem:
-                            is_match = True
-                        elif item_stem == target_stem:
-                            is_match = True
-                            
-                        if is_match:
-                            if not item_ext:
-                                continue
-                                
-                            # 统一后缀格式(确保带点并小写)
-                            if not item_ext.startswith('.'):
-                                item_ext = '.' + item_ext
-                            
-                            if item_ext.lower() in ['.mkv', '.mp4', '.avi', '.ts', '.m2ts', '.iso', '.mov', '.wmv', '.flv']:
-                                logger.info(f"找到匹配文件(StorageChain): {item.path}")
-                                return str(item.path)
-                            else:
-                                logger.debug(f"文件名匹配但后缀不支持: {item_basename} ({item_ext})")
-                                
-                except Exception as e:
-                    logger.error(f"StorageChain查找文件失败: {e}")
-                    return None
+            media_path = self.__storage(storage).find_media(str(parent), target_stem, self._cloud_media_suffixes)
+            if media_path:
+                if storage != 'local':
+                    logger.info(f"找到匹配文件(StorageChain): {media_path}")
+                return media_path
             
-            logger.debug(f"未在 {parent} 中找到名为 {target_stem} 的媒体文件")
+            logger.debug(f"未在 {parent}({storage}) 中找到名为 {target_stem} 的媒体文件")
             return None
             
         except Exception as e:
             logger.error(f"查找媒体文件出错: {e}")
             return None
 
-    def __remove_empty_dirs(self, directory):
-        """递归删除空文件夹"""
-        try:
-            from pathlib import Path
-            if isinstance(directory, str):
-                directory = Path(directory)
-            
-            # 仅处理本地路径的空文件夹删除
-            # 如果是网盘路径且非local, 可能无法直接使用rmdir
-            if self._cloud_storage and self._cloud_storage != 'local':
-                # TODO: 实现StorageChain的空目录删除? 目前先跳过或者尝试调用API
-                return
+    def __prune_roots(self) -> List[Path]:
+        """空目录清理的边界:扫描路径和库根目录本身及其上级不会被删除"""
+        roots = [p.strip() for p in (self._scan_paths or '').split('\n') if p.strip()]
+        roots.extend(p for p in [self._strm_library_path, self._cloud_library_path] if p)
+        return [Path(p) for p in roots]
 
-            if directory.exists() and not any(directory.iterdir()):
-                directory.rmdir()
-                logger.info(f"已删除空文件夹: {directory}")
-                
-                # 递归检查上级目录
-                parent = directory.parent
-                if parent.exists() and not any(parent.iterdir()):
-                    self.__remove_empty_dirs(parent)
-        except Exception as e:
-            logger.warning(f"删除空文件夹时出错: {str(e)}")
+    def __prune_empty_dirs(self, directories: Iterable, storage: str = 'local'):
+        """
+        批量自底向上删除空文件夹:按深度从深到浅处理,每个目录只检查一次,
+        删除后再将其上级加入待检查集合
+        """
+        roots = self.__prune_roots()
+        heap = []
+        queued = set()
+        for directory in directories:
+            directory = Path(directory)
+            if directory not in queued:
+                queued.add(directory)
+                heapq.heappush(heap, (-len(directory.parts), str(directory)))
+        
+        backend = self.__storage(storage)
+        while heap:
+            # 同一深度的目录互不包含,作为一批并发检查
+            depth = heap[0][0]
+            batch = []
+            while heap and heap[0][0] == depth:
+                _, dir_str = heapq.heappop(heap)
+                directory = Path(dir_str)
+                # 只处理库根目录以内的目录
+                if any(directory != root and directory.is_relative_to(root) for root in roots):
+                    batch.append(dir_str)
+            for dir_str, removed in backend.remove_dirs_if_empty(batch).items():
+                if isinstance(removed, Exception):
+                    logger.warning(f"删除空文件夹时出错: {dir_str} - {str(removed)}")
+                    continue
+                if not removed:
+                    continue
+                logger.info(f"已删除空文件夹: {dir_str}")
+                parent = Path(dir_str).parent
+                if parent not in queued:
+                    queued.add(parent)
+                    heapq.heappush(heap, (-len(parent.parts), str(parent)))
+
+
+# 模块加载耗时:辅助模块导入及类定义
+_load_time = time.perf_counter() - _load_started
@@ -0,0 +1,181 @@
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, List, Dict, Optional, Iterator
+
+
+class CatalogWriter:
+    """
+    单个扫描路径的目录写入器:打开时清除该路径的旧记录,记录分批写入,
+    提交前查询仍能看到上一次扫描的完整目录
+    """
+
+    _COLUMNS = ('path', 'scan_path', 'media_type', 'tmdbid', 'title', 'year', 'season', 'episode',
+                'episode_end', 'resolution', 'source', 'codec', 'size', 'mtime')
+
+    def __init__(self, conn: sqlite3.Connection, scan_path: str, batch_size: int = 5000):
+        self._conn = conn
+        self._scan_path = scan_path
+        self._batch_size = batch_size
+        self._buffer = []
+        self._conn.execute("BEGIN")
+        self._conn.execute("DELETE FROM files WHERE scan_path = ?", (scan_path,))
+
+    def add(self, record: Dict[str, Any]):
+        """添加一条文件记录"""
+        record['scan_path'] = self._scan_path
+        self._buffer.append(tuple(record.get(col) for col in self._COLUMNS))
+        if len(self._buffer) >= self._batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO files ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                self._buffer
+            )
+            self._buffer = []
+
+    def commit(self):
+        """提交本次扫描的记录"""
+        try:
+            self._flush()
+            self._conn.commit()
+        finally:
+            self._conn.close()
+
+    def rollback(self):
+        """放弃本次扫描的记录"""
+        try:
+            self._conn.rollback()
+        finally:
+            self._conn.close()
+
+
+class LibraryCatalog:
+    """持久化的媒体库目录,保存每次扫描解析出的全部文件信息,并提供索引查询"""
+
+    def __init__(self, db_path: Path):
+        self._db_path = Path(db_path)
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._session() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    scan_path TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    tmdbid TEXT,
+                    title TEXT,
+                    year TEXT,
+                    season INTEGER,
+                    episode INTEGER,
+                    episode_end INTEGER,
+                    resolution TEXT,
+                    source TEXT,
+                    codec TEXT,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_files_scan_path ON files (scan_path);
+                CREATE INDEX IF NOT EXISTS idx_files_tmdbid ON files (tmdbid);
+                CREATE INDEX IF NOT EXISTS idx_files_resolution ON files (resolution);
+                CREATE INDEX IF NOT EXISTS idx_files_show ON files (media_type, title, season, episode);
+                CREATE INDEX IF NOT EXISTS idx_files_size ON files (size);
+            """)
+            # 旧版本的目录库没有结束集号,补充该列,多集文件在下次扫描时写入
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(files)")}
+            if 'episode_end' not in columns:
+                conn.execute("ALTER TABLE files ADD COLUMN episode_end INTEGER")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self._db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @contextmanager
+    def _session(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def open_scan(self, scan_path: str) -> CatalogWriter:
+        """开始写入一个扫描路径的记录"""
+        return CatalogWriter(self._connect(), scan_path)
+
+    def prune_scan_paths(self, scan_paths: List[str]):
+        """删除已不在扫描路径配置中的记录"""
+        with self._session() as conn:
+            placeholders = ', '.join('?' * len(scan_paths))
+            conn.execute(f"DELETE FROM files WHERE scan_path NOT IN ({placeholders})", scan_paths)
+
+    def query(self, media_type: Optional[str] = None, resolution: Optional[str] = None,
+              source: Optional[str] = None, codec: Optional[str] = None, tmdbid: Optional[str] = None,
+              keyword: Optional[str] = None, order: str = 'path', limit: int = 100,
+              offset: int = 0) -> Dict[str, Any]:
+        """按条件查询文件,返回总数和当前页记录"""
+        conditions = []
+        params = []
+        for column, value in (('media_type', media_type), ('resolution', resolution), ('source', source),
+                              ('codec', codec), ('tmdbid', tmdbid)):
+            if value:
+                conditions.append(f"{column} = ? COLLATE NOCASE")
+                params.append(value)
+        if keyword:
+            conditions.append("title LIKE ?")
+            params.append(f"%{keyword}%")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order_by = {'size': 'size DESC', 'mtime': 'mtime DESC'}.get(order, 'path')
+        with self._session() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM files {where}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM files {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                                [*params, limit, offset]).fetchall()
+        return {'total': total, 'items': [dict(row) for row in rows]}
+
+    def largest_titles(self, media_type: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """按占用空间排序的作品列表"""
+        where = "WHERE media_type = ?" if media_type else ''
+        params = [media_type] if media_type else []
+        with self._session() as conn:
+            rows = conn.execute(
+                f"SELECT media_type, COALESCE(tmdbid, title) AS media_key, MAX(title) AS title, "
+                f"MAX(year) AS year, MAX(tmdbid) AS tmdbid, COUNT(*) AS file_count, SUM(size) AS total_size "
+                f"FROM files {where} GROUP BY media_type, media_key ORDER BY total_size DESC LIMIT ?",
+                [*params, limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def missing_episodes(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """找出集号不连续的剧集季,返回缺失的集号;多集文件覆盖起始到结束集号之间的每一集"""
+        missing = []
+        with self._session() as conn:
+            # 不同起始集号的数量不少于最大集号时必然不缺集,先在SQL中排除
+            rows = conn.execute(
+                "SELECT COALESCE(tmdbid, title) AS media_key, MAX(title) AS title, MAX(tmdbid) AS tmdbid, "
+                "season, GROUP_CONCAT(DISTINCT episode || '-' || COALESCE(episode_end, episode)) AS ranges, "
+                "MAX(COALESCE(episode_end, episode)) AS max_episode "
+                "FROM files WHERE media_type = 'tv' AND season IS NOT NULL AND episode IS NOT NULL "
+                "GROUP BY media_key, season HAVING COUNT(DISTINCT episode) < MAX(COALESCE(episode_end, episode)) "
+                "ORDER BY title, season"
+            )
+            for row in rows:
+                present = set()
+                for episode_range in row['ranges'].split(','):
+                    start, end = map(int, episode_range.split('-'))
+                    present.update(range(start, max(start, end) + 1))
+                absent = sorted(set(range(1, row['max_episode'] + 1)) - present)
+                if not absent:
+                    continue
+                missing.append({
+                    'title': row['title'],
+                    'tmdbid': row['tmdbid'],
+                    'season': row['season'],
+                    'max_episode': row['max_episode'],
+                    'missing': absent
+                })
+                if len(missing) >= limit:
+                    break
+        return missing
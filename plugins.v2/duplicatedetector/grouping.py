@@ -0,0 +1,81 @@
+import json
+import sqlite3
+from collections import defaultdict
+from itertools import groupby
+from pathlib import Path
+from typing import Any, List, Dict, Tuple, Iterator
+
+
+class MemoryGrouper:
+    """内存分组,适用于中小规模媒体库"""
+
+    def __init__(self):
+        self._groups = defaultdict(list)
+
+    def add(self, key: str, record: Dict[str, Any]):
+        """添加一条记录"""
+        self._groups[key].append(record)
+
+    def duplicate_groups(self, min_count: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """返回记录数不少于min_count的分组"""
+        for key, records in self._groups.items():
+            if len(records) >= min_count:
+                yield key, records
+
+    def close(self):
+        """释放分组数据"""
+        self._groups.clear()
+
+
+class SqliteGrouper:
+    """
+    SQLite外部分组:记录分批写入本地数据库,由索引上的GROUP BY ... HAVING筛选重复组,
+    分组器自身的内存占用只与单批写入量和单个重复组的大小有关(调用方的文件列表和文件状态不在此列)
+    """
+
+    def __init__(self, db_path: Path, batch_size: int = 5000):
+        self._db_path = Path(db_path)
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._db_path.exists():
+            self._db_path.unlink()
+        self._batch_size = batch_size
+        self._buffer = []
+        self._conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
+        # 临时数据,无需持久化保证
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY, key TEXT NOT NULL, rec TEXT NOT NULL)")
+
+    def add(self, key: str, record: Dict[str, Any]):
+        """添加一条记录,缓冲满一批后批量写入"""
+        self._buffer.append((key, json.dumps(record, ensure_ascii=False)))
+        if len(self._buffer) >= self._batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._conn.executemany("INSERT INTO records (key, rec) VALUES (?, ?)", self._buffer)
+            self._conn.commit()
+            self._buffer = []
+
+    def duplicate_groups(self, min_count: int) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """返回记录数不少于min_count的分组,逐组从数据库读取"""
+        self._flush()
+        # 写入完成后再建索引,避免逐条维护索引的开销
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_records_key ON records (key, id)")
+        cursor = self._conn.execute(
+            "SELECT key, rec FROM records WHERE key IN "
+            "(SELECT key FROM records GROUP BY key HAVING COUNT(*) >= ?) "
+            "ORDER BY key, id",
+            (min_count,)
+        )
+        for key, rows in groupby(cursor, key=lambda row: row[0]):
+            yield key, [json.loads(row[1]) for row in rows]
+
+    def close(self):
+        """关闭并删除临时数据库"""
+        try:
+            self._conn.close()
+        finally:
+            if self._db_path.exists():
+                self._db_path.unlink()
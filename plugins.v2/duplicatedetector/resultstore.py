@@ -0,0 +1,244 @@
+import base64
+import hashlib
+import json
+import zlib
+from collections.abc import Sequence
+from typing import Any, List, Dict, Optional, Set, Tuple
+
+# 编码格式标识,未带该标识的数据按旧版字典列表读取
+FORMAT = 'zlib-json-v1'
+
+_MB = 1024 * 1024
+# 文件记录中按位置保存的字段,其余字段放入附加字典
+_FILE_FIELDS = ('resolution', 'source', 'codec', 'season', 'episode', 'tmdbid', 'tv_dir')
+_FILE_KEYS = {'path', 'size', 'disk_size', 'size_bytes', 'disk_size_bytes', 'inode', 'freeable', 'mtime', 'links',
+              *_FILE_FIELDS}
+# 重复组中以MB保存、编码时转为字节数的字段 -> 对应的原始字节数字段
+_GROUP_SIZE_FIELDS = {'total_size': 'total_bytes', 'reclaimable_size': 'reclaimable_bytes'}
+
+
+def _to_bytes(size_mb: Optional[float]) -> int:
+    return int(round((size_mb or 0) * _MB))
+
+
+def _to_mb(size: int) -> float:
+    return round(size / _MB, 2)
+
+
+def _bytes_of(record: Dict[str, Any], field: str, bytes_field: str) -> int:
+    """记录中的原始字节数,没有时由MB换算(旧版本的记录)"""
+    value = record.get(bytes_field)
+    return value if value is not None else _to_bytes(record.get(field))
+
+
+def _upgrade_legacy_group(group: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    补全旧版本保存的重复组缺少的字段:组ID按扫描时的规则生成(没有group_key时使用类型、标题、年份、季集),
+    文件记录补充占用空间、硬链接等字段,旧版本不区分硬链接,文件均视为可释放
+    """
+    group = dict(group)
+    if not group.get('group_id'):
+        if group.get('group_key'):
+            key = f"{group.get('scan_path') or ''}|{group['group_key']}"
+        else:
+            key = '|'.join(str(group.get(field) or '')
+                           for field in ('type', 'title', 'year', 'season', 'episode', 'episode_str'))
+        group['group_id'] = hashlib.md5(key.encode()).hexdigest()[:12]
+    group['files'] = [{'disk_size': f.get('size'), 'inode': None, 'freeable': True, 'links': [], **f}
+                      for f in group.get('files') or []]
+    group.setdefault('count', len(group['files']))
+    group.setdefault('total_size', round(sum(f.get('size') or 0 for f in group['files']), 2))
+    return group
+
+
+class DirTable:
+    """目录字符串表,路径保存为(目录序号, 文件名),不含/的路径目录序号为-1"""
+
+    def __init__(self, dirs: Optional[List[str]] = None):
+        self.dirs = list(dirs or [])
+        self._index = {d: i for i, d in enumerate(self.dirs)}
+
+    def split(self, path: str) -> Tuple[int, str]:
+        """拆分路径,新目录追加到表中"""
+        directory, sep, name = path.rpartition('/')
+        if not sep:
+            return -1, name
+        dir_id = self._index.get(directory)
+        if dir_id is None:
+            dir_id = self._index[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        return dir_id, name
+
+    def key(self, path: str) -> Optional[Tuple[int, str]]:
+        """路径对应的(目录序号, 文件名),目录不在表中时返回None"""
+        directory, sep, name = path.rpartition('/')
+        if not sep:
+            return -1, name
+        dir_id = self._index.get(directory)
+        return (dir_id, name) if dir_id is not None else None
+
+    def join(self, dir_id: int, name: str) -> str:
+        return name if dir_id < 0 else f"{self.dirs[dir_id]}/{name}"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _encode_group(group: Dict[str, Any], dirs: DirTable) -> List:
+    """
+    重复组编码为[组信息, 文件行JSON],文件行为[目录序号, 文件名, 大小, 占用, inode, 可释放, 修改时间, 硬链接, 字段, 附加];
+    文件行单独序列化为字符串,读取结果时只需解析组信息
+    """
+    meta = {k: v for k, v in group.items() if k != 'files' and k not in _GROUP_SIZE_FIELDS.values()}
+    for field, bytes_field in _GROUP_SIZE_FIELDS.items():
+        if field in meta:
+            meta[field] = _bytes_of(group, field, bytes_field)
+    rows = []
+    for f in group['files']:
+        dir_id, name = dirs.split(f['path'])
+        rows.append([
+            dir_id, name,
+            _bytes_of(f, 'size', 'size_bytes'), _bytes_of(f, 'disk_size', 'disk_size_bytes'),
+            f.get('inode'), 1 if f.get('freeable') else 0, f.get('mtime'),
+            [list(dirs.split(link)) for link in f.get('links') or []],
+            [f.get(field) for field in _FILE_FIELDS],
+            {k: v for k, v in f.items() if k not in _FILE_KEYS}
+        ])
+    return [meta, _dumps(rows)]
+
+
+def _decode_meta(meta: Dict[str, Any]) -> Dict[str, Any]:
+    meta = dict(meta)
+    for field, bytes_field in _GROUP_SIZE_FIELDS.items():
+        if field in meta:
+            meta[bytes_field] = meta[field]
+            meta[field] = _to_mb(meta[field])
+    return meta
+
+
+def _decode_group(encoded: List, dirs: DirTable) -> Dict[str, Any]:
+    meta, rows = encoded
+    files = []
+    for dir_id, name, size, disk_size, inode, freeable, mtime, links, fields, extras in json.loads(rows):
+        file_info = {
+            'path': dirs.join(dir_id, name),
+            'size': _to_mb(size),
+            'disk_size': _to_mb(disk_size),
+            'size_bytes': size,
+            'disk_size_bytes': disk_size,
+            'inode': inode,
+            'freeable': bool(freeable),
+            'mtime': mtime,
+            'links': [dirs.join(*link) for link in links]
+        }
+        file_info.update((field, value) for field, value in zip(_FILE_FIELDS, fields) if value is not None)
+        file_info.update(extras)
+        files.append(file_info)
+    group = _decode_meta(meta)
+    group['files'] = files
+    return group
+
+
+class LazyGroups(Sequence):
+    """
+    延迟解码的重复组列表:组信息随时可读,文件列表在首次访问该组时才解码;
+    保存时未访问过的组直接复用原编码
+    """
+
+    def __init__(self, encoded: List[Optional[List]], decoded: List[Optional[Dict]], dirs: DirTable):
+        self._encoded = encoded
+        self._decoded = decoded
+        self._dirs = dirs
+
+    @classmethod
+    def from_list(cls, groups: List[Dict[str, Any]]) -> 'LazyGroups':
+        """包装已解码的重复组列表"""
+        return cls([None] * len(groups), list(groups), DirTable())
+
+    @property
+    def dirs(self) -> DirTable:
+        return self._dirs
+
+    def __len__(self) -> int:
+        return len(self._decoded)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self._decoded[index] is None:
+            self._decoded[index] = _decode_group(self._encoded[index], self._dirs)
+        return self._decoded[index]
+
+    def header(self, index: int) -> Dict[str, Any]:
+        """不解码文件列表,返回组信息(类型、数量、大小、diff_state等)"""
+        if self._decoded[index] is not None:
+            return self._decoded[index]
+        return _decode_meta(self._encoded[index][0])
+
+    def headers(self) -> List[Dict[str, Any]]:
+        return [self.header(i) for i in range(len(self))]
+
+    def locate(self, paths: Set[str]) -> List[int]:
+        """
+        包含任一路径(含硬链接路径)的组序号;未解码的组先在文件行字符串中查找文件名,
+        命中后才解析文件行比较目录序号
+        """
+        keys = {key for key in map(self._dirs.key, paths) if key}
+        names = {_dumps(name) for _, name in keys}
+        indexes = []
+        for i in range(len(self)):
+            group = self._decoded[i]
+            if group is not None:
+                found = any(f['path'] in paths or any(link in paths for link in f.get('links') or [])
+                            for f in group['files'])
+            else:
+                rows = self._encoded[i][1]
+                found = any(name in rows for name in names) and any(
+                    (row[0], row[1]) in keys or any(tuple(link) in keys for link in row[7])
+                    for row in json.loads(rows))
+            if found:
+                indexes.append(i)
+        return indexes
+
+    def select(self, indexes: List[int]) -> 'LazyGroups':
+        """按序号选出部分组,共享已有的编码和解码数据"""
+        return LazyGroups([self._encoded[i] for i in indexes], [self._decoded[i] for i in indexes], self._dirs)
+
+    def encode(self, dirs: DirTable) -> List[List]:
+        """编码全部组,dirs须包含本列表的目录表"""
+        return [self._encoded[i] if self._decoded[i] is None else _encode_group(self._decoded[i], dirs)
+                for i in range(len(self))]
+
+
+def encode_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """将检测结果编码为目录表 + 重复组的紧凑JSON,经zlib压缩后以base64保存"""
+    groups = result.get('duplicates') or []
+    if isinstance(groups, LazyGroups):
+        # 沿用原目录表,未解码的组无需重新编码
+        dirs = DirTable(groups.dirs.dirs)
+        encoded = groups.encode(dirs)
+    else:
+        dirs = DirTable()
+        encoded = [_encode_group(group, dirs) for group in groups]
+    payload = {
+        'meta': {k: v for k, v in result.items() if k != 'duplicates'},
+        'dirs': dirs.dirs,
+        'groups': encoded
+    }
+    data = zlib.compress(_dumps(payload).encode('utf-8'), 1)
+    return {'format': FORMAT, 'data': base64.b64encode(data).decode('ascii')}
+
+
+def decode_result(stored: Dict[str, Any]) -> Dict[str, Any]:
+    """解码检测结果,duplicates为LazyGroups;兼容旧版未编码的结果"""
+    if stored.get('format') != FORMAT:
+        result = dict(stored)
+        result['duplicates'] = LazyGroups.from_list([_upgrade_legacy_group(group)
+                                                     for group in stored.get('duplicates') or []])
+        return result
+    payload = json.loads(zlib.decompress(base64.b64decode(stored['data'])).decode('utf-8'))
+    groups = payload['groups']
+    result = payload['meta']
+    result['duplicates'] = LazyGroups(groups, [None] * len(groups), DirTable(payload['dirs']))
+    return result
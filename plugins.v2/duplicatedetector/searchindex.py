@@ -0,0 +1,95 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import List, Dict, Iterable, Optional, Set
+
+# 连续的字母数字,或连续的中日韩文字
+_TOKEN_RE = re.compile(r'[0-9a-z]+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    规范化并切分文本:NFKC后转小写,字母数字按词切分,
+    中日韩文字没有分隔符,按相邻两字切分,单字保留原字
+    """
+    tokens = []
+    for word in _TOKEN_RE.findall(unicodedata.normalize('NFKC', text or '').lower()):
+        if word[0].isascii() or len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class SearchIndex:
+    """
+    重复组倒排索引:词 -> 重复组ID集合;同时保存每个组的词表,
+    组变化或删除时只需更新该组的倒排项,持久化时也只保存词表
+    """
+
+    def __init__(self, documents: Optional[Dict[str, List[str]]] = None):
+        self._documents = {}
+        self._postings = defaultdict(set)
+        self._sorted_tokens = None
+        for group_id, tokens in (documents or {}).items():
+            self.add(group_id, tokens)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, group_id: str, tokens: Iterable[str]):
+        """添加或替换一个组的词表"""
+        self.remove(group_id)
+        tokens = set(tokens)
+        self._documents[group_id] = tokens
+        for token in tokens:
+            self._postings[token].add(group_id)
+        self._sorted_tokens = None
+
+    def remove(self, group_id: str):
+        """移除一个组"""
+        tokens = self._documents.pop(group_id, None)
+        if not tokens:
+            return
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            posting.discard(group_id)
+            if not posting:
+                del self._postings[token]
+        self._sorted_tokens = None
+
+    def _prefix_matches(self, prefix: str) -> Set[str]:
+        """以prefix开头的全部词对应的组,词表排序后二分查找"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        matches = set()
+        start = bisect_left(self._sorted_tokens, prefix)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches |= self._postings[token]
+        return matches
+
+    def search(self, query: str) -> Set[str]:
+        """返回包含全部查询词的组ID,最后一个词按前缀匹配,便于输入未完成时查询"""
+        tokens = tokenize(query)
+        if not tokens:
+            return set()
+        *exact, last = tokens
+        # 从最短的倒排表开始求交集
+        postings = sorted((self._postings.get(token, set()) for token in exact), key=len)
+        if postings and not postings[0]:
+            return set()
+        result = self._prefix_matches(last)
+        for posting in postings:
+            result = result & posting
+            if not result:
+                break
+        return result
+
+    def to_data(self) -> Dict[str, List[str]]:
+        """持久化数据:组ID -> 词表"""
+        return {group_id: sorted(tokens) for group_id, tokens in self._documents.items()}
@@ -0,0 +1,351 @@
+import os
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set
+
+# 网盘文件项中可能携带的内容哈希字段,按顺序取第一个
+HASH_FIELDS = ('sha1', 'hash', 'content_hash', 'md5')
+
+
+class StorageEntry(NamedTuple):
+    """存储中的一个文件或目录,大小为字节数"""
+    path: str
+    name: str
+    is_dir: bool
+    size: int = 0
+    disk_size: int = 0
+    mtime: Optional[float] = None
+    inode: Optional[str] = None  # 设备号:inode,远程存储为None
+    nlink: int = 1
+    dev: Optional[int] = None  # 本地目录所在设备,仅在需要时获取
+    hash: Optional[str] = None  # 远程存储返回的内容哈希,带算法名前缀
+    symlink: bool = False  # 指向文件的符号链接,删除只移除链接本身
+
+
+class StorageBackend:
+    """
+    存储后端:列举、状态和删除的统一接口。单项操作受每个后端独立的信号量限制,
+    批量操作在后端复用的线程池中并发执行;批量结果中失败的项为对应的异常。
+    扫描等后台操作使用单独的线程池,线程启动时执行background_initializer(如降低优先级),
+    不影响删除等交互操作
+    """
+
+    name = ''
+
+    def __init__(self, concurrency: int = 4, background_initializer: Optional[Callable] = None):
+        self.concurrency = max(int(concurrency), 1)
+        self._semaphore = threading.BoundedSemaphore(self.concurrency)
+        self._background_initializer = background_initializer
+        self._executors = {}  # 是否后台 -> 线程池
+        self._executor_lock = threading.Lock()
+
+    # 单项操作,子类实现下划线方法
+    def list_dir(self, path: str) -> Optional[List[StorageEntry]]:
+        """列举目录,目录不存在时返回None"""
+        with self._semaphore:
+            return self._list_dir(path)
+
+    def stat(self, path: str) -> Optional[StorageEntry]:
+        """获取文件状态,不存在时返回None"""
+        with self._semaphore:
+            return self._stat(path)
+
+    def delete(self, path: str) -> bool:
+        """删除文件,不存在时返回False,删除失败时抛出异常"""
+        with self._semaphore:
+            return self._delete(path)
+
+    def read(self, path: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        """读取文件内容(最多max_bytes字节),不存在时返回None"""
+        with self._semaphore:
+            return self._read(path, max_bytes)
+
+    def remove_dir_if_empty(self, path: str) -> bool:
+        """目录存在且为空时删除,返回是否已删除"""
+        with self._semaphore:
+            return self._remove_dir_if_empty(path)
+
+    def _list_dir(self, path: str) -> Optional[List[StorageEntry]]:
+        raise NotImplementedError
+
+    def _stat(self, path: str) -> Optional[StorageEntry]:
+        raise NotImplementedError
+
+    def _delete(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def _read(self, path: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def _remove_dir_if_empty(self, path: str) -> bool:
+        raise NotImplementedError
+
+    # 批量操作,background为True时在后台线程池中执行
+    def list_many(self, paths: Iterable[str], background: bool = False) -> Dict[str, Any]:
+        return self._map(self.list_dir, paths, background)
+
+    def stat_many(self, paths: Iterable[str], background: bool = False) -> Dict[str, Any]:
+        return self._map(self.stat, paths, background)
+
+    def delete_many(self, paths: Iterable[str]) -> Dict[str, Any]:
+        return self._map(self.delete, paths)
+
+    def read_many(self, paths: Iterable[str], max_bytes: Optional[int] = None,
+                  background: bool = False) -> Dict[str, Any]:
+        return self._map(lambda path: self.read(path, max_bytes), paths, background)
+
+    def remove_dirs_if_empty(self, paths: Iterable[str]) -> Dict[str, Any]:
+        return self._map(self.remove_dir_if_empty, paths)
+
+    def find_media(self, directory: str, stem: str, suffixes: Iterable[str]) -> Optional[str]:
+        """在目录中查找去掉后缀后名为stem、后缀在suffixes中的媒体文件,目录不存在或未找到时返回None"""
+        suffixes = set(suffixes)
+        for entry in self.list_dir(directory) or []:
+            if not entry.is_dir and self._media_match(entry, stem, suffixes):
+                return entry.path
+        return None
+
+    def _media_match(self, entry: StorageEntry, stem: str, suffixes: Set[str]) -> bool:
+        name = Path(entry.name)
+        return name.stem == stem and name.suffix.lower() in suffixes
+
+    def submit(self, func: Callable, *args, background: bool = False) -> Future:
+        """在后端线程池中执行一个单项操作,供需要边完成边处理结果的调用方使用"""
+        return self._get_executor(background).submit(func, *args)
+
+    def close(self):
+        """关闭线程池"""
+        with self._executor_lock:
+            executors, self._executors = self._executors, {}
+        for executor in executors.values():
+            executor.shutdown(wait=False)
+
+    def _get_executor(self, background: bool = False) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            executor = self._executors.get(background)
+            if executor is None:
+                executor = self._executors[background] = ThreadPoolExecutor(
+                    max_workers=self.concurrency,
+                    thread_name_prefix=f"DuplicateDetector-{self.name}{'-scan' if background else ''}",
+                    initializer=self._background_initializer if background else None
+                )
+            return executor
+
+    def _map(self, func: Callable, paths: Iterable[str], background: bool = False) -> Dict[str, Any]:
+        """并发执行单项操作,返回路径 -> 结果或异常,单个路径时直接在当前线程执行"""
+        paths = list(dict.fromkeys(paths))
+
+        def run(path):
+            try:
+                return func(path)
+            except Exception as e:
+                return e
+
+        if len(paths) <= 1 or self.concurrency == 1:
+            return {path: run(path) for path in paths}
+        return dict(zip(paths, self._get_executor(background).map(run, paths)))
+
+
+class LocalStorage(StorageBackend):
+    """本地文件系统(含网盘的本地挂载),列举时按配置决定是否跟随目录符号链接"""
+
+    name = 'local'
+
+    def __init__(self, concurrency: int = 4, follow_symlinks: bool = False, stat_dirs: bool = False,
+                 background_initializer: Optional[Callable] = None):
+        super().__init__(concurrency, background_initializer)
+        self.follow_symlinks = follow_symlinks
+        # 跟随符号链接或不跨越文件系统时,列举需要目录的设备号和inode
+        self.stat_dirs = stat_dirs
+
+    def _list_dir(self, path: str) -> Optional[List[StorageEntry]]:
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                dir_entries = list(it)
+        except FileNotFoundError:
+            return None
+        for entry in dir_entries:
+            try:
+                if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                    if self.stat_dirs:
+                        st = entry.stat(follow_symlinks=self.follow_symlinks)
+                        entries.append(StorageEntry(entry.path, entry.name, True,
+                                                    inode=f"{st.st_dev}:{st.st_ino}", dev=st.st_dev))
+                    else:
+                        entries.append(StorageEntry(entry.path, entry.name, True))
+                elif entry.is_file(follow_symlinks=True):
+                    # 文件的大小等信息由stat获取,列举时不额外读取
+                    entries.append(StorageEntry(entry.path, entry.name, False, symlink=entry.is_symlink()))
+            except OSError:
+                # 单个条目无法读取(如失效的链接)时跳过,不影响整个目录
+                continue
+        return entries
+
+    def _stat(self, path: str) -> Optional[StorageEntry]:
+        try:
+            st = os.lstat(path)
+            if stat.S_ISLNK(st.st_mode):
+                # 符号链接:大小取目标文件,占用空间只计链接本身,不带inode以免与目标合并为硬链接
+                target = os.stat(path)
+                blocks = getattr(st, 'st_blocks', None)
+                return StorageEntry(
+                    path, os.path.basename(path), False,
+                    size=target.st_size,
+                    disk_size=blocks * 512 if blocks is not None else 0,
+                    mtime=target.st_mtime,
+                    symlink=True
+                )
+        except FileNotFoundError:
+            # 文件不存在或链接已失效
+            return None
+        # st_blocks为实际占用的512字节块数,Windows等平台不提供时退化为文件大小
+        blocks = getattr(st, 'st_blocks', None)
+        return StorageEntry(
+            path, os.path.basename(path), False,
+            size=st.st_size,
+            disk_size=blocks * 512 if blocks is not None else st.st_size,
+            mtime=st.st_mtime,
+            inode=f"{st.st_dev}:{st.st_ino}" if st.st_ino else None,
+            nlink=st.st_nlink,
+            dev=st.st_dev
+        )
+
+    def _delete(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _read(self, path: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                return f.read(-1 if max_bytes is None else max_bytes)
+        except FileNotFoundError:
+            return None
+
+    def _remove_dir_if_empty(self, path: str) -> bool:
+        try:
+            with os.scandir(path) as it:
+                if next(it, None) is not None:
+                    return False
+            os.rmdir(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        return True
+
+
+class ChainStorage(StorageBackend):
+    """
+    通过StorageChain访问的网盘存储:复用同一个StorageChain,列举得到的文件项按路径缓存,
+    之后列举子目录或删除时不必再逐个查询文件项;获取状态总是重新查询
+    """
+
+    _max_items = 200000  # 文件项缓存上限,超出后清空重建
+
+    def __init__(self, chain, storage: str, concurrency: int = 4,
+                 background_initializer: Optional[Callable] = None):
+        super().__init__(concurrency, background_initializer)
+        self.name = storage
+        self._chain = chain
+        self._items = {}
+        self._items_lock = threading.Lock()
+
+    @staticmethod
+    def _key(path) -> str:
+        return str(Path(path))
+
+    @staticmethod
+    def item_hash(item) -> Optional[str]:
+        """文件项携带的内容哈希,带上字段名以区分算法"""
+        for field in HASH_FIELDS:
+            value = getattr(item, field, None)
+            if value:
+                return f"{field}:{str(value).lower()}"
+        return None
+
+    def _entry(self, item) -> StorageEntry:
+        size = item.size or 0
+        path = self._key(item.path)
+        return StorageEntry(path, item.name or Path(path).name, item.type == 'dir', size=size, disk_size=size,
+                            mtime=item.modify_time, hash=self.item_hash(item))
+
+    def _remember(self, items: List):
+        with self._items_lock:
+            if len(self._items) + len(items) > self._max_items:
+                self._items.clear()
+            for item in items:
+                self._items[self._key(item.path)] = item
+
+    def _forget(self, path: str):
+        with self._items_lock:
+            self._items.pop(self._key(path), None)
+
+    def get_item(self, path):
+        """路径对应的文件项,优先使用列举时缓存的文件项"""
+        key = self._key(path)
+        with self._items_lock:
+            item = self._items.get(key)
+        if item is None:
+            item = self._chain.get_file_item(storage=self.name, path=Path(key))
+            if item:
+                self._remember([item])
+        return item
+
+    def _list_dir(self, path: str) -> Optional[List[StorageEntry]]:
+        dir_item = self.get_item(path)
+        if not dir_item or dir_item.type != 'dir':
+            return None
+        items = [item for item in self._chain.list_files(dir_item) or [] if item]
+        self._remember(items)
+        return [self._entry(item) for item in items]
+
+    def _stat(self, path: str) -> Optional[StorageEntry]:
+        # 状态总是重新查询,不使用列举时缓存的文件项
+        item = self._chain.get_file_item(storage=self.name, path=Path(self._key(path)))
+        if not item:
+            self._forget(path)
+            return None
+        self._remember([item])
+        return self._entry(item)
+
+    def _delete(self, path: str, media: bool = False) -> bool:
+        item = self.get_item(path)
+        if not item:
+            return False
+        deleted = self._chain.delete_media_file(fileitem=item) if media else self._chain.delete_file(item)
+        if not deleted:
+            raise Exception(f"StorageChain({self.name})删除失败: {path}")
+        self._forget(path)
+        return True
+
+    def _media_match(self, entry: StorageEntry, stem: str, suffixes: Set[str]) -> bool:
+        # StorageChain返回的basename有的含后缀、有的不含,后缀取文件项的extension(可能不带点)
+        with self._items_lock:
+            item = self._items.get(self._key(entry.path))
+        basename = getattr(item, 'basename', None) or entry.name
+        if stem not in (basename, Path(basename).stem, Path(entry.name).stem):
+            return False
+        extension = getattr(item, 'extension', None) or Path(entry.name).suffix
+        if not extension:
+            return False
+        if not extension.startswith('.'):
+            extension = f".{extension}"
+        return extension.lower() in suffixes
+
+    def delete_media(self, path: str) -> bool:
+        """按媒体文件删除,由StorageChain一并处理刮削等关联文件"""
+        with self._semaphore:
+            return self._delete(path, media=True)
+
+    def _remove_dir_if_empty(self, path: str) -> bool:
+        dir_item = self.get_item(path)
+        if not dir_item or dir_item.type != 'dir' or self._chain.list_files(dir_item):
+            return False
+        if not self._chain.delete_file(dir_item):
+            return False
+        self._forget(path)
+        return True
@@ -0,0 +1,130 @@
+"""
+重复文件排查插件测试的公共桩模块:MoviePilot的app包及其自带的apscheduler以最小桩模块代替,
+只提供插件用到的接口。
+"""
+import importlib.util
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+PLUGIN_DIR = Path(__file__).resolve().parents[1] / "plugins.v2" / "duplicatedetector"
+MODULE_NAME = "duplicatedetector_test"
+# 只在扫描、查询或删除时导入的模块
+LAZY_MODULES = ("catalog", "grouping", "searchindex", "storage")
+
+
+class _Response:
+    def __init__(self, success=True, message=None, data=None):
+        self.success, self.message, self.data = success, message, data
+
+
+class _Logger:
+    def __init__(self):
+        self.warnings = []
+
+    def warning(self, msg, *args, **kwargs):
+        self.warnings.append(msg)
+
+    warn = warning
+
+    def debug(self, msg, *args, **kwargs):
+        pass
+
+    info = error = debug
+
+
+class _CronTrigger:
+    @classmethod
+    def from_crontab(cls, expr, timezone=None):
+        if len(expr.split()) != 5:
+            raise ValueError(f"Wrong number of fields; got {len(expr.split())}, expected 5")
+        return cls()
+
+
+class StorageChainStub:
+    created = 0
+
+    def __init__(self):
+        StorageChainStub.created += 1
+
+
+def _make_plugin_base(data_path: Path):
+    class _PluginBase:
+        def __init__(self):
+            self._data = {}
+
+        def get_data(self, key=None):
+            return self._data.get(key)
+
+        def save_data(self, key, value):
+            self._data[key] = value
+
+        def del_data(self, key):
+            self._data.pop(key, None)
+
+        def get_data_path(self):
+            return data_path
+
+        def update_config(self, config):
+            self.config = config
+
+        def get_config(self):
+            return getattr(self, 'config', None)
+
+    return _PluginBase
+
+
+@pytest.fixture
+def app_stubs(monkeypatch, tmp_path):
+    logger = _Logger()
+    modules = {
+        "app": types.ModuleType("app"),
+        "app.schemas": types.ModuleType("app.schemas"),
+        "app.log": types.ModuleType("app.log"),
+        "app.plugins": types.ModuleType("app.plugins"),
+        "app.core": types.ModuleType("app.core"),
+        "app.core.config": types.ModuleType("app.core.config"),
+        "app.chain": types.ModuleType("app.chain"),
+        "app.chain.storage": types.ModuleType("app.chain.storage"),
+        "apscheduler": types.ModuleType("apscheduler"),
+        "apscheduler.triggers": types.ModuleType("apscheduler.triggers"),
+        "apscheduler.triggers.cron": types.ModuleType("apscheduler.triggers.cron"),
+    }
+    modules["app.schemas"].Response = _Response
+    modules["app"].schemas = modules["app.schemas"]
+    modules["app.log"].logger = logger
+    modules["app.plugins"]._PluginBase = _make_plugin_base(tmp_path / "data")
+    modules["app.core.config"].settings = types.SimpleNamespace(API_TOKEN="token")
+    modules["app.chain.storage"].StorageChain = StorageChainStub
+    modules["apscheduler.triggers.cron"].CronTrigger = _CronTrigger
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    for name in [MODULE_NAME, *(f"{MODULE_NAME}.{sub}" for sub in (*LAZY_MODULES, "resultstore"))]:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    StorageChainStub.created = 0
+    return logger
+
+
+def load_plugin_module():
+    """以桩模块导入插件包"""
+    spec = importlib.util.spec_from_file_location(MODULE_NAME, PLUGIN_DIR / "__init__.py",
+                                                  submodule_search_locations=[str(PLUGIN_DIR)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[MODULE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_submodule(name: str):
+    """直接导入不依赖app包的子模块"""
+    spec = importlib.util.spec_from_file_location(f"duplicatedetector_{name}", PLUGIN_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def plugin_module(app_stubs):
+    return load_plugin_module()
@@ -0,0 +1,92 @@
+"""
+扫描检查点:暂停后从检查点继续的结果与一次扫描完成相同,已发现的文件只追加写入。
+"""
+import json
+from pathlib import Path
+
+
+def _library(root: Path, count: int = 30):
+    for i in range(count):
+        for quality in ("1080p", "720p"):
+            path = root / f"X{i} (2000)" / f"X{i}.2000.{quality}.mkv"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * 1024)
+
+
+def _plugin(plugin_module, library: Path):
+    plugin = plugin_module.DuplicateDetector()
+    plugin.init_plugin({"enabled": True, "scan_paths": str(library), "file_extensions": "mkv",
+                        "scan_concurrency": 2, "checkpoint_interval": 3600})
+    return plugin
+
+
+def _pause_after(plugin, calls: int):
+    """第calls次检查时间片时暂停扫描"""
+    counter = {'n': 0}
+
+    def time_up():
+        counter['n'] += 1
+        if counter['n'] == calls:
+            plugin._scan_paused = True
+        return plugin._scan_paused
+
+    plugin._DuplicateDetector__scan_time_up = time_up
+
+
+def _group_paths(plugin):
+    result = plugin._DuplicateDetector__load_result()
+    return sorted(sorted(f['path'] for f in group['files']) for group in result['duplicates'])
+
+
+def test_resume_matches_full_scan_and_appends_files(plugin_module, tmp_path):
+    library = tmp_path / "movie"
+    _library(library)
+    plugin = _plugin(plugin_module, library)
+    checkpoint_dir = Path(plugin.get_data_path()) / "scan_checkpoint"
+
+    _pause_after(plugin, 3)
+    plugin._DuplicateDetector__run_detection()
+    state = json.loads((checkpoint_dir / "state.json").read_text(encoding='utf-8'))
+    first_count, first_offset = state['current']['files_saved']
+    assert 0 < first_count < 60
+    first_content = (checkpoint_dir / "files.jsonl").read_bytes()
+    assert len(first_content) == first_offset
+
+    _pause_after(plugin, 3)
+    plugin._scan_paused = False
+    plugin._DuplicateDetector__run_detection()
+    state = json.loads((checkpoint_dir / "state.json").read_text(encoding='utf-8'))
+    assert state['current']['files_saved'][0] > first_count
+    # 之前保存的部分保持不变,只在末尾追加
+    assert (checkpoint_dir / "files.jsonl").read_bytes().startswith(first_content)
+
+    _pause_after(plugin, 0)
+    plugin._scan_paused = False
+    plugin._DuplicateDetector__run_detection()
+    assert not checkpoint_dir.exists()
+    resumed = _group_paths(plugin)
+    assert len(resumed) == 30
+
+    fresh = _plugin(plugin_module, library)
+    fresh._DuplicateDetector__run_detection()
+    assert _group_paths(fresh) == resumed
+    plugin.stop_service()
+
+
+def test_resume_ignores_lines_written_after_state(plugin_module, tmp_path):
+    library = tmp_path / "movie"
+    _library(library)
+    plugin = _plugin(plugin_module, library)
+    checkpoint_dir = Path(plugin.get_data_path()) / "scan_checkpoint"
+    _pause_after(plugin, 3)
+    plugin._DuplicateDetector__run_detection()
+    # 模拟追加文件后、写入state.json前中断
+    with open(checkpoint_dir / "files.jsonl", 'ab') as f:
+        f.write(b'"/not/scanned.mkv"\n')
+
+    _pause_after(plugin, 0)
+    plugin._scan_paused = False
+    plugin._DuplicateDetector__run_detection()
+    paths = [path for group in _group_paths(plugin) for path in group]
+    assert len(paths) == 60 and "/not/scanned.mkv" not in paths
+    plugin.stop_service()
@@ -0,0 +1,84 @@
+"""
+删除文件后检测结果的更新:剧集组按剩余文件重新计算重复的集;
+停止插件时不等待进行中的网盘删除。
+"""
+import threading
+import time
+from pathlib import Path
+
+
+def _write(path: Path, size_kb: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size_kb * 1024)
+
+
+def _scan(plugin_module, library: Path):
+    plugin = plugin_module.DuplicateDetector()
+    plugin.init_plugin({"enabled": True, "scan_paths": str(library), "file_extensions": "mkv"})
+    plugin._DuplicateDetector__run_detection()
+    return plugin
+
+
+def _groups(plugin):
+    result = plugin._DuplicateDetector__load_result()
+    return list(result['duplicates']) if result else []
+
+
+def test_deleting_multi_episode_file_dissolves_group(plugin_module, tmp_path):
+    season = tmp_path / "tv" / "Show (2019)" / "Season 1"
+    _write(season / "Show.S01E01-E02.2160p.mkv", 30)
+    _write(season / "Show.S01E01.1080p.mkv", 20)
+    _write(season / "Show.S01E02.1080p.mkv", 20)
+    plugin = _scan(plugin_module, tmp_path / "tv")
+    groups = _groups(plugin)
+    assert [g['count'] for g in groups] == [3]
+
+    response = plugin.delete_file(str(season / "Show.S01E01-E02.2160p.mkv"), 'token')
+    assert response.success
+    # 剩下的E01和E02互不重叠,不再是重复组
+    assert _groups(plugin) == []
+    plugin.stop_service()
+
+
+def test_deleting_one_copy_keeps_remaining_duplicate_episode(plugin_module, tmp_path):
+    season = tmp_path / "tv" / "Show (2019)" / "Season 1"
+    _write(season / "Show.S01E01-E02.2160p.mkv", 30)
+    _write(season / "Show.S01E01.1080p.mkv", 20)
+    _write(season / "Show.S01E01.720p.mkv", 10)
+    _write(season / "Show.S01E02.1080p.mkv", 20)
+    plugin = _scan(plugin_module, tmp_path / "tv")
+
+    plugin.delete_file(str(season / "Show.S01E01-E02.2160p.mkv"), 'token')
+    groups = _groups(plugin)
+    assert len(groups) == 1
+    assert groups[0]['episode_str'] == 'E01'
+    assert sorted(Path(f['path']).name for f in groups[0]['files']) == \
+           ["Show.S01E01.1080p.mkv", "Show.S01E01.720p.mkv"]
+    assert groups[0]['reclaimable_size'] > 0
+    plugin.stop_service()
+
+
+def test_stop_service_does_not_wait_for_running_delete(plugin_module, tmp_path):
+    plugin = plugin_module.DuplicateDetector()
+    plugin.save_data('delete_queue', [{'id': 'slow', 'strm_path': str(tmp_path / "strm" / "A.strm"),
+                                       'storage': 'local', 'attempts': 0, 'next_time': 0, 'error': None}])
+    started_delete, release = threading.Event(), threading.Event()
+
+    def slow_delete(task):
+        started_delete.set()
+        release.wait(timeout=5)
+
+    plugin._DuplicateDetector__process_cloud_delete = slow_delete
+    plugin.init_plugin({"enabled": True, "strm_library_path": str(tmp_path / "strm"),
+                        "cloud_library_path": str(tmp_path / "cloud")})
+    worker = plugin._delete_worker
+    assert started_delete.wait(timeout=2)
+
+    started = time.perf_counter()
+    plugin.stop_service()
+    assert time.perf_counter() - started < 1
+    # 进行中的删除完成后线程自行退出,并保存队列
+    release.set()
+    worker.join(timeout=2)
+    assert not worker.is_alive()
+    assert plugin.get_data('delete_queue') == []
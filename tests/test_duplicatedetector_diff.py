@@ -0,0 +1,29 @@
+"""
+扫描差异:按组内文件路径集合的指纹对比本次与上次扫描的重复组。
+"""
+
+
+def _group(group_id: str, *paths: str):
+    return {'group_id': group_id, 'files': [{'path': path} for path in paths]}
+
+
+def test_diff_with_previous_scan(plugin_module):
+    plugin = plugin_module.DuplicateDetector()
+    diff_with_previous = plugin._DuplicateDetector__diff_with_previous
+
+    first = [_group("a", "/m/A.1080p.mkv", "/m/A.720p.mkv"), _group("b", "/m/B.1080p.mkv", "/m/B.720p.mkv")]
+    diff = diff_with_previous(first)
+    assert diff['previous_scan_time'] is None
+    assert diff['new'] == ["a", "b"] and diff['changed'] == [] and diff['resolved'] == []
+
+    # 文件顺序不影响指纹
+    second = [_group("a", "/m/A.720p.mkv", "/m/A.1080p.mkv"), _group("c", "/m/C.1080p.mkv", "/m/C.720p.mkv")]
+    diff = diff_with_previous(second)
+    assert diff['previous_scan_time'] is not None
+    assert (diff['new'], diff['changed'], diff['resolved']) == (["c"], [], ["b"])
+    assert [dup['diff_state'] for dup in second] == ['unchanged', 'new']
+
+    third = [_group("a", "/m/A.720p.mkv", "/m/A.1080p.mkv", "/m/A.2160p.mkv")]
+    diff = diff_with_previous(third)
+    assert (diff['new'], diff['changed'], diff['resolved']) == ([], ["a"], ["c"])
+    assert third[0]['diff_state'] == 'changed'
@@ -0,0 +1,67 @@
+"""
+剧集集号区间的扫描线分组,以及按保留规则选择每个分量中保留的文件。
+"""
+
+
+def _record(name: str, start: int, end: int, **fields):
+    return {'path': f"/tv/Show/Season 1/{name}", 'episode_range': (start, end), **fields}
+
+
+def _names(records):
+    return sorted(r['path'].rsplit('/', 1)[1] for r in records)
+
+
+def test_sweep_line_groups_overlapping_ranges(plugin_module):
+    overlapping = plugin_module.DuplicateDetector._DuplicateDetector__overlapping_episodes
+    records = [
+        _record("E05.mkv", 5, 5), _record("E01.mkv", 1, 1), _record("E04-E05.mkv", 4, 5),
+        _record("E02.mkv", 2, 2), _record("E01-E02.mkv", 1, 2), _record("E03.mkv", 3, 3),
+        _record("E04.mkv", 4, 4)
+    ]
+    components = overlapping(records)
+    assert [_names(c) for c in components] == [
+        ["E01-E02.mkv", "E01.mkv", "E02.mkv"], ["E03.mkv"], ["E04-E05.mkv", "E04.mkv", "E05.mkv"]]
+    # 多集分量统一为分量范围,文件保留各自的区间;单集分量去掉区间
+    assert {r['episode'] for r in components[0]} == {"01-E02"}
+    assert {r['episode_range'] for r in components[2]} == {(4, 5), (4, 4), (5, 5)}
+    assert components[1][0]['episode'] == "03" and 'episode_range' not in components[1][0]
+
+
+def test_sweep_line_keeps_adjacent_ranges_apart(plugin_module):
+    overlapping = plugin_module.DuplicateDetector._DuplicateDetector__overlapping_episodes
+    components = overlapping([_record("E01-E02.mkv", 1, 2), _record("E03-E04.mkv", 3, 4),
+                              _record("E02-E03.mkv", 2, 3)])
+    # 区间经E02-E03连接为一个分量
+    assert len(components) == 1 and components[0][0]['episode'] == "01-E04"
+    components = overlapping([_record("E01-E02.mkv", 1, 2), _record("E03-E04.mkv", 3, 4)])
+    assert [c[0]['episode'] for c in components] == ["01-E02", "03-E04"]
+
+
+def test_keep_sort_key_follows_rule(plugin_module):
+    sort_key = plugin_module.DuplicateDetector._DuplicateDetector__keep_sort_key
+    uhd = {'resolution': '2160p', 'size': 10, 'mtime': 1}
+    big = {'resolution': '1080P', 'size': 40, 'mtime': 3}
+    unknown = {'resolution': None, 'size': 50, 'mtime': 2}
+
+    def order(rule):
+        return sorted([uhd, big, unknown], key=lambda f: sort_key(f, rule), reverse=True)
+
+    assert order('resolution') == [uhd, big, unknown]
+    assert order('size') == [unknown, big, uhd]
+    assert order('mtime') == [big, unknown, uhd]
+
+
+def test_select_keep_covers_every_episode(plugin_module):
+    detector = plugin_module.DuplicateDetector
+    select_keep = detector._DuplicateDetector__select_keep
+    sort_key = detector._DuplicateDetector__keep_sort_key
+    pack = _record("E01-E02.2160p.mkv", 1, 2, resolution='2160p', size=30)
+    e01 = _record("E01.1080p.mkv", 1, 1, resolution='1080p', size=40)
+    e02 = _record("E02.1080p.mkv", 2, 2, resolution='1080p', size=35)
+    # 分辨率优先时多集文件覆盖全部集号,单集文件均可删除
+    assert select_keep([e01, pack, e02], lambda f: sort_key(f, 'resolution')) == [pack]
+    # 体积优先时两个单集文件已覆盖多集文件的集号
+    assert select_keep([pack, e02, e01], lambda f: sort_key(f, 'size')) == [e01, e02]
+    # 单集组只保留一个文件
+    movies = [{'path': '/m/a.mkv', 'size': 1}, {'path': '/m/b.mkv', 'size': 2}]
+    assert select_keep(movies, lambda f: sort_key(f, 'size')) == [movies[1]]
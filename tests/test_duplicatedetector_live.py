@@ -0,0 +1,63 @@
+"""
+扫描增量结果:单个扫描路径遍历期间按检查点间隔发布阶段性的重复组,路径完成后以最终结果更新。
+"""
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+
+def _library(root: Path, count: int = 30):
+    for i in range(count):
+        for quality in ("1080p", "720p"):
+            path = root / f"X{i} (2000)" / f"X{i}.2000.{quality}.mkv"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * 1024)
+
+
+def _fast_clock(plugin_module, monkeypatch, step: float = 100):
+    """每次读取单调时钟前进step秒,使每批目录遍历后都达到发布间隔"""
+    clock = {'now': 0.0}
+
+    def monotonic():
+        clock['now'] += step
+        return clock['now']
+
+    monkeypatch.setattr(plugin_module, 'time', SimpleNamespace(time=time.time, sleep=time.sleep,
+                                                               monotonic=monotonic))
+
+
+def test_groups_are_published_while_single_path_is_walked(plugin_module, monkeypatch, tmp_path):
+    library = tmp_path / "movie"
+    _library(library)
+    plugin = plugin_module.DuplicateDetector()
+    plugin.init_plugin({"enabled": True, "scan_paths": str(library), "file_extensions": "mkv",
+                        "scan_concurrency": 2, "checkpoint_interval": 60})
+    _fast_clock(plugin_module, monkeypatch)
+
+    seen = []
+    original = plugin._DuplicateDetector__detect_duplicates
+
+    def detect(files, file_stats, catalog=None):
+        seen.append(len(files))
+        return original(files, file_stats, catalog)
+
+    plugin._DuplicateDetector__detect_duplicates = detect
+    plugin._DuplicateDetector__run_detection()
+
+    # 已发现的文件数翻倍才重新分组:60个文件最多分组log2(60)次,另加路径完成时一次
+    assert 2 <= len(seen) <= 7 and seen[-1] == 60
+    data = plugin.scan_delta('token', limit=1000).data
+    assert data['finished'] and data['total'] == 30
+    partial = [group for group in data['groups'] if group['partial']]
+    assert 0 < len(partial) < 30
+    # 同一组以最后一条为准,路径完成后全部为最终结果
+    latest = {group['group_id']: group for group in data['groups']}
+    assert len(latest) == 30 and not any(group['partial'] for group in latest.values())
+    result = plugin._DuplicateDetector__load_result()
+    assert set(latest) == {group['group_id'] for group in result['duplicates']}
+
+    # 增量游标只返回之后新发布的组
+    cursor = plugin.scan_delta('token', limit=len(partial)).data['cursor']
+    rest = plugin.scan_delta('token', cursor=cursor, limit=1000).data['groups']
+    assert len(rest) == len(data['groups']) - len(partial)
+    plugin.stop_service()
@@ -0,0 +1,118 @@
+"""
+检测结果的保存格式:紧凑编码的往返,以及旧版本保存的未编码结果的读取。
+"""
+from conftest import load_submodule
+
+
+def _legacy_result():
+    """旧版本保存的检测结果:未编码,重复组没有组ID,文件没有占用空间和硬链接字段"""
+    return {
+        'scan_time': '2024-01-01 00:00:00',
+        'scan_paths': ['/media/movie', '/media/tv'],
+        'total_duplicates': 2,
+        'total_files': 4,
+        'total_size': 9.57,
+        'duplicates': [
+            {'type': '电影', 'title': 'A', 'year': '2020', 'tmdbid': '1', 'season': None, 'episode': None,
+             'count': 2, 'total_size': 7.81, 'files': [
+                 {'path': '/media/movie/A (2020)/A.2020.1080p.mkv', 'size': 4.88,
+                  'resolution': '1080p', 'source': 'BluRay', 'codec': 'H.264'},
+                 {'path': '/media/movie/A (2020)/A.2020.720p.mkv', 'size': 2.93,
+                  'resolution': '720p', 'source': 'WEB-DL', 'codec': 'H.265'}]},
+            {'type': '剧集', 'title': 'Show', 'year': '2019', 'tmdbid': '9', 'season': '1',
+             'episode_str': 'E01', 'episode_count': 1, 'count': 2, 'total_size': 1.76, 'files': [
+                 {'path': '/media/tv/Show (2019)/Season 1/Show.S01E01.1080p.mkv', 'size': 0.98,
+                  'resolution': '1080p', 'source': '', 'codec': '', 'tv_dir': 'Show (2019)',
+                  'season': '1', 'episode': '01', 'tmdbid': '9'},
+                 {'path': '/media/tv/Show (2019)/Season 1/Show.S01E01.720p.mkv', 'size': 0.78,
+                  'resolution': '720p', 'source': '', 'codec': '', 'tv_dir': 'Show (2019)',
+                  'season': '1', 'episode': '01', 'tmdbid': '9'}]}
+        ]
+    }
+
+
+def _compact_result():
+    """当前版本扫描得到的检测结果:带原始字节数、硬链接和附加字段"""
+    return {
+        'scan_time': '2026-01-01 00:00:00',
+        'scan_paths': ['/media/movie'],
+        'diff': {'new': ['g1'], 'changed': [], 'resolved': []},
+        'duplicates': [
+            {'group_id': 'g1', 'group_key': 'movie:1', 'type': '电影', 'title': 'A', 'year': '2020',
+             'tmdbid': '1', 'season': None, 'count': 2, 'total_size': 1.5, 'total_bytes': 1572864,
+             'reclaimable_size': 0.5, 'reclaimable_bytes': 524289, 'diff_state': 'new', 'files': [
+                 {'path': '/media/movie/A (2020)/A.2020.1080p.mkv', 'size': 1.0, 'disk_size': 1.0,
+                  'size_bytes': 1048575, 'disk_size_bytes': 1048576, 'inode': '2049:12', 'freeable': False,
+                  'mtime': 1700000000.5, 'links': ['/media/movie/A (2020)/extra/A.link.mkv'],
+                  'resolution': '1080p', 'source': 'BluRay', 'codec': 'H.264', 'tmdbid': '1'},
+                 {'path': '/media/movie/A (2020)/A.2020.720p.mkv', 'size': 0.5, 'disk_size': 0.0,
+                  'size_bytes': 524289, 'disk_size_bytes': 0, 'inode': None, 'freeable': False,
+                  'mtime': None, 'links': [], 'resolution': '720p', 'source': '', 'codec': '',
+                  'symlink': True}]}
+        ]
+    }
+
+
+def test_legacy_result_gets_group_ids():
+    resultstore = load_submodule("resultstore")
+    result = resultstore.decode_result(_legacy_result())
+    groups = list(result['duplicates'])
+    ids = [group['group_id'] for group in groups]
+    assert all(ids) and len(set(ids)) == 2
+    # 组ID稳定,同一结果再次读取得到相同ID
+    assert ids == [group['group_id'] for group in resultstore.decode_result(_legacy_result())['duplicates']]
+    movie_file = groups[0]['files'][0]
+    assert movie_file['disk_size'] == 4.88 and movie_file['freeable'] and movie_file['links'] == []
+
+
+def test_legacy_result_survives_reencode():
+    resultstore = load_submodule("resultstore")
+    result = resultstore.decode_result(_legacy_result())
+    decoded = resultstore.decode_result(resultstore.encode_result(result))
+    assert [group['group_id'] for group in decoded['duplicates']] == \
+           [group['group_id'] for group in result['duplicates']]
+    assert [f['path'] for f in decoded['duplicates'][1]['files']] == \
+           [f['path'] for f in _legacy_result()['duplicates'][1]['files']]
+
+
+def test_page_renders_legacy_result(plugin_module, tmp_path):
+    plugin = plugin_module.DuplicateDetector()
+    plugin.save_data('detection_result', _legacy_result())
+    plugin.init_plugin({"enabled": True, "scan_paths": str(tmp_path / "library")})
+    page = plugin.get_page()
+    assert page
+    plugin.stop_service()
+
+
+def test_search_falls_back_to_legacy_result(plugin_module, tmp_path):
+    plugin = plugin_module.DuplicateDetector()
+    plugin.save_data('detection_result', _legacy_result())
+    plugin.init_plugin({"enabled": True, "scan_paths": str(tmp_path / "library")})
+    # 旧版本没有保存搜索索引,由检测结果生成
+    response = plugin.search('token', 'show', detail=True)
+    assert response.success
+    assert response.data['total'] == 1
+    assert response.data['groups'][0]['title'] == 'Show'
+    plugin.stop_service()
+
+
+def test_compact_result_round_trip():
+    resultstore = load_submodule("resultstore")
+    original = _compact_result()
+    stored = resultstore.encode_result(original)
+    assert stored['format'] == resultstore.FORMAT
+    result = resultstore.decode_result(stored)
+    assert result['scan_time'] == original['scan_time'] and result['diff'] == original['diff']
+    # 组信息无需解码文件列表即可读取,大小按原始字节数还原
+    header = result['duplicates'].header(0)
+    assert (header['total_bytes'], header['reclaimable_bytes']) == (1572864, 524289)
+    assert header['reclaimable_size'] == 0.5
+    group = result['duplicates'][0]
+    expected = original['duplicates'][0]
+    assert {k: v for k, v in group.items() if k != 'files'} == {k: v for k, v in expected.items() if k != 'files'}
+    for decoded, source in zip(group['files'], expected['files']):
+        assert {k: v for k, v in decoded.items() if v not in (None, '')} == \
+               {k: v for k, v in source.items() if v not in (None, '')}
+    # 未解码的组再次保存时沿用原编码
+    reloaded = resultstore.decode_result(stored)
+    assert resultstore.decode_result(resultstore.encode_result(reloaded))['duplicates'][0] == group
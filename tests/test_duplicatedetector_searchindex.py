@@ -0,0 +1,38 @@
+"""
+搜索索引:文本规范化切分,倒排表求交集,最后一个词按前缀匹配。
+"""
+from conftest import load_submodule
+
+
+def test_tokenize_normalizes_and_splits_cjk():
+    searchindex = load_submodule("searchindex")
+    # 全角字母数字经NFKC规范化,大小写统一
+    assert searchindex.tokenize("Ｔｈｅ Matrix.1999.2160p") == ["the", "matrix", "1999", "2160p"]
+    # 中日韩文字按相邻两字切分,单字保留原字
+    assert searchindex.tokenize("流浪地球2") == ["流浪", "浪地", "地球", "2"]
+    assert searchindex.tokenize("海 (2020)") == ["海", "2020"]
+    assert searchindex.tokenize(None) == []
+
+
+def test_search_intersects_tokens_and_matches_prefix():
+    searchindex = load_submodule("searchindex")
+    tokenize = searchindex.tokenize
+    index = searchindex.SearchIndex({
+        "g1": tokenize("流浪地球 2019 2160p"),
+        "g2": tokenize("流浪地球2 2023 1080p"),
+        "g3": tokenize("The Matrix 1999 1080p"),
+    })
+    assert index.search("流浪地球") == {"g1", "g2"}
+    assert index.search("地球 2023") == {"g2"}
+    assert index.search("matr") == {"g3"}
+    assert index.search("1080p mat") == {"g3"}
+    assert index.search("matrix 2160") == set()
+    assert index.search("  ") == set()
+
+    # 替换和删除只更新该组的倒排项
+    index.add("g3", tokenize("The Matrix Reloaded 2003"))
+    assert index.search("reload") == {"g3"} and index.search("1999") == set()
+    index.remove("g1")
+    assert index.search("流浪") == {"g2"}
+    restored = searchindex.SearchIndex(index.to_data())
+    assert len(restored) == 2 and restored.search("reloaded") == {"g3"}
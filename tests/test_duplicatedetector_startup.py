@@ -0,0 +1,60 @@
+"""
+重复文件排查插件的启动开销:模块加载和init_plugin须在预算内完成,
+且初始化时不创建存储管理链、不导入目录库等按需加载的模块。
+"""
+import sys
+import time
+
+from conftest import LAZY_MODULES, MODULE_NAME, StorageChainStub, load_plugin_module
+
+
+def test_module_load_within_budget(app_stubs):
+    module = load_plugin_module()
+    assert module._load_time < module.DuplicateDetector._load_budget
+    for sub in LAZY_MODULES:
+        assert f"{MODULE_NAME}.{sub}" not in sys.modules
+
+
+def test_init_plugin_within_budget(app_stubs, tmp_path):
+    module = load_plugin_module()
+    plugin = module.DuplicateDetector()
+    config = {
+        "enabled": True,
+        "onlyonce": False,
+        "cron": "0 3 * * *",
+        "scan_paths": str(tmp_path / "library"),
+        "strm_library_path": str(tmp_path / "strm"),
+        "cloud_library_path": str(tmp_path / "cloud"),
+        "cloud_storage": "u115",
+        "catalog_enabled": True
+    }
+    started = time.perf_counter()
+    plugin.init_plugin(config)
+    init_time = time.perf_counter() - started
+    assert init_time < module.DuplicateDetector._init_budget
+    # 启动时只读取配置
+    assert StorageChainStub.created == 0
+    for sub in LAZY_MODULES:
+        assert f"{MODULE_NAME}.{sub}" not in sys.modules
+    assert not any("超过" in msg for msg in app_stubs.warnings)
+    plugin.stop_service()
+
+
+def test_invalid_cron_is_not_scheduled(app_stubs, tmp_path):
+    module = load_plugin_module()
+    plugin = module.DuplicateDetector()
+    plugin.init_plugin({"enabled": True, "cron": "every night", "scan_paths": str(tmp_path / "library")})
+    assert plugin.get_service() == []
+    assert any("定时扫描周期无效" in msg for msg in app_stubs.warnings)
+    plugin.init_plugin({"enabled": True, "cron": "0 3 * * *", "scan_paths": str(tmp_path / "library")})
+    assert [service["id"] for service in plugin.get_service()] == ["DuplicateDetector"]
+    plugin.stop_service()
+
+
+def test_instances_do_not_share_state(plugin_module):
+    first, second = plugin_module.DuplicateDetector(), plugin_module.DuplicateDetector()
+    for name in ("_storages", "_delete_queue", "_delete_last_time", "_prune_pending", "_nfo_cache",
+                 "_delete_lock", "_scan_lock", "_result_lock", "_live_lock"):
+        assert getattr(first, name) is not getattr(second, name)
+    first._prune_pending.add(("local", "/a"))
+    assert not second._prune_pending
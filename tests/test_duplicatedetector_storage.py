@@ -0,0 +1,96 @@
+"""
+存储后端:本地符号链接按链接本身统计,不与目标文件合并为硬链接;
+StorageChain文件项按名称和后缀的多种形式匹配媒体文件;批量删除和读取逐项返回结果。
+"""
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from conftest import load_submodule
+
+
+def _write(path: Path, size_kb: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'x' * size_kb * 1024)
+
+
+def test_symlink_stat_reports_link_itself(tmp_path):
+    storage = load_submodule("storage")
+    target = tmp_path / "A.2020.1080p.mkv"
+    _write(target, 64)
+    link = tmp_path / "A.2020.link.mkv"
+    os.symlink(target, link)
+    (tmp_path / "gone.mkv").symlink_to(tmp_path / "missing.mkv")
+
+    backend = storage.LocalStorage()
+    entry = backend.stat(str(link))
+    assert entry.symlink and entry.inode is None
+    assert entry.size == 64 * 1024 and entry.disk_size < entry.size
+    assert not backend.stat(str(target)).symlink
+    assert backend.stat(str(tmp_path / "gone.mkv")) is None
+    listed = {e.name: e.symlink for e in backend.list_dir(str(tmp_path))}
+    assert listed == {"A.2020.1080p.mkv": False, "A.2020.link.mkv": True}
+
+
+def test_symlink_is_not_freeable_or_collapsed(plugin_module, tmp_path):
+    movie = tmp_path / "movie" / "A (2020)"
+    _write(movie / "A.2020.1080p.mkv", 64)
+    os.symlink(movie / "A.2020.1080p.mkv", movie / "A.2020.720p.mkv")
+    plugin = plugin_module.DuplicateDetector()
+    plugin.init_plugin({"enabled": True, "scan_paths": str(tmp_path / "movie"), "file_extensions": "mkv"})
+    plugin._DuplicateDetector__run_detection()
+
+    groups = list(plugin._DuplicateDetector__load_result()['duplicates'])
+    assert len(groups) == 1
+    files = {Path(f['path']).name: f for f in groups[0]['files']}
+    # 链接与目标各自一条记录,删除链接不释放空间
+    assert set(files) == {"A.2020.1080p.mkv", "A.2020.720p.mkv"}
+    assert files["A.2020.720p.mkv"]['symlink'] and not files["A.2020.720p.mkv"]['freeable']
+    assert files["A.2020.1080p.mkv"]['links'] == []
+    assert groups[0]['reclaimable_size'] == 0
+    plugin.stop_service()
+
+
+class _Chain:
+    """文件项的name和basename均不含后缀、extension不带点的StorageChain"""
+
+    def _item(self, path: Path):
+        is_dir = path.is_dir()
+        return SimpleNamespace(path=f"{path}/" if is_dir else str(path), name=path.name if is_dir else path.stem,
+                               basename=path.name if is_dir else path.stem,
+                               extension=None if is_dir else path.suffix[1:],
+                               type='dir' if is_dir else 'file', size=0, modify_time=None)
+
+    def get_file_item(self, storage, path):
+        return self._item(Path(path)) if Path(path).exists() else None
+
+    def list_files(self, fileitem):
+        return [self._item(child) for child in Path(fileitem.path).iterdir()]
+
+
+def test_chain_find_media_matches_names_without_extension(tmp_path):
+    storage = load_submodule("storage")
+    _write(tmp_path / "M (2020)" / "M.2020.mkv", 1)
+    _write(tmp_path / "M (2020)" / "M.2020.nfo", 1)
+    backend = storage.ChainStorage(_Chain(), 'u115')
+    assert backend.find_media(str(tmp_path / "M (2020)"), "M.2020", {'.mkv'}) == \
+           str(tmp_path / "M (2020)" / "M.2020.mkv")
+    assert backend.find_media(str(tmp_path / "M (2020)"), "M.2019", {'.mkv'}) is None
+    assert backend.find_media(str(tmp_path / "missing"), "M.2020", {'.mkv'}) is None
+
+
+def test_delete_many_reports_each_path(tmp_path):
+    storage = load_submodule("storage")
+    for name in ("a.mkv", "b.mkv"):
+        _write(tmp_path / name, 1)
+    results = storage.LocalStorage(concurrency=2).delete_many(
+        [str(tmp_path / "a.mkv"), str(tmp_path / "b.mkv"), str(tmp_path / "c.mkv")])
+    assert results == {str(tmp_path / "a.mkv"): True, str(tmp_path / "b.mkv"): True, str(tmp_path / "c.mkv"): False}
+    assert not any(tmp_path.iterdir())
+
+
+def test_read_many_limits_bytes(tmp_path):
+    storage = load_submodule("storage")
+    (tmp_path / "a.strm").write_text("/cloud/a.mkv" + " " * 8192)
+    results = storage.LocalStorage().read_many([str(tmp_path / "a.strm"), str(tmp_path / "b.strm")], max_bytes=12)
+    assert results == {str(tmp_path / "a.strm"): b"/cloud/a.mkv", str(tmp_path / "b.strm"): None}